@@ -1,22 +1,435 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Cast, Round
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+
 from .models import (
     UserProfile, Course, Subject, Teacher, Parent, Student,
     CourseSubject, TeacherSubject, Attendance, Assignment,
-    AssignmentSubmission, Exam, Result, Timetable
+    AssignmentSubmission, Exam, Result, Timetable, ReportCard,
+    AttendanceDaily, RollupWatermark, Job, RiskScore, AttendanceArchive,
+    ArchivedYear, AcademicStanding, Notification, LogCheckpoint, AuditEntry,
+    TermRollover,
 )
+from .enrollment import CourseFull, activate, check_seat, enroll
+from .pagination import EstimatedCountPaginator
+from .reports import GRADE_SCALE
+from .rollover import RolloverError, apply_rollover, plan_rollover
+from .standing import update_standing, update_standings
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow to millions of rows: no exact
+    COUNT(*) on unfiltered pages, and no second count for filtered ones.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+def _updated(modeladmin, request, count, noun):
+    modeladmin.message_user(request, f"Updated {count} {noun}.", messages.SUCCESS)
+
+
+# ---------------------------------------------------
+# PEOPLE AND COURSES
+# ---------------------------------------------------
+
+@admin.register(UserProfile)
+class UserProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "role", "phone")
+    list_select_related = ("user",)
+    list_filter = ("role",)
+    search_fields = ("user__username", "user__first_name", "user__last_name", "phone")
+    raw_id_fields = ("user",)
+
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ("code", "name", "semester", "section", "capacity", "class_teacher")
+    list_select_related = ("class_teacher__user_profile__user",)
+    list_filter = ("semester",)
+    search_fields = ("code", "name")
+    autocomplete_fields = ("class_teacher",)
+    actions = ("preview_rollover", "rollover")
+
+    def _plan(self, request, queryset):
+        try:
+            return plan_rollover(queryset)
+        except RolloverError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+
+    @admin.action(description="Preview end-of-term rollover (dry run)")
+    def preview_rollover(self, request, queryset):
+        plan = self._plan(request, queryset)
+        if plan:
+            for line in plan.describe():
+                self.message_user(request, line, messages.INFO)
+            summary = ", ".join(f"{value} {key.replace('_', ' ')}" for key, value in plan.summary().items())
+            self.message_user(request, f"Dry run: {summary}", messages.INFO)
+
+    @admin.action(description="Roll selected courses over to the next semester", permissions=["change"])
+    def rollover(self, request, queryset):
+        plan = self._plan(request, queryset)
+        if plan:
+            try:
+                summary = apply_rollover(plan)
+            except RolloverError as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+                return
+            seconds = sum(plan.timings.values())
+            self.message_user(request, f"Promoted {summary['students_promoted']} and graduated "
+                                       f"{summary['students_graduated']} students, created "
+                                       f"{summary['courses_created']} courses in {seconds:.2f}s.", messages.SUCCESS)
+
+
+@admin.register(Subject)
+class SubjectAdmin(admin.ModelAdmin):
+    list_display = ("code", "name", "credits")
+    search_fields = ("code", "name")
+
+
+@admin.register(Teacher)
+class TeacherAdmin(admin.ModelAdmin):
+    list_display = ("employee_id", "user_profile", "department", "joining_date")
+    list_select_related = ("user_profile__user",)
+    search_fields = ("employee_id", "user_profile__user__username", "user_profile__user__first_name",
+                     "user_profile__user__last_name")
+    raw_id_fields = ("user_profile",)
+
+
+@admin.register(Parent)
+class ParentAdmin(admin.ModelAdmin):
+    list_display = ("name", "relation", "phone", "email")
+    search_fields = ("name", "phone", "email")
+    raw_id_fields = ("user_profile",)
+
+
+class StudentAdminForm(forms.ModelForm):
+    class Meta:
+        model = Student
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        course = cleaned_data.get("course")
+        if course is not None:
+            self.instance.status = cleaned_data.get("status", self.instance.status)
+            try:
+                check_seat(self.instance, course)
+            except CourseFull as exc:
+                self.add_error("course", str(exc))
+        return cleaned_data
+
+
+@admin.register(Student)
+class StudentAdmin(LargeTableAdmin):
+    form = StudentAdminForm
+    list_display = ("roll_number", "student_id", "user_profile", "course", "status")
+    list_select_related = ("user_profile__user", "course")
+    list_filter = ("status", "course")
+    search_fields = ("roll_number", "student_id", "card_id", "user_profile__user__username",
+                     "user_profile__user__first_name", "user_profile__user__last_name")
+    raw_id_fields = ("user_profile", "parent")
+    autocomplete_fields = ("course",)
+    actions = ("mark_active", "mark_inactive", "mark_graduated")
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except CourseFull as exc:
+            # The last seat went between the form's check and the locked one; nothing was saved
+            self.message_user(request, f"Not saved: {exc}", messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    def save_model(self, request, obj, form, change):
+        # The form's check is advisory; enroll() rechecks under the course lock
+        enroll(obj, obj.course)
+
+    def _set_status(self, request, queryset, status):
+        _updated(self, request, queryset.update(status=status, updated_at=timezone.now()), "students")
+
+    @admin.action(description="Mark selected students active")
+    def mark_active(self, request, queryset):
+        activated, refused = activate(queryset)
+        _updated(self, request, activated, "students")
+        for code, count in refused.items():
+            self.message_user(request, f"{count} students not activated: {code} is full.", messages.WARNING)
+
+    @admin.action(description="Mark selected students inactive")
+    def mark_inactive(self, request, queryset):
+        self._set_status(request, queryset, "inactive")
+
+    @admin.action(description="Mark selected students graduated")
+    def mark_graduated(self, request, queryset):
+        self._set_status(request, queryset, "graduated")
+
+
+@admin.register(CourseSubject)
+class CourseSubjectAdmin(admin.ModelAdmin):
+    list_display = ("course", "subject", "semester")
+    list_select_related = ("course", "subject")
+    list_filter = ("semester",)
+    autocomplete_fields = ("course", "subject")
+
+
+@admin.register(TeacherSubject)
+class TeacherSubjectAdmin(admin.ModelAdmin):
+    list_display = ("teacher", "subject", "course")
+    list_select_related = ("teacher__user_profile__user", "subject", "course")
+    autocomplete_fields = ("teacher", "subject", "course")
+
+
+@admin.register(Timetable)
+class TimetableAdmin(admin.ModelAdmin):
+    list_display = ("course", "day_of_week", "start_time", "end_time", "subject", "teacher", "room")
+    list_select_related = ("course", "subject", "teacher__user_profile__user")
+    list_filter = ("day_of_week", "course")
+    autocomplete_fields = ("course", "subject", "teacher")
+
+
+# ---------------------------------------------------
+# ATTENDANCE
+# ---------------------------------------------------
+
+@admin.register(Attendance)
+class AttendanceAdmin(LargeTableAdmin):
+    # Separate columns instead of __str__; list_select_related covers the related ones
+    list_display = ("attendance_date", "student", "subject", "status", "remarks")
+    list_select_related = ("student__user_profile__user", "subject")
+    list_filter = ("status", "subject")
+    date_hierarchy = "attendance_date"
+    search_fields = ("student__roll_number",)
+    raw_id_fields = ("student",)
+    autocomplete_fields = ("subject",)
+    actions = ("mark_present", "mark_absent", "mark_late", "mark_leave")
+
+    def _set_status(self, request, queryset, status):
+        # update() skips auto_now; the rollup and risk watermarks need updated_at
+        _updated(self, request, queryset.update(status=status, updated_at=timezone.now()), "attendance records")
+
+    @admin.action(description="Mark selected as present")
+    def mark_present(self, request, queryset):
+        self._set_status(request, queryset, "present")
+
+    @admin.action(description="Mark selected as absent")
+    def mark_absent(self, request, queryset):
+        self._set_status(request, queryset, "absent")
+
+    @admin.action(description="Mark selected as late")
+    def mark_late(self, request, queryset):
+        self._set_status(request, queryset, "late")
+
+    @admin.action(description="Mark selected as on leave")
+    def mark_leave(self, request, queryset):
+        self._set_status(request, queryset, "leave")
+
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(LargeTableAdmin):
+    # May live in another database: plain ids, no joins
+    list_display = ("attendance_date", "student_id", "subject_id", "status", "academic_year")
+    list_filter = ("academic_year", "status")
+    date_hierarchy = "attendance_date"
+
+
+@admin.register(TermRollover)
+class TermRolloverAdmin(admin.ModelAdmin):
+    list_display = ("term", "course", "successor", "students", "rolled_at")
+    list_select_related = ("course", "successor")
+    list_filter = ("term",)
+
+
+@admin.register(ArchivedYear)
+class ArchivedYearAdmin(admin.ModelAdmin):
+    list_display = ("label", "start", "end", "rows", "archived_at")
+
+
+@admin.register(LogCheckpoint)
+class LogCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("path", "offset", "lines", "updated_at")
+
+
+@admin.register(AttendanceDaily)
+class AttendanceDailyAdmin(LargeTableAdmin):
+    list_display = ("date", "course", "subject", "present", "absent", "late", "leave")
+    list_select_related = ("course", "subject")
+    list_filter = ("course",)
+    date_hierarchy = "date"
+
+
+# ---------------------------------------------------
+# ASSIGNMENTS, EXAMS AND RESULTS
+# ---------------------------------------------------
+
+@admin.register(Assignment)
+class AssignmentAdmin(admin.ModelAdmin):
+    list_display = ("title", "subject", "teacher", "due_date", "total_marks")
+    list_select_related = ("subject", "teacher__user_profile__user")
+    list_filter = ("subject",)
+    date_hierarchy = "due_date"
+    search_fields = ("title",)
+    autocomplete_fields = ("subject", "teacher")
+
+
+@admin.register(AssignmentSubmission)
+class AssignmentSubmissionAdmin(LargeTableAdmin):
+    list_display = ("assignment", "student", "status", "submission_date", "marks")
+    list_select_related = ("assignment", "student__user_profile__user")
+    list_filter = ("status",)
+    search_fields = ("student__roll_number", "assignment__title")
+    raw_id_fields = ("assignment", "student")
+    actions = ("mark_not_submitted",)
+
+    @admin.action(description="Mark selected as not submitted")
+    def mark_not_submitted(self, request, queryset):
+        count = queryset.update(status="not_submitted", updated_at=timezone.now())
+        _updated(self, request, count, "submissions")
+
+
+@admin.register(Exam)
+class ExamAdmin(admin.ModelAdmin):
+    list_display = ("exam_name", "exam_type", "course", "subject", "exam_date")
+    list_select_related = ("course", "subject")
+    list_filter = ("exam_type", "course")
+    date_hierarchy = "exam_date"
+    search_fields = ("exam_name",)
+    autocomplete_fields = ("course", "subject")
+
+    # Results of a deleted exam are kept without it, and stop counting towards GPA
+    def delete_model(self, request, obj):
+        student_ids = list(Result.objects.filter(exam=obj).values_list("student_id", flat=True).distinct())
+        super().delete_model(request, obj)
+        update_standings(student_ids)
+
+    def delete_queryset(self, request, queryset):
+        student_ids = list(Result.objects.filter(exam__in=queryset).values_list("student_id", flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        update_standings(student_ids)
+
+
+@admin.register(Result)
+class ResultAdmin(LargeTableAdmin):
+    list_display = ("student", "subject", "exam", "marks_obtained", "total_marks", "percentage", "grade")
+    list_select_related = ("student__user_profile__user", "subject", "exam__subject", "exam__course")
+    list_filter = ("grade", "subject")
+    search_fields = ("student__roll_number",)
+    raw_id_fields = ("student", "exam")
+    autocomplete_fields = ("subject",)
+    actions = ("recalculate_grades",)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "student" in form.changed_data:
+            update_standing(form.initial["student"])
+        update_standing(obj.student_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        update_standing(obj.student_id)
+
+    def delete_queryset(self, request, queryset):
+        student_ids = list(queryset.values_list("student_id", flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        update_standings(student_ids)
+
+    @admin.action(description="Recalculate percentage and grade")
+    def recalculate_grades(self, request, queryset):
+        percentage = ExpressionWrapper(
+            Round(Cast(F("marks_obtained"), DecimalField(max_digits=9, decimal_places=4)) * 100 / F("total_marks"), 2),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        )
+        grade = Case(
+            *[When(percentage__gte=minimum, then=Value(letter)) for minimum, letter in GRADE_SCALE],
+            default=Value(GRADE_SCALE[-1][1]),
+        )
+        queryset = queryset.filter(marks_obtained__isnull=False, total_marks__gt=0)
+        # Two statements so the grade reads the freshly written percentage
+        count = queryset.update(percentage=percentage, updated_at=timezone.now())
+        queryset.update(grade=grade)
+        _updated(self, request, count, "results")
+
+
+@admin.register(ReportCard)
+class ReportCardAdmin(LargeTableAdmin):
+    list_display = ("student", "course", "term", "percentage", "grade", "attendance_percentage", "class_rank")
+    list_select_related = ("student__user_profile__user", "course")
+    list_filter = ("term", "grade", "course")
+    search_fields = ("student__roll_number",)
+    raw_id_fields = ("student",)
+
+
+# ---------------------------------------------------
+# BACKGROUND WORK
+# ---------------------------------------------------
+
+@admin.register(RiskScore)
+class RiskScoreAdmin(admin.ModelAdmin):
+    list_display = ("student", "score", "level", "recent_attendance", "missed_submissions",
+                    "latest_percentage", "computed_at")
+    list_select_related = ("student__user_profile__user",)
+    list_filter = ("level", "model_version")
+    ordering = ("-score",)
+    search_fields = ("student__roll_number",)
+    raw_id_fields = ("student",)
+
+
+@admin.register(AcademicStanding)
+class AcademicStandingAdmin(admin.ModelAdmin):
+    list_display = ("student", "semester", "gpa", "cgpa", "credits_attempted", "credits_earned", "computed_at")
+    list_select_related = ("student__user_profile__user",)
+    list_filter = ("semester",)
+    ordering = ("-cgpa",)
+    search_fields = ("student__roll_number",)
+    raw_id_fields = ("student",)
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ("created_at", "parent", "student", "kind", "object_id", "status", "sent_at")
+    list_select_related = ("parent", "student__user_profile__user")
+    list_filter = ("status", "kind")
+    search_fields = ("parent__name", "parent__email", "student__roll_number")
+    raw_id_fields = ("parent", "student")
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(LargeTableAdmin):
+    list_display = ("at", "model", "object_id", "action", "user", "changes")
+    list_select_related = ("user",)
+    list_filter = ("model", "action")
+    search_fields = ("=object_id",)
+    date_hierarchy = "at"
+
+    # The trail is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "status", "progress", "attempts", "created_by", "created_at", "finished_at")
+    list_select_related = ("created_by",)
+    list_filter = ("status", "task")
+    raw_id_fields = ("created_by",)
+    actions = ("requeue",)
+
+    @admin.action(description="Queue selected jobs again")
+    def requeue(self, request, queryset):
+        now = timezone.now()
+        count = queryset.exclude(status="running").update(
+            status="queued", attempts=0, progress=0, error=None, run_after=now, finished_at=None, updated_at=now,
+        )
+        _updated(self, request, count, "jobs")
+
 
-# Register your models here.
-admin.site.register(UserProfile)
-admin.site.register(Course)
-admin.site.register(Subject)
-admin.site.register(Teacher)
-admin.site.register(Parent)
-admin.site.register(Student)
-admin.site.register(CourseSubject)
-admin.site.register(TeacherSubject)
-admin.site.register(Attendance)
-admin.site.register(Assignment)
-admin.site.register(AssignmentSubmission)
-admin.site.register(Exam)
-admin.site.register(Result)
-admin.site.register(Timetable)
+admin.site.register(RollupWatermark)
@@ -0,0 +1,134 @@
+"""
+Attendance analytics rollups.
+
+``AttendanceDaily`` holds one row per course, subject and day with the
+count of each attendance status. ``refresh_attendance_daily`` keeps it up
+to date incrementally: only days touched by ``Attendance`` rows changed
+since the stored watermark are recomputed. Each row counts towards the
+course the student was in when it was marked (``Attendance.course``), so
+a rebuild after a rollover or transfer leaves past days where they were.
+Trend queries then read the rollup instead of the raw attendance table.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, F, FloatField, Max, OuterRef, Q, Sum
+from django.db.models.functions import Cast, Coalesce, TruncWeek
+
+from .models import Attendance, AttendanceDaily, RollupWatermark, TeacherSubject
+from .routers import read_from_replica
+
+WATERMARK = 'attendance_daily'
+
+STATUSES = ['present', 'absent', 'late', 'leave']
+
+# Days recomputed per grouped query
+DAYS_PER_BATCH = 31
+
+
+def _daily_counts(dates):
+    return (
+        Attendance.objects.filter(attendance_date__in=dates)
+        # Rows without a recorded course (raw bulk inserts) fall back to the current one
+        .values('subject_id', 'attendance_date', marked_in=Coalesce('course_id', 'student__course_id'))
+        .annotate(**{
+            status: Count('id', filter=Q(status=status))
+            for status in STATUSES
+        })
+    )
+
+
+def _rebuild_days(dates):
+    rows = [
+        AttendanceDaily(
+            course_id=row['marked_in'],
+            subject_id=row['subject_id'],
+            date=row['attendance_date'],
+            **{status: row[status] for status in STATUSES},
+        )
+        for row in _daily_counts(dates)
+    ]
+    with transaction.atomic():
+        # Groups that no longer have any rows (e.g. deleted attendance)
+        AttendanceDaily.objects.filter(date__in=dates).delete()
+        AttendanceDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_attendance_daily(rebuild=False, progress=None):
+    """
+    Fold ``Attendance`` changes since the last run into ``AttendanceDaily``.
+
+    Every day that has at least one new or modified attendance row is
+    recomputed from the raw table, so re-running is always safe; rows in
+    the watermark's overlap window (``RollupWatermark.since``) are read
+    again in case they committed late. With ``rebuild=True`` the watermark
+    is ignored and every day is recomputed. Deleted attendance rows are
+    only picked up by a rebuild or by a later change on the same day. Days
+    up to ``archived_through()`` are never recomputed: their raw rows are
+    in the archive, so they keep their rollup rows, even on a rebuild.
+
+    ``progress(done, total)`` is called after each batch of days. Returns
+    ``(days, rows)``: the number of days recomputed and rollup rows written.
+    """
+    from .archive import archived_through  # core.archive imports this module
+
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    changed = Attendance.objects.all()
+    if watermark.value and not rebuild:
+        changed = changed.filter(updated_at__gt=watermark.since())
+
+    high = changed.aggregate(high=Max('updated_at'))['high']
+    if high is None:
+        return 0, 0
+
+    changed = changed.filter(updated_at__lte=high)
+    boundary = archived_through()
+    if boundary is not None:
+        # A late mark for an archived day would replace the day's counts with its own
+        changed = changed.filter(attendance_date__gt=boundary)
+    dates = sorted(changed.values_list('attendance_date', flat=True).distinct())
+    written = 0
+    for i in range(0, len(dates), DAYS_PER_BATCH):
+        written += _rebuild_days(dates[i:i + DAYS_PER_BATCH])
+        if progress:
+            progress(min(i + DAYS_PER_BATCH, len(dates)), len(dates))
+
+    # The overlap alone can't move the watermark back
+    watermark.value = max(high, watermark.value or high)
+    watermark.save(update_fields=['value', 'updated_at'])
+    return len(dates), written
+
+
+def attendance_trend(period='day', course=None, subject=None, teacher=None, start=None, end=None):
+    """
+    Attendance rate over time from the rollup table.
+
+    ``period`` is ``'day'`` or ``'week'``. ``course``, ``subject`` and
+    ``teacher`` narrow the series; a teacher covers every course/subject
+    pair assigned to them through ``TeacherSubject``. Each row has the
+    period start, the status counts and ``rate`` (present + late over all
+    marked attendance, as a percentage).
+    """
+    qs = AttendanceDaily.objects.all()
+    if course:
+        qs = qs.filter(course=course)
+    if subject:
+        qs = qs.filter(subject=subject)
+    if teacher:
+        qs = qs.filter(Exists(TeacherSubject.objects.filter(
+            teacher=teacher, course=OuterRef('course'), subject=OuterRef('subject'),
+        )))
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+
+    bucket = TruncWeek('date') if period == 'week' else F('date')
+    rows = (
+        qs.values(period_start=bucket)
+        .annotate(**{status: Sum(status) for status in STATUSES})
+        .annotate(total=F('present') + F('absent') + F('late') + F('leave'))
+        .annotate(rate=Cast(F('present') + F('late'), FloatField()) * 100.0 / Cast(F('total'), FloatField()))
+        .order_by('period_start')
+    )
+    with read_from_replica():
+        return list(rows)
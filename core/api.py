@@ -0,0 +1,313 @@
+"""
+Read-only JSON API (v1) for the mobile app and parent portal.
+
+Each ``Resource`` maps public field names to ORM paths. Requests choose
+fields with ``?fields=a,b`` and only those columns are selected, pages
+are keyed by an opaque ``cursor`` on the primary key instead of an
+OFFSET, and every response carries an ETag and Last-Modified derived from
+``max(updated_at)`` and the row count of the requested page, so a client
+polling with ``If-None-Match``/``If-Modified-Since`` gets a 304 after two
+index-bounded queries and no serialization. Large pages are streamed.
+Both JSON encoders write dates and times the way ``DjangoJSONEncoder``
+does, so output doesn't depend on whether orjson is installed.
+Attendance covers the open academic years; date ranges reaching an
+archived year are refused with a 410 (see ``core.archive``).
+"""
+import base64
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from django.views import View
+
+from .archive import archived_through
+from .models import Assignment, Attendance, Course, Result, Student, Subject, Timetable
+from .routers import ReplicaReadMixin
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+VERSION = 'v1'
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Pages with more rows than this are streamed row by row
+STREAM_THRESHOLD = 500
+
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(value):
+    """Serialize to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        # Dates, times and decimals go through DjangoJSONEncoder too, so both
+        # paths write e.g. 2024-01-01T09:00:00.123Z
+        return orjson.dumps(value, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Resource:
+    """
+    ``fields`` maps public names to ORM paths; ``filters`` maps query
+    parameters to lookups. ``scope(queryset, students)`` limits a queryset
+    to rows belonging to ``students``, for students and parents.
+    ``check(params)``, if given, raises ``ApiError`` for requests the
+    resource can't answer.
+    """
+
+    def __init__(self, name, model, fields, scope, filters=None, check=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.scope = scope
+        self.filters = filters or {}
+        self.check = check
+
+    def select(self, requested):
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+        # The id is always returned; cursors need it
+        return ['id', *[name for name in names if name != 'id']]
+
+    def queryset(self, user, params):
+        if self.check is not None:
+            self.check(params)
+        queryset = self.model.objects.all()
+        students = visible_students(user)
+        if students is not None:
+            queryset = self.scope(queryset, students)
+        for param, lookup in self.filters.items():
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: params[param]})
+                except (ValueError, ValidationError):
+                    raise ApiError(f"Invalid value for {param}") from None
+        return queryset
+
+
+def visible_students(user):
+    """Students ``user`` may read, or None for staff who can read everything."""
+    profile = getattr(user, 'userprofile', None)
+    role = profile.role if profile else None
+    if user.is_superuser or role in ('admin', 'teacher'):
+        return None
+    if role == 'parent':
+        return Student.objects.filter(parent__user_profile__user=user)
+    return Student.objects.filter(user_profile__user=user)
+
+
+def _themselves(queryset, students):
+    return queryset.filter(pk__in=students)
+
+
+def _own(queryset, students):
+    return queryset.filter(student__in=students)
+
+
+def _own_courses(queryset, students):
+    return queryset.filter(course__in=Course.objects.filter(student__in=students))
+
+
+def _own_subjects(queryset, students):
+    return queryset.filter(subject__in=Subject.objects.filter(coursesubject__course__student__in=students))
+
+
+def _open_years(params):
+    """Refuse attendance date ranges reaching archived years, rather than answer them with nothing."""
+    dates = [params[param] for param in ('from', 'to') if params.get(param)]
+    if not dates:
+        return
+    boundary = archived_through()
+    for value in dates:
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ApiError(f"Invalid date {value!r}")
+        if boundary is not None and day <= boundary:
+            raise ApiError(
+                f"Attendance up to {boundary} is archived and not served here; "
+                f"use from={boundary + timedelta(days=1)} or later", status=410,
+            )
+
+
+RESOURCES = {resource.name: resource for resource in [
+    Resource('students', Student, {
+        'id': 'pk',
+        'student_id': 'student_id',
+        'roll_number': 'roll_number',
+        'username': 'user_profile__user__username',
+        'first_name': 'user_profile__user__first_name',
+        'last_name': 'user_profile__user__last_name',
+        'course': 'course__code',
+        'gender': 'gender',
+        'status': 'status',
+        'admission_date': 'admission_date',
+        'updated_at': 'updated_at',
+    }, _themselves, filters={'course': 'course__code', 'status': 'status'}),
+    Resource('attendance', Attendance, {
+        'id': 'pk',
+        'student': 'student_id',
+        'roll_number': 'student__roll_number',
+        'subject': 'subject__code',
+        'date': 'attendance_date',
+        'status': 'status',
+        'remarks': 'remarks',
+        'updated_at': 'updated_at',
+    }, _own, filters={
+        'student': 'student_id', 'subject': 'subject__code', 'status': 'status',
+        'from': 'attendance_date__gte', 'to': 'attendance_date__lte',
+    }, check=_open_years),
+    Resource('results', Result, {
+        'id': 'pk',
+        'student': 'student_id',
+        'roll_number': 'student__roll_number',
+        'subject': 'subject__code',
+        'exam': 'exam__exam_name',
+        'exam_type': 'exam__exam_type',
+        'exam_date': 'exam__exam_date',
+        'marks_obtained': 'marks_obtained',
+        'total_marks': 'total_marks',
+        'percentage': 'percentage',
+        'grade': 'grade',
+        'updated_at': 'updated_at',
+    }, _own, filters={'student': 'student_id', 'subject': 'subject__code', 'exam': 'exam_id'}),
+    Resource('timetable', Timetable, {
+        'id': 'pk',
+        'course': 'course__code',
+        'subject': 'subject__code',
+        'teacher': 'teacher__employee_id',
+        'day': 'day_of_week',
+        'start_time': 'start_time',
+        'end_time': 'end_time',
+        'room': 'room',
+        'updated_at': 'updated_at',
+    }, _own_courses, filters={'course': 'course__code', 'teacher': 'teacher__employee_id', 'day': 'day_of_week'}),
+    Resource('assignments', Assignment, {
+        'id': 'pk',
+        'title': 'title',
+        'subject': 'subject__code',
+        'teacher': 'teacher__employee_id',
+        'due_date': 'due_date',
+        'total_marks': 'total_marks',
+        'description': 'description',
+        'updated_at': 'updated_at',
+    }, _own_subjects, filters={'subject': 'subject__code', 'teacher': 'teacher__employee_id'}),
+]}
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except ValueError:
+        raise ApiError("Invalid cursor") from None
+
+
+class ApiView(ReplicaReadMixin, View):
+    """``GET /api/v1/<resource>/`` for any resource in ``RESOURCES``."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({'error': str(exc)}, status=exc.status)
+
+    def get(self, request, resource):
+        resource = RESOURCES.get(resource)
+        if resource is None:
+            raise ApiError("Unknown resource", status=404)
+        names = resource.select(request.GET.get('fields'))
+        try:
+            limit = min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise ApiError("limit must be an integer") from None
+        if limit < 1:
+            raise ApiError("limit must be at least 1")
+
+        queryset = resource.queryset(request.user, request.GET)
+        # Chosen now, while this request's routing applies: a streamed body
+        # is read after the middleware has reset it
+        queryset = queryset.using(queryset.db)
+        if request.GET.get('cursor'):
+            queryset = queryset.filter(pk__gt=decode_cursor(request.GET['cursor']))
+
+        # The page and the row after it (whether there is a next page), not
+        # everything past the cursor
+        window = queryset
+        boundary = list(queryset.order_by('pk').values_list('pk', flat=True)[limit:limit + 1])
+        if boundary:
+            window = queryset.filter(pk__lte=boundary[0])
+        # One aggregate decides whether anything changed; the count catches deletes
+        state = window.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        last_modified = state['last_modified']
+        etag = hashlib.md5(
+            f"{VERSION}|{request.get_full_path()}|{request.user.pk}|{last_modified}|{state['count']}".encode()
+        ).hexdigest()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=f'"{etag}"', last_modified=timestamp)
+        if response is None:
+            paths = [resource.fields[name] for name in names]
+            rows = queryset.order_by('pk').values_list(*paths)[:limit + 1]
+            if limit > STREAM_THRESHOLD:
+                response = StreamingHttpResponse(
+                    self.stream(request, rows, names, limit), content_type='application/json',
+                )
+            else:
+                rows = list(rows)
+                data = [dict(zip(names, row)) for row in rows[:limit]]
+                next_url = self.next_url(request, data[-1]['id']) if len(rows) > limit else None
+                response = HttpResponse(dumps({'data': data, 'next': next_url}), content_type='application/json')
+
+        response['ETag'] = f'"{etag}"'
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Always revalidate; the answer depends on who is asking
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def stream(self, request, rows, names, limit):
+        yield b'{"data":['
+        last = None
+        more = False
+        for i, row in enumerate(rows.iterator(chunk_size=STREAM_THRESHOLD)):
+            if i == limit:
+                more = True
+                break
+            item = dict(zip(names, row))
+            yield (b',' if i else b'') + dumps(item)
+            last = item['id']
+        next_url = self.next_url(request, last) if more else None
+        yield b'],"next":' + dumps(next_url) + b'}'
+
+    def next_url(self, request, pk):
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(pk)
+        return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
@@ -0,0 +1,139 @@
+"""
+Academic-year archival of attendance.
+
+``archive_year`` moves every ``Attendance`` row of a closed academic year
+into ``AttendanceArchive`` (stored in the ``archive`` database when one is
+configured) in primary-key batches, after folding the year into the
+``AttendanceDaily`` rollup, which is kept. ``ArchivedYear`` records what
+has been moved, so ``aggregate_attendance`` only reads the archive when
+the requested date range reaches back into an archived year, and the live
+table stays the size of the open years.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .analytics import refresh_attendance_daily
+from .models import ArchivedYear, Attendance, AttendanceArchive
+
+# Rows moved per transaction
+BATCH_SIZE = 5000
+
+FIELDS = [
+    'id', 'student_id', 'subject_id', 'attendance_date', 'status', 'remarks', 'created_at', 'updated_at',
+]
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def academic_year(day):
+    """Return the ``(label, start, end)`` of the academic year containing ``day``."""
+    month = settings.ACADEMIC_YEAR_START_MONTH
+    first = day.year if day.month >= month else day.year - 1
+    return year_bounds(f'{first}-{first + 1}')
+
+
+def year_bounds(label):
+    """``(label, start, end)`` for a label such as ``2024-2025``."""
+    try:
+        first = int(label.split('-')[0])
+    except ValueError:
+        raise ArchiveError(f"Invalid academic year {label!r}; expected e.g. 2024-2025") from None
+    month = settings.ACADEMIC_YEAR_START_MONTH
+    start = date(first, month, 1)
+    end = date(first + 1, month, 1) - timedelta(days=1)
+    return f'{first}-{first + 1}', start, end
+
+
+def archived_through():
+    """Last day whose attendance may be in the archive, or None."""
+    return ArchivedYear.objects.aggregate(end=Max('end'))['end']
+
+
+def archive_year(label, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Move the attendance of academic year ``label`` to the archive and
+    return the number of rows moved (or that would be, with ``dry_run``).
+    Safe to re-run after an interruption.
+    """
+    label, start, end = year_bounds(label)
+    if end >= timezone.localdate():
+        raise ArchiveError(f"Academic year {label} has not ended yet")
+    rows = Attendance.objects.filter(attendance_date__range=(start, end))
+    if dry_run or not rows.exists():
+        return rows.count() if dry_run else 0
+
+    # The rollup must cover the year before its raw rows leave this table
+    refresh_attendance_daily()
+    # Recorded first so reads include the archive while rows are moving
+    ArchivedYear.objects.update_or_create(label=label, defaults={'start': start, 'end': end})
+
+    live_db = router.db_for_write(Attendance)
+    archive_db = router.db_for_write(AttendanceArchive)
+    moved = 0
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last).order_by('pk').values(*FIELDS)[:batch_size])
+        if not batch:
+            break
+        ids = [row['id'] for row in batch]
+        # The archive commits first: a crash in between leaves duplicates
+        # that the next run skips, never lost rows
+        with transaction.atomic(using=live_db):
+            with transaction.atomic(using=archive_db):
+                AttendanceArchive.objects.bulk_create(
+                    [AttendanceArchive(academic_year=label, **row) for row in batch],
+                    batch_size=1000,
+                    ignore_conflicts=True,
+                )
+            # A raw delete: the rows live on in the archive, so moving them
+            # isn't an edit for the audit trail
+            Attendance.objects.filter(pk__in=ids)._raw_delete(live_db)
+        moved += len(ids)
+        last = ids[-1]
+
+    ArchivedYear.objects.filter(label=label).update(
+        rows=AttendanceArchive.objects.filter(academic_year=label).count(), archived_at=timezone.now(),
+    )
+    return moved
+
+
+def attendance_sources(start=None, end=None):
+    """
+    Attendance querysets covering ``start``..``end`` (inclusive): the live
+    table, plus the archive when the range reaches an archived year. The
+    archive may be in another database, so filter them by ids, not joins.
+    """
+    if isinstance(start, str):
+        start = parse_date(start)
+    sources = [Attendance.objects.all()]
+    boundary = archived_through()
+    if boundary is not None and (start is None or start <= boundary):
+        sources.append(AttendanceArchive.objects.all())
+    if start is not None:
+        sources = [queryset.filter(attendance_date__gte=start) for queryset in sources]
+    if end is not None:
+        sources = [queryset.filter(attendance_date__lte=end) for queryset in sources]
+    return sources
+
+
+def aggregate_attendance(group_by, annotations, start=None, end=None, **filters):
+    """
+    ``values(*group_by).annotate(**annotations)`` over live and, when
+    needed, archived attendance, as ``{group key tuple: {name: value}}``.
+    Annotations must be additive (``Count``/``Sum``).
+    """
+    totals = {}
+    for queryset in attendance_sources(start, end):
+        for row in queryset.filter(**filters).values(*group_by).annotate(**annotations):
+            key = tuple(row[field] for field in group_by)
+            values = totals.setdefault(key, dict.fromkeys(annotations, 0))
+            for name in annotations:
+                values[name] += row[name] or 0
+    return totals
@@ -0,0 +1,152 @@
+"""
+Write-behind audit trail for marks, attendance and submissions.
+
+``AuditedModel`` (``Result``, ``Attendance``, ``AssignmentSubmission``)
+remembers the values each instance was loaded with and, on ``save()``,
+records the fields that changed (only ``update_fields`` when given);
+``AuditedQuerySet.update()`` and ``bulk_update()`` do the same for
+set-based writes, and ``delete()`` on either records the deleted values.
+Rows removed by a cascade from another model's delete, and attendance
+moved to the archive, are not recorded. Entries are handed to an
+in-process buffer once their transaction commits, and a background
+thread writes them with ``bulk_create`` every ``AUDIT_FLUSH_SECONDS`` or
+as soon as ``AUDIT_BUFFER_SIZE`` are waiting, so the write being audited
+never waits for the audit insert. Entries still buffered when a process
+is killed outright are lost; a normal exit flushes them.
+"""
+import atexit
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from functools import cache
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Not audited: bookkeeping that changes on every write
+IGNORED_FIELDS = {'id', 'created_at', 'updated_at'}
+
+# Entries kept in memory while the database refuses them; the oldest go first
+MAX_PENDING = 100_000
+
+_user = ContextVar('audit_user', default=None)
+
+
+def set_user(user):
+    """
+    Attribute entries recorded in this context to ``user``, a user id or a
+    callable returning one; returns a reset token.
+    """
+    return _user.set(user)
+
+
+def reset_user(token):
+    _user.reset(token)
+
+
+@cache
+def audited_fields(model):
+    """``{attname: field name}`` of the concrete fields whose changes are recorded."""
+    return {
+        field.attname: field.name
+        for field in model._meta.concrete_fields
+        if field.name not in IGNORED_FIELDS
+    }
+
+
+class AuditBuffer:
+    """Entries waiting to be written, flushed by a daemon thread per process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.wake = threading.Event()
+        self.pid = None
+
+    def add(self, entries):
+        with self.lock:
+            self.entries.extend(entries)
+            dropped = max(len(self.entries) - MAX_PENDING, 0)
+            del self.entries[:dropped]
+            waiting = len(self.entries)
+            if self.pid != os.getpid():
+                # First entry in this process (or a forked child)
+                self.pid = os.getpid()
+                threading.Thread(target=self._run, name='audit-flush', daemon=True).start()
+        if dropped:
+            logger.error("Audit buffer full; dropped the %d oldest entries", dropped)
+        if waiting >= settings.AUDIT_BUFFER_SIZE:
+            self.wake.set()
+
+    def flush(self):
+        """Write everything buffered; returns the number of entries written."""
+        from .models import AuditEntry
+
+        with self.lock:
+            entries, self.entries = self.entries, []
+        if not entries:
+            return 0
+        try:
+            # All or nothing, so a retry after a failed batch doesn't duplicate the earlier ones
+            with transaction.atomic(using=router.db_for_write(AuditEntry)):
+                AuditEntry.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            # DatabaseError, but also InterfaceError and the like from a dropped connection
+            logger.exception("Writing %d audit entries failed; keeping them for the next flush", len(entries))
+            with self.lock:
+                self.entries[:0] = entries
+                del self.entries[:-MAX_PENDING]
+            return 0
+        return len(entries)
+
+    def _run(self):
+        while True:
+            self.wake.wait(settings.AUDIT_FLUSH_SECONDS)
+            self.wake.clear()
+            try:
+                # Drop a connection the server closed or that outlived CONN_MAX_AGE
+                close_old_connections()
+                self.flush()
+            except Exception:
+                # Never let the thread die: entries would pile up with nobody writing them
+                logger.exception("Audit flush failed")
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def record(model, changes, action, using=None):
+    """
+    Buffer ``AuditEntry`` rows for ``changes`` (``{pk: {field: [old, new]}}``)
+    once the current transaction on ``using`` commits.
+    """
+    from .models import AuditEntry
+
+    if not settings.AUDIT_ENABLED:
+        return
+    at = timezone.now()
+    user_id = _user.get()
+    if callable(user_id):
+        user_id = user_id()
+    entries = [
+        AuditEntry(
+            model=model._meta.model_name, object_id=pk, action=action, changes=fields, user_id=user_id, at=at,
+        )
+        for pk, fields in changes.items() if fields
+    ]
+    if entries:
+        transaction.on_commit(lambda: buffer.add(entries), using=using)
+
+
+def diff(before, after, fields):
+    """``{field name: [old, new]}`` for the attnames in ``fields`` that differ."""
+    return {
+        name: [before.get(attname), after.get(attname)]
+        for attname, name in fields.items()
+        if attname in after and before.get(attname) != after[attname]
+    }
@@ -0,0 +1,295 @@
+"""
+Benchmark cases for ``manage.py run_benchmarks``.
+
+Each case is a function registered with ``@case`` that takes a
+``BenchContext`` and performs one iteration of a key code path. Cases are
+meant to run against data generated by ``manage.py seed_school``. A case
+whose optional dependencies (``requires``) aren't installed is skipped, and
+one whose first iteration fails (e.g. a page answering with an error) is
+reported as failing rather than timed.
+"""
+import importlib.util
+import os
+import statistics
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from .instrumentation import QueryCollector
+from .models import Attendance, Course, Student
+
+CASES = {}
+
+
+class CaseError(Exception):
+    pass
+
+
+def case(name, group, requires=()):
+    def decorator(func):
+        func.group = group
+        func.requires = requires
+        CASES[name] = func
+        return func
+    return decorator
+
+
+def missing_requirements(func):
+    """The modules ``func`` requires that can't be imported here."""
+    return [module for module in func.requires if importlib.util.find_spec(module) is None]
+
+
+def percentiles(samples):
+    """Return ``(p50, p95)`` of ``samples``."""
+    if len(samples) > 1:
+        quantiles = statistics.quantiles(samples, n=100)
+        return quantiles[49], quantiles[94]
+    value = samples[0] if samples else 0.0
+    return value, value
+
+
+@contextmanager
+def collect_queries():
+    collector = QueryCollector(slow_query_ms=float('inf'))
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        yield collector
+
+
+class BenchContext:
+    """Logged-in clients per role and sample objects, created lazily."""
+
+    def __init__(self):
+        self._clients = {}
+
+    def client(self, role):
+        if role not in self._clients:
+            user = User.objects.filter(userprofile__role=role).order_by('pk').first()
+            if user is None:
+                raise LookupError(f"No user with role {role!r}; run seed_school first")
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            self._clients[role] = client
+        return self._clients[role]
+
+    def get(self, role, url):
+        response = self.client(role).get(url)
+        if response.status_code != 200:
+            raise CaseError(f"GET {url} returned {response.status_code}{_cause(response)}")
+        return response
+
+    def session_client(self, engine):
+        """Admin client whose session lives in the given session engine."""
+        key = ('session', engine)
+        if key not in self._clients:
+            with override_settings(SESSION_ENGINE=engine):
+                client = Client(raise_request_exception=False)
+                client.force_login(User.objects.filter(userprofile__role='admin').order_by('pk').first())
+                # The session middleware picks its engine when first loaded
+                client.get('/subjects/')
+            self._clients[key] = client
+        return self._clients[key]
+
+    @property
+    def course(self):
+        return Course.objects.filter(student__isnull=False).order_by('pk').first()
+
+
+def _cause(response):
+    """`` (ExceptionType: message)`` of the exception behind an error response, if any."""
+    exc_info = getattr(response, 'exc_info', None)
+    return f" ({exc_info[0].__name__}: {exc_info[1]})" if exc_info else ''
+
+
+def run_case(func, ctx, repeat, warmup):
+    """
+    Time ``repeat`` iterations of a case after ``warmup`` untimed ones (at
+    least one, so a failing case raises before anything is timed).
+    """
+    for _ in range(max(warmup, 1)):
+        func(ctx)
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with collect_queries() as collector:
+            started = time.perf_counter()
+            func(ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(collector.count)
+    p50, p95 = percentiles(timings)
+    return {
+        'group': func.group,
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'queries': max(queries),
+    }
+
+
+# ---------------------------------------------------
+# DASHBOARDS
+# ---------------------------------------------------
+
+@case('dashboard_admin', 'dashboards')
+def dashboard_admin(ctx):
+    ctx.get('admin', '/')
+
+
+@case('dashboard_teacher', 'dashboards')
+def dashboard_teacher(ctx):
+    ctx.get('teacher', '/')
+
+
+@case('dashboard_student', 'dashboards')
+def dashboard_student(ctx):
+    ctx.get('student', '/')
+
+
+@case('dashboard_parent', 'dashboards')
+def dashboard_parent(ctx):
+    ctx.get('parent', '/')
+
+
+# ---------------------------------------------------
+# LIST VIEWS
+# ---------------------------------------------------
+
+def _list_case(name, url):
+    @case(f'list_{name}', 'lists')
+    def list_view(ctx):
+        ctx.get('admin', url)
+    return list_view
+
+
+for _name, _url in [
+    ('courses', '/courses/'),
+    ('students', '/students/'),
+    ('teachers', '/teachers/'),
+    ('subjects', '/subjects/'),
+    ('assignments', '/assignments/'),
+    ('attendance', '/attendance/'),
+    ('results', '/results/'),
+]:
+    _list_case(_name, _url)
+
+
+# ---------------------------------------------------
+# TABLE RENDERING
+# ---------------------------------------------------
+
+# 8 columns over 1,000 attendance rows, rendered both ways
+TABLE_ROWS = 1000
+TABLE_COLUMNS = [
+    'attendance_date', 'student.roll_number', 'student.user_profile.user.username', 'student.course.code',
+    'subject.code', 'subject.name', 'status', 'remarks',
+]
+
+_DICT_VALUE_TEMPLATE = """{% load custom_filters %}{% for object in object_list %}<tr>{% for f in fields %}\
+<td>{{ object|dict_value:f }}</td>{% endfor %}</tr>{% endfor %}"""
+_TABLE_TEMPLATE = """{% for object, cells in rows %}<tr>{% for cell in cells %}\
+<td>{{ cell }}</td>{% endfor %}</tr>{% endfor %}"""
+
+
+@case('table_dict_value_filter', 'tables')
+def table_dict_value_filter(ctx):
+    from django.template import engines
+    template = engines['django'].from_string(_DICT_VALUE_TEMPLATE)
+    template.render({'object_list': Attendance.objects.all()[:TABLE_ROWS], 'fields': TABLE_COLUMNS})
+
+
+@case('table_compiled_accessors', 'tables')
+def table_compiled_accessors(ctx):
+    from django.template import engines
+    from .tables import Table
+    template = engines['django'].from_string(_TABLE_TEMPLATE)
+    table = Table(Attendance, TABLE_COLUMNS)
+    template.render({'rows': table.rows(table.apply(Attendance.objects.all())[:TABLE_ROWS])})
+
+
+# ---------------------------------------------------
+# SESSIONS
+# ---------------------------------------------------
+
+def _session_case(name, engine):
+    @case(f'session_{name}', 'sessions')
+    def session_request(ctx):
+        with override_settings(SESSION_ENGINE=engine):
+            client = ctx.session_client(engine)
+            response = client.get('/subjects/')
+            if response.status_code != 200:
+                raise CaseError(f"GET /subjects/ returned {response.status_code}{_cause(response)}")
+    return session_request
+
+
+for _name, _engine in [
+    ('db', 'django.contrib.sessions.backends.db'),
+    ('cached_db', 'django.contrib.sessions.backends.cached_db'),
+    ('cache', 'django.contrib.sessions.backends.cache'),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies'),
+]:
+    _session_case(_name, _engine)
+
+
+# ---------------------------------------------------
+# EXPORTS
+# ---------------------------------------------------
+
+@case('report_cards_course', 'exports')
+def report_cards_course(ctx):
+    """Build one course's report cards, then roll them back."""
+    from .reports import build_report_cards
+    with transaction.atomic():
+        build_report_cards(ctx.course, 'bench')
+        transaction.set_rollback(True)
+
+
+@case('ml_training_export', 'exports', requires=('pandas',))
+def ml_training_export(ctx):
+    from .ml.train_pass_fail import export_training_data
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # export_training_data writes to ml/ relative to the working directory
+        os.makedirs(os.path.join(tmp, 'ml'))
+        os.chdir(tmp)
+        try:
+            export_training_data()
+        finally:
+            os.chdir(cwd)
+
+
+@case('attendance_trend_weekly', 'exports')
+def attendance_trend_weekly(ctx):
+    from .analytics import attendance_trend
+    attendance_trend('week', course=ctx.course)
+
+
+# ---------------------------------------------------
+# WRITES
+# ---------------------------------------------------
+
+@case('bulk_attendance_course_day', 'writes')
+def bulk_attendance_course_day(ctx):
+    """Mark one day's attendance for a whole course, then roll it back."""
+    course = ctx.course
+    subject_ids = list(course.coursesubject_set.values_list('subject_id', flat=True))
+    rows = [
+        Attendance(student_id=student_id, subject_id=subject_id, attendance_date='2099-01-01', status='present')
+        for student_id in Student.objects.filter(course=course).values_list('pk', flat=True)
+        for subject_id in subject_ids
+    ]
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'attendance_date'],
+            update_fields=['status', 'updated_at'],
+        )
+        transaction.set_rollback(True)
@@ -0,0 +1,85 @@
+"""
+Capacity-checked enrollment.
+
+Counting a course's students and then saving a new one races: two
+admissions can both see the last free seat. ``enroll`` locks the course
+row (``SELECT ... FOR UPDATE``) for the count and the save, so admissions
+to the same course queue behind each other while other courses proceed.
+SQLite ignores the row lock, but its IMMEDIATE transactions (see
+``DATABASES``) already take the write lock before the count. ``activate``
+does the same for set-based status changes, and the term rollover checks
+successor courses the same way.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Course, Student
+
+# Only these students occupy a seat
+SEATED_STATUSES = ['active']
+
+
+class CourseFull(Exception):
+    def __init__(self, course):
+        super().__init__(f"{course.code} is full (capacity {course.capacity})")
+        self.course = course
+
+
+def seats_taken(course, exclude=None):
+    students = Student.objects.filter(course=course, status__in=SEATED_STATUSES)
+    if exclude is not None:
+        students = students.exclude(pk=exclude)
+    return students.count()
+
+
+def takes_seat(student, course):
+    """Whether saving ``student`` into ``course`` needs a seat it doesn't hold yet."""
+    if student.status not in SEATED_STATUSES:
+        return False
+    if student.pk is None:
+        return True
+    previous = Student.objects.filter(pk=student.pk).values_list('course_id', 'status').first()
+    return previous is None or previous != (course.pk, student.status)
+
+
+def check_seat(student, course):
+    """Raise ``CourseFull`` if ``course`` has no seat for ``student``; a hint, not a reservation."""
+    if takes_seat(student, course) and seats_taken(course, exclude=student.pk) >= course.capacity:
+        raise CourseFull(course)
+
+
+def enroll(student, course):
+    """Save ``student`` into ``course``, raising ``CourseFull`` when it has no free seat."""
+    with transaction.atomic():
+        course = Course.objects.select_for_update().get(pk=course.pk)
+        if takes_seat(student, course) and seats_taken(course, exclude=student.pk) >= course.capacity:
+            raise CourseFull(course)
+        student.course = course
+        student.save()
+    return student
+
+
+def free_seats(course):
+    """Seats left in ``course``; call with the course row locked."""
+    return max(course.capacity - seats_taken(course), 0)
+
+
+def activate(students):
+    """
+    Make ``students`` active, course by course under the course lock, while
+    seats last. Returns ``(activated, {course code: students refused})``.
+    """
+    waiting = {}
+    for pk, course_id in students.exclude(status__in=SEATED_STATUSES).values_list('pk', 'course_id').order_by('pk'):
+        waiting.setdefault(course_id, []).append(pk)
+    activated, refused = 0, {}
+    for course_id, student_ids in waiting.items():
+        with transaction.atomic():
+            course = Course.objects.select_for_update().get(pk=course_id)
+            seats = free_seats(course)
+            activated += Student.objects.filter(pk__in=student_ids[:seats]).update(
+                status=SEATED_STATUSES[0], updated_at=timezone.now(),
+            )
+        if len(student_ids) > seats:
+            refused[course.code] = len(student_ids) - seats
+    return activated, refused
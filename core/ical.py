@@ -0,0 +1,358 @@
+"""
+iCalendar (RFC 5545) feeds of timetables and exams.
+
+A feed covers one course, one teacher, or whatever the requesting user
+follows (their course, the courses of their children, or the slots they
+teach). Each weekly ``Timetable`` slot becomes one event recurring every
+week of the current academic year and each ``Exam`` of the year a single
+event. Calendar apps poll feeds every few minutes, so a feed's schedule
+version (``max(updated_at)`` and row count of its slots and exams, and the
+academic year) is cached for ``ICAL_VERSION_SECONDS`` and the rendered
+body is cached under that version: an unchanged feed answers
+``If-None-Match`` with a 304 without querying the schedule at all.
+Renaming a subject or teacher shows up once the body expires. Times are
+local to ``TIME_ZONE``, described by a VTIMEZONE with its transitions, so
+a weekly slot stays at the same wall-clock time across daylight saving.
+
+Calendar apps can't log in, so feed URLs carry a signed ``token`` naming
+the user they were issued to; access is checked again on every request.
+"""
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import academic_year
+from .models import Course, Exam, Student, Teacher, TeacherSubject, Timetable
+
+SALT = 'core.ical'
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+PRODID = '-//School Management System//Timetable//EN'
+
+
+class FeedError(Exception):
+    pass
+
+
+class Feed:
+    """
+    The slots and exams of one feed: ``key`` identifies it in the cache,
+    ``slots`` and ``exams`` are the filters (Q objects or expressions)
+    selecting its rows.
+    """
+
+    def __init__(self, key, name, slots, exams):
+        self.key = key
+        self.name = name
+        self.slots = slots
+        self.exams = exams
+
+    def version(self):
+        """Opaque version of the feed's schedule, from two aggregates cached briefly."""
+        cache_key = f'ical:version:{self.key}'
+        version = cache.get(cache_key)
+        if version is None:
+            label, start, _ = academic_year(timezone.localdate())
+            states = [
+                queryset.aggregate(modified=Max('updated_at'), count=Count('pk'))
+                for queryset in (Timetable.objects.filter(self.slots), self._exams(start))
+            ]
+            modified = max((state['modified'] for state in states if state['modified']), default=None)
+            parts = [self.key, label] + [f"{state['modified']}|{state['count']}" for state in states]
+            digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+            version = (digest, int(modified.timestamp()) if modified else None)
+            cache.set(cache_key, version, settings.ICAL_VERSION_SECONDS)
+        return version
+
+    def body(self, version):
+        """The rendered feed for ``version``, from the cache when it was rendered before."""
+        cache_key = f'ical:body:{self.key}:{version}'
+        body = cache.get(cache_key)
+        if body is None:
+            body = render(self)
+            cache.set(cache_key, body, settings.ICAL_BODY_SECONDS)
+        return body
+
+    def _exams(self, start):
+        return Exam.objects.filter(self.exams, exam_date__gte=start)
+
+
+def course_feed(course):
+    return Feed(f'course:{course.pk}', f'{course.code} timetable', Q(course=course), Q(course=course))
+
+
+def courses_feed(course_ids, name):
+    course_ids = sorted(course_ids)
+    return Feed(
+        f"courses:{','.join(map(str, course_ids))}", name,
+        Q(course_id__in=course_ids), Q(course_id__in=course_ids),
+    )
+
+
+def teacher_feed(teacher):
+    """A teacher's slots, and the exams of the subjects they teach in each course."""
+    same_class = {'teacher': teacher, 'course': OuterRef('course'), 'subject': OuterRef('subject')}
+    exams = Exists(TeacherSubject.objects.filter(**same_class)) | Exists(Timetable.objects.filter(**same_class))
+    return Feed(f'teacher:{teacher.pk}', f'{teacher} teaching timetable', Q(teacher=teacher), exams)
+
+
+def _role(user):
+    if user.is_superuser:
+        return 'admin'
+    profile = getattr(user, 'userprofile', None)
+    return profile.role if profile else None
+
+
+def _followed_courses(user, role):
+    if role == 'student':
+        return set(Student.objects.filter(user_profile__user=user).values_list('course_id', flat=True))
+    if role == 'parent':
+        return set(Student.objects.filter(parent__user_profile__user=user).values_list('course_id', flat=True))
+    return set()
+
+
+def resolve(user, kind, key=None):
+    """
+    The ``Feed`` of ``kind`` (``me``, ``course`` or ``teacher``) and ``key``
+    (a course code or employee id) for ``user``; raises ``FeedError`` when
+    it doesn't exist or ``user`` may not read it.
+    """
+    role = _role(user)
+    if kind == 'me':
+        if role == 'teacher':
+            teacher = Teacher.objects.select_related('user_profile__user').filter(user_profile__user=user).first()
+            if teacher is not None:
+                return teacher_feed(teacher)
+        courses = _followed_courses(user, role)
+        if not courses:
+            raise FeedError("Nothing to follow")
+        return courses_feed(courses, f'{user.get_full_name() or user.username} timetable')
+    if kind == 'course':
+        course = Course.objects.filter(code=key).first()
+        if course is None or (role not in ('admin', 'teacher') and course.pk not in _followed_courses(user, role)):
+            raise FeedError("No such course")
+        return course_feed(course)
+    if kind == 'teacher':
+        teacher = Teacher.objects.select_related('user_profile__user').filter(employee_id=key).first()
+        if teacher is None or role not in ('admin', 'teacher'):
+            raise FeedError("No such teacher")
+        return teacher_feed(teacher)
+    raise FeedError("Unknown feed")
+
+
+def make_token(user, kind, key=None):
+    return signing.dumps(user.pk, salt=f'{SALT}:{kind}:{key or ""}')
+
+
+def read_token(token, kind, key=None):
+    """The user id ``token`` was issued to for this feed, or None."""
+    try:
+        return signing.loads(token, salt=f'{SALT}:{kind}:{key or ""}')
+    except signing.BadSignature:
+        return None
+
+
+def feed_url(user, kind, key=None):
+    if kind == 'me':
+        path = reverse('calendar_me')
+    else:
+        path = reverse(f'calendar_{kind}', args=[key])
+    return f"{path}?token={make_token(user, kind, key)}"
+
+
+def feed_urls(user):
+    """``{label: url}`` of the feeds ``user`` can subscribe to."""
+    role = _role(user)
+    urls = {}
+    if role in ('student', 'parent', 'teacher'):
+        urls['me'] = feed_url(user, 'me')
+    if role in ('admin', 'teacher'):
+        courses = Course.objects.values_list('code', flat=True)
+    else:
+        courses = Course.objects.filter(pk__in=_followed_courses(user, role)).values_list('code', flat=True)
+    for code in courses.order_by('code'):
+        urls[f'course {code}'] = feed_url(user, 'course', code)
+    if role in ('admin', 'teacher'):
+        for employee_id in Teacher.objects.order_by('employee_id').values_list('employee_id', flat=True):
+            urls[f'teacher {employee_id}'] = feed_url(user, 'teacher', employee_id)
+    return urls
+
+
+# ---------------------------------------------------
+# RENDERING
+# ---------------------------------------------------
+
+def _escape(text):
+    return (
+        str(text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split ``line`` into 75-octet pieces, continued with a leading space, never inside a character."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    start, limit = 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode())
+        start, limit = end, 74
+    return '\r\n '.join(pieces)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _offset(delta):
+    seconds = int(delta.total_seconds())
+    sign = '-' if seconds < 0 else '+'
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{sign}{hours:02d}{minutes:02d}{f'{seconds:02d}' if seconds else ''}"
+
+
+def _transitions(tz, start, end):
+    """``[(utc datetime, offset before, offset after)]`` of ``tz``'s changes between two dates."""
+    changes = []
+    at = datetime.combine(start, time.min, dt_timezone.utc)
+    stop = datetime.combine(end, time.min, dt_timezone.utc)
+    offset = at.astimezone(tz).utcoffset()
+    while at < stop:
+        # Day by day, then bisect the day of a change down to the minute
+        following = at + timedelta(days=1)
+        if following.astimezone(tz).utcoffset() != offset:
+            low, high = at, following
+            while high - low > timedelta(minutes=1):
+                middle = low + (high - low) / 2
+                if middle.astimezone(tz).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            high = high.replace(second=0, microsecond=0)
+            changes.append((high, offset, high.astimezone(tz).utcoffset()))
+            offset = changes[-1][2]
+        at = following
+    return changes
+
+
+def _vtimezone(zone, start, end):
+    """VTIMEZONE lines for ``zone`` with every transition from ``start`` to ``end``."""
+    tz = ZoneInfo(zone)
+    # A day early, so the first observance covers the whole first local day
+    start -= timedelta(days=1)
+    first = datetime.combine(start, time.min, dt_timezone.utc).astimezone(tz)
+    observances = [(first.replace(tzinfo=None), first.utcoffset(), first.utcoffset(), first)]
+    for at, before, after in _transitions(tz, start, end):
+        # DTSTART of an observance is the local time it begins at, in the offset it replaces
+        observances.append(((at + before).replace(tzinfo=None), before, after, at.astimezone(tz)))
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{zone}']
+    for local, before, after, sample in observances:
+        kind = 'DAYLIGHT' if sample.dst() else 'STANDARD'
+        lines += [
+            f'BEGIN:{kind}',
+            f"DTSTART:{local.strftime('%Y%m%dT%H%M%S')}",
+            f'TZOFFSETFROM:{_offset(before)}',
+            f'TZOFFSETTO:{_offset(after)}',
+            *([f'TZNAME:{sample.tzname()}'] if sample.tzname() else []),
+            f'END:{kind}',
+        ]
+    lines.append('END:VTIMEZONE')
+    return lines
+
+
+def _stamp(day, at, zone):
+    """``;TZID=...:local`` or ``:...Z`` for the local date and time, as a property suffix."""
+    local = datetime.combine(day, at)
+    if settings.TIME_ZONE == 'UTC':
+        return f":{local.strftime('%Y%m%dT%H%M%S')}Z"
+    return f";TZID={zone}:{local.strftime('%Y%m%dT%H%M%S')}"
+
+
+def _slot_events(feed, start, end, zone):
+    until = _utc(timezone.make_aware(datetime.combine(end, time.max.replace(microsecond=0))))
+    slots = Timetable.objects.filter(feed.slots).values_list(
+        'pk', 'day_of_week', 'start_time', 'end_time', 'room', 'updated_at',
+        'course__code', 'subject__code', 'subject__name',
+        'teacher__user_profile__user__first_name', 'teacher__user_profile__user__last_name',
+    ).order_by('pk')
+    for pk, day, begins, ends, room, updated, course, code, subject, first, last in slots:
+        first_day = start + timedelta(days=(DAYS.index(day) - start.weekday()) % 7)
+        yield [
+            'BEGIN:VEVENT',
+            f'UID:timetable-{pk}@sms',
+            f'DTSTAMP:{_utc(updated)}',
+            f'DTSTART{_stamp(first_day, begins, zone)}',
+            f'DTEND{_stamp(first_day, ends, zone)}',
+            f'RRULE:FREQ=WEEKLY;BYDAY={day[:2].upper()};UNTIL={until}',
+            f'SUMMARY:{_escape(f"{subject} ({code})")}',
+            *([f'LOCATION:{_escape(room)}'] if room else []),
+            f'DESCRIPTION:{_escape(f"{course} with {first} {last}".strip())}',
+            'END:VEVENT',
+        ]
+
+
+def _exam_events(feed, start, zone):
+    exams = feed._exams(start).values_list(
+        'pk', 'exam_name', 'exam_type', 'exam_date', 'start_time', 'end_time', 'duration', 'room', 'total_marks',
+        'updated_at', 'course__code', 'subject__code', 'subject__name',
+    ).order_by('exam_date', 'start_time', 'pk')
+    for pk, name, kind, day, begins, ends, duration, room, total, updated, course, code, subject in exams:
+        if begins is None:
+            # No time set: an all-day event
+            when = [
+                f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+                f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",
+            ]
+        else:
+            if ends is None:
+                ends = (datetime.combine(day, begins) + timedelta(minutes=duration or 60)).time()
+            when = [f'DTSTART{_stamp(day, begins, zone)}', f'DTEND{_stamp(day, ends, zone)}']
+        yield [
+            'BEGIN:VEVENT',
+            f'UID:exam-{pk}@sms',
+            f'DTSTAMP:{_utc(updated)}',
+            *when,
+            f'SUMMARY:{_escape(f"{name}: {subject} ({code})")}',
+            *([f'LOCATION:{_escape(room)}'] if room else []),
+            f'DESCRIPTION:{_escape(f"{kind.title()} exam for {course}, {total} marks")}',
+            'CATEGORIES:EXAM',
+            'END:VEVENT',
+        ]
+
+
+def render(feed):
+    """The VCALENDAR text of ``feed`` for the current academic year."""
+    _, start, end = academic_year(timezone.localdate())
+    zone = settings.TIME_ZONE
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(feed.name)}',
+        f'X-WR-TIMEZONE:{zone}',
+    ]
+    if zone != 'UTC':
+        # Exams may be set a while past the end of the year
+        lines += _vtimezone(zone, start, end + timedelta(days=366))
+    for event in _slot_events(feed, start, end, zone):
+        lines.extend(event)
+    for event in _exam_events(feed, start, zone):
+        lines.extend(event)
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
@@ -0,0 +1,229 @@
+"""
+Streaming ingestion of gate reader logs.
+
+RFID and biometric readers append ``card id, timestamp`` lines to CSV or
+JSONL files. ``ingest_log`` reads a file from its ``LogCheckpoint`` offset
+through a generator pipeline (complete lines -> taps -> attendance marks),
+maps cards to students with an in-memory index and each tap to the
+``Timetable`` slot it falls in: present up to ``LATE_AFTER`` after the
+slot starts, late after that. Marks are folded in memory (the best tap per
+student, subject and day wins) and upserted every ``BATCH_LINES`` lines
+together with the new offset, so re-runs only read what was appended.
+"""
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Attendance, LogCheckpoint, Student, Timetable
+
+# A tap up to this long after a slot starts is on time
+LATE_AFTER = timedelta(minutes=10)
+# Taps this long before a slot starts count for it
+EARLY = timedelta(minutes=15)
+
+# Lines read between upserts (and checkpoints)
+BATCH_LINES = 200_000
+
+# Students whose existing attendance is read per query
+STUDENT_BATCH = 2000
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# A tap only improves a mark: absent < late < present. Leave is never touched.
+RANK = {'absent': 0, 'late': 1, 'present': 2}
+
+
+class IngestError(Exception):
+    pass
+
+
+def read_lines(path, offset=0):
+    """Yield ``(offset after the line, raw line)`` for each complete line from ``offset``."""
+    with open(path, 'rb') as fh:
+        fh.seek(offset)
+        for raw in fh:
+            if not raw.endswith(b'\n'):
+                return  # still being written; read on the next run
+            offset += len(raw)
+            yield offset, raw
+
+
+def _local_time(value, zone):
+    """Naive local datetime for a reader timestamp (ISO 8601 or epoch seconds)."""
+    if isinstance(value, (int, float)) or value.replace('.', '', 1).isdigit():
+        return datetime.fromtimestamp(float(value), tz=zone).replace(tzinfo=None)
+    when = datetime.fromisoformat(value)
+    # Naive stamps are already local, the common case; skip the conversion
+    return when if when.tzinfo is None else when.astimezone(zone).replace(tzinfo=None)
+
+
+def _parse_csv(text):
+    card, _, stamp = text.partition(',')
+    return card.strip().strip('"'), stamp.strip().strip('"')
+
+
+def _parse_jsonl(text):
+    record = json.loads(text)
+    return str(record.get('card_id', record.get('card', ''))), record.get('timestamp', record.get('ts', ''))
+
+
+def parse_taps(lines, fmt='csv'):
+    """
+    Yield ``(offset, card id, naive local datetime)``; blank, header and
+    malformed lines come through as ``(offset, None, None)`` so offsets
+    keep moving.
+    """
+    parse = _parse_jsonl if fmt == 'jsonl' else _parse_csv
+    zone = timezone.get_current_timezone()
+    for offset, raw in lines:
+        try:
+            card, stamp = parse(raw.decode('utf-8').strip())
+            yield offset, card, _local_time(stamp, zone)
+        except (ValueError, TypeError, AttributeError, UnicodeDecodeError):
+            yield offset, None, None
+
+
+def card_index():
+    """``{card id: (student id, course id)}`` for active students with a card."""
+    return {
+        card: (student_id, course_id)
+        for card, student_id, course_id in Student.objects.filter(card_id__isnull=False, status='active')
+        .values_list('card_id', 'pk', 'course_id')
+    }
+
+
+def slot_index():
+    """``{(course id, weekday): [(earliest tap, on-time until, end, subject id)]}``."""
+    day = datetime(2000, 1, 1)
+    slots = {}
+    for course_id, weekday, start, end, subject_id in Timetable.objects.values_list(
+        'course_id', 'day_of_week', 'start_time', 'end_time', 'subject_id',
+    ).order_by('start_time'):
+        start = datetime.combine(day, start)
+        slots.setdefault((course_id, DAYS.index(weekday)), []).append(
+            ((start - EARLY).time(), (start + LATE_AFTER).time(), end, subject_id),
+        )
+    return slots
+
+
+def resolve_taps(taps, cards, slots, stats):
+    """Yield ``(offset, (student id, subject id, date), status)``; the key is None for unusable taps."""
+    for offset, card, when in taps:
+        if card is None:
+            stats['malformed'] += 1
+            yield offset, None, None
+            continue
+        student = cards.get(card)
+        if student is None:
+            stats['unknown_cards'] += 1
+            yield offset, None, None
+            continue
+        at = when.time()
+        for earliest, on_time, end, subject_id in slots.get((student[1], when.weekday()), ()):
+            if earliest <= at <= end:
+                yield offset, (student[0], subject_id, when.date()), 'present' if at <= on_time else 'late'
+                break
+        else:
+            stats['outside_slots'] += 1
+            yield offset, None, None
+
+
+def _existing(keys):
+    """``{key: (pk, status)}`` of the attendance rows that exist for ``keys``."""
+    found = {}
+    student_ids = sorted({key[0] for key in keys})
+    dates = {key[2] for key in keys}
+    for i in range(0, len(student_ids), STUDENT_BATCH):
+        for pk, student_id, subject_id, day, status in Attendance.objects.filter(
+            student_id__in=student_ids[i:i + STUDENT_BATCH], attendance_date__in=dates,
+        ).values_list('pk', 'student_id', 'subject_id', 'attendance_date', 'status'):
+            found[(student_id, subject_id, day)] = (pk, status)
+    return found
+
+
+def _improves(current, status):
+    # No row yet, or a lower mark; leave (not in RANK) is never overwritten
+    return current is None or (current in RANK and RANK[current] < RANK[status])
+
+
+def _flush(checkpoint, marks, offset, lines, courses):
+    """
+    Upsert ``marks`` and move the checkpoint in one transaction; returns rows
+    written. ``courses`` maps student ids to their course for new rows.
+    """
+    with transaction.atomic():
+        existing = _existing(marks) if marks else {}
+        rows, changes = [], {}
+        for key, status in marks.items():
+            pk, current = existing.get(key, (None, None))
+            if _improves(current, status):
+                student_id, subject_id, day = key
+                rows.append(Attendance(
+                    student_id=student_id, course_id=courses[student_id], subject_id=subject_id,
+                    attendance_date=day, status=status,
+                ))
+                if pk is not None:
+                    changes[pk] = {'status': [current, status]}
+        Attendance.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'attendance_date'],
+            update_fields=['status', 'updated_at'],
+        )
+        # The upsert bypasses save(); record the rows it overwrote
+        audit.record(Attendance, changes, 'bulk_update')
+        checkpoint.offset = offset
+        checkpoint.lines += lines
+        checkpoint.save(update_fields=['offset', 'lines', 'inode', 'updated_at'])
+    return len(rows)
+
+
+def ingest_log(path, fmt=None, batch_lines=BATCH_LINES, follow=False, poll=1.0, stop=None):
+    """
+    Load the lines appended to ``path`` since its checkpoint. With
+    ``follow`` keep tailing it every ``poll`` seconds until ``stop()`` is
+    true. Returns counts of lines, rows written and unusable taps.
+    """
+    path = os.path.abspath(path)
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        raise IngestError(f"Unknown log format {fmt!r}")
+    checkpoint, _ = LogCheckpoint.objects.get_or_create(path=path)
+    stats = {'lines': 0, 'written': 0, 'malformed': 0, 'unknown_cards': 0, 'outside_slots': 0}
+
+    while True:
+        try:
+            status = os.stat(path)
+        except FileNotFoundError:
+            if not follow:
+                raise IngestError(f"No such log: {path}") from None
+            status = None
+        if status is not None and (status.st_ino != checkpoint.inode or status.st_size < checkpoint.offset):
+            # Rotated or truncated: the file at this path is a new log
+            checkpoint.inode, checkpoint.offset = status.st_ino, 0
+        if status is not None and status.st_size > checkpoint.offset:
+            # Rebuilt per pass so cards issued while tailing are picked up
+            cards, slots = card_index(), slot_index()
+            courses = dict(cards.values())
+            marks = {}
+            offset, pending = checkpoint.offset, 0
+            for offset, key, mark in resolve_taps(parse_taps(read_lines(path, offset), fmt), cards, slots, stats):
+                pending += 1
+                if key is not None and RANK[mark] > RANK.get(marks.get(key), -1):
+                    marks[key] = mark
+                if pending >= batch_lines:
+                    stats['written'] += _flush(checkpoint, marks, offset, pending, courses)
+                    stats['lines'] += pending
+                    marks, pending = {}, 0
+            if pending or offset != checkpoint.offset:
+                stats['written'] += _flush(checkpoint, marks, offset, pending, courses)
+                stats['lines'] += pending
+        if not follow or (stop is not None and stop()):
+            return stats
+        time.sleep(poll)
@@ -0,0 +1,187 @@
+"""
+In-process request and query metrics.
+
+``QueryInstrumentationMiddleware`` feeds every request's timings into the process-wide ``registry``, which keeps bucketed histograms per
+view (wall time, query count, SQL time), the most repeated query shapes
+and the slowest individual queries. ``MetricsView`` exposes the snapshot as
+JSON or in the Prometheus text format.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Histogram upper bounds; the last bucket is +Inf
+TIME_BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+QUERY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+SLOW_QUERY_LIMIT = 50
+DUPLICATE_LIMIT = 20
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def fingerprint(sql):
+    """Normalise a SQL statement so repeated shapes compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q``-th percentile."""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        seen = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            seen += count
+            yield bound, seen
+
+
+class QueryCollector:
+    """``connection.execute_wrapper`` callable that records every query."""
+
+    def __init__(self, slow_query_ms):
+        self.slow_query_ms = slow_query_ms
+        self.count = 0
+        self.time_ms = 0.0
+        self.fingerprints = Counter()
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.time_ms += elapsed
+            self.fingerprints[fingerprint(sql)] += 1
+            if elapsed >= self.slow_query_ms:
+                self.slow.append((elapsed, sql))
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.wall_ms = Histogram(TIME_BUCKETS_MS)
+        self.sql_ms = Histogram(TIME_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.duplicates = Counter()
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'wall_ms': _summary(self.wall_ms),
+            'sql_ms': _summary(self.sql_ms),
+            'queries': _summary(self.queries),
+            'duplicate_queries': [
+                {'sql': sql, 'repeats': repeats}
+                for sql, repeats in self.duplicates.most_common(DUPLICATE_LIMIT)
+            ],
+        }
+
+
+def _summary(histogram):
+    summary = {'count': histogram.count, 'sum': round(histogram.total, 3)}
+    for q in (50, 95, 99):
+        value = histogram.percentile(q)
+        # None: beyond the largest bucket
+        summary[f'p{q}'] = None if value == float('inf') else value
+    return summary
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.views = {}
+            self.slow_queries = []
+
+    def record(self, view, wall_ms, collector):
+        with self._lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = ViewStats()
+            stats.requests += 1
+            stats.wall_ms.observe(wall_ms)
+            stats.sql_ms.observe(collector.time_ms)
+            stats.queries.observe(collector.count)
+            for sql, repeats in collector.fingerprints.items():
+                # Same query shape more than once in a request: likely N+1
+                if repeats > 1:
+                    stats.duplicates[sql] += repeats - 1
+
+            for elapsed, sql in collector.slow:
+                self.slow_queries.append({'view': view, 'ms': round(elapsed, 3), 'sql': sql})
+            if len(self.slow_queries) > SLOW_QUERY_LIMIT:
+                self.slow_queries.sort(key=lambda q: q['ms'], reverse=True)
+                del self.slow_queries[SLOW_QUERY_LIMIT:]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'views': {view: stats.as_dict() for view, stats in sorted(self.views.items())},
+                'slow_queries': sorted(self.slow_queries, key=lambda q: q['ms'], reverse=True),
+            }
+
+    def prometheus(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+        metrics = [
+            ('sms_view_duration_ms', 'Wall time per request in milliseconds.', 'wall_ms'),
+            ('sms_view_sql_duration_ms', 'SQL time per request in milliseconds.', 'sql_ms'),
+            ('sms_view_queries', 'Queries per request.', 'queries'),
+        ]
+        with self._lock:
+            for name, help_text, attr in metrics:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, stats in sorted(self.views.items()):
+                    histogram = getattr(stats, attr)
+                    label = _label(view)
+                    for bound, seen in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append(f'{name}_bucket{{view="{label}",le="{le}"}} {seen}')
+                    lines.append(f'{name}_sum{{view="{label}"}} {histogram.total:.3f}')
+                    lines.append(f'{name}_count{{view="{label}"}} {histogram.count}')
+
+            lines.append('# HELP sms_view_duplicate_queries_total Repeated query shapes within a request.')
+            lines.append('# TYPE sms_view_duplicate_queries_total counter')
+            for view, stats in sorted(self.views.items()):
+                lines.append(f'sms_view_duplicate_queries_total{{view="{_label(view)}"}} {sum(stats.duplicates.values())}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
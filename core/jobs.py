@@ -0,0 +1,222 @@
+"""
+Database-backed background jobs.
+
+Long operations are registered with ``@task`` (see ``core.tasks``) and
+queued with ``enqueue``, which returns the ``Job`` at once; the caller
+hands its id to the UI, which polls ``jobs/<id>/`` for progress.
+``manage.py run_worker`` claims queued rows and runs them in a thread or
+process pool. The queue is just the ``Job`` table, so no broker is needed.
+"""
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+# Candidates fetched per claim attempt; others may win some of them
+CLAIM_BATCH = 10
+
+# Seconds between a worker's sweeps for jobs left behind by dead workers
+REQUEUE_EVERY = 60
+
+
+def task(name, max_attempts=3):
+    """Register ``func(job, **payload)`` as the task ``name``."""
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def load_tasks():
+    import_module('core.tasks')
+
+
+def enqueue(name, payload=None, user=None, priority=0, delay=None, max_attempts=None):
+    """Queue the task ``name`` and return its ``Job``."""
+    load_tasks()
+    if name not in TASKS:
+        raise LookupError(f"Unknown task {name!r}")
+    return Job.objects.create(
+        task=name,
+        payload=payload or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+        priority=priority,
+        run_after=timezone.now() + timedelta(seconds=delay or 0),
+        max_attempts=max_attempts or TASKS[name].max_attempts,
+    )
+
+
+def set_progress(job, progress, message=''):
+    """
+    Record progress (0-100) for a running job; safe to call often. It is
+    also the job's heartbeat: ``requeue_stale`` leaves it alone while this
+    keeps being called.
+    """
+    job.progress = max(0, min(100, int(progress)))
+    job.message = message[:255]
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message, updated_at=timezone.now())
+
+
+def reporter(job, message, start=0, end=100):
+    """
+    A ``progress(done, total)`` callback for long loops that maps their
+    progress onto ``start``..``end`` percent of ``job``.
+    """
+    def progress(done, total):
+        set_progress(job, start + (end - start) * done // max(total, 1), message)
+    return progress
+
+
+@contextmanager
+def heartbeat(job, every=None):
+    """
+    Keep ``job`` looking alive from a side thread through one long step that
+    can't report progress (a model fit, say); loops should use ``reporter``.
+    """
+    stop = threading.Event()
+    interval = every or max(settings.JOB_STALE_SECONDS / 4, 1)
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                Job.objects.filter(pk=job.pk, status='running').update(updated_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def claim(worker):
+    """
+    Mark the next due job as running for ``worker`` and return it, or
+    ``None`` when the queue is empty.
+
+    The claim is a conditional UPDATE, so two workers can never take the
+    same row on any backend, without holding a lock while the job runs.
+    """
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .order_by('-priority', 'run_after', 'pk')
+        .values_list('pk', flat=True)[:CLAIM_BATCH]
+    )
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome, scheduling a retry on failure."""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        result = func(job, **job.payload)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', error=error, locked_by=None, locked_at=None,
+                run_after=now + timedelta(seconds=delay), updated_at=now,
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', error=error, locked_by=None, locked_at=None, finished_at=now, updated_at=now,
+            )
+        return False
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(
+        status='succeeded', progress=100, result=result, error=None,
+        locked_by=None, locked_at=None, finished_at=now, updated_at=now,
+    )
+    return True
+
+
+def requeue_stale(seconds=None):
+    """
+    Queue again (or fail, when out of attempts) jobs left running by a
+    worker that died: running jobs neither claimed nor reporting progress
+    (``updated_at``) for ``JOB_STALE_SECONDS``. Returns the number of jobs
+    recovered.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=seconds or settings.JOB_STALE_SECONDS)
+    stale = Job.objects.filter(status='running', updated_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='Worker stopped before the job finished',
+        locked_by=None, locked_at=None, finished_at=now, updated_at=now,
+    )
+    queued = stale.update(status='queued', locked_by=None, locked_at=None, run_after=now, updated_at=now)
+    return failed + queued
+
+
+def work(worker, poll=1.0, once=False, stop=None, stale_after=None):
+    """
+    Claim and run jobs until ``stop`` is set (or, with ``once``, until the
+    queue is empty), requeueing stale jobs (see ``requeue_stale``) every
+    ``REQUEUE_EVERY`` seconds between jobs. Returns the number of jobs run.
+    """
+    load_tasks()
+    stop = stop or threading.Event()
+    processed = 0
+    swept = time.monotonic()
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            if time.monotonic() - swept >= REQUEUE_EVERY:
+                requeue_stale(stale_after)
+                swept = time.monotonic()
+            job = claim(worker)
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll)
+                continue
+            run_job(job)
+            processed += 1
+    finally:
+        connections.close_all()
+    return processed
+
+
+def job_status(job):
+    """JSON-ready summary of a job for pollers."""
+    return {
+        'id': job.pk,
+        'task': job.task,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result if job.status == 'succeeded' else None,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from core.archive import BATCH_SIZE, ArchiveError, academic_year, archive_year
+from core.models import Attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attendance from closed academic years out of the live table into "
+        "the archive (ARCHIVE_DATABASE_URL, or an archive table). The daily "
+        "rollups are kept. Without arguments every closed year is archived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("years", nargs="*", help='Academic years to archive, e.g. "2024-2025"')
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would move")
+
+    def handle(self, *args, **options):
+        years = options["years"] or self.closed_years()
+        if not years:
+            self.stdout.write("No closed academic years in the live attendance table.")
+            return
+
+        for label in years:
+            started = time.perf_counter()
+            try:
+                moved = archive_year(label, batch_size=options["batch_size"], dry_run=options["dry_run"])
+            except ArchiveError as exc:
+                raise CommandError(str(exc))
+            verb = "Would move" if options["dry_run"] else "Moved"
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: {verb} {moved} attendance rows in {time.perf_counter() - started:.2f}s"
+            ))
+
+    def closed_years(self):
+        first = Attendance.objects.aggregate(first=Min("attendance_date"))["first"]
+        if first is None:
+            return []
+        current, _, _ = academic_year(timezone.localdate())
+        label, _, end = academic_year(first)
+        years = []
+        while label != current:
+            years.append(label)
+            label, _, end = academic_year(end + timedelta(days=1))
+        return years
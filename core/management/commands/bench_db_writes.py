@@ -0,0 +1,134 @@
+import datetime
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from core.benchmarks import percentiles
+from core.models import Attendance, Course, Student, Subject, UserProfile
+
+PREFIX = "bench-writes"
+
+# SQLite's own defaults, for comparison with the tuned profile
+BASELINE_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'mmap_size': 0,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure attendance write throughput with concurrent writers against the "
+        "configured database profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads")
+        parser.add_argument("--writes", type=int, default=200, help="Writes per writer")
+        parser.add_argument(
+            "--baseline", action="store_true",
+            help=(
+                "SQLite only: run with SQLite's defaults (default pragmas, the sqlite3 module's 5s "
+                "timeout and deferred transactions) instead of the configured profile"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["baseline"]:
+            if connection.vendor != "sqlite":
+                raise CommandError("--baseline compares SQLite profiles; the default database is not SQLite")
+            settings.SQLITE_PRAGMAS = BASELINE_PRAGMAS
+            # Drop the configured timeout and IMMEDIATE transactions too
+            connection.settings_dict["OPTIONS"] = {}
+        # Throwaway rows: keep them (and the flush thread) out of the audit trail
+        settings.AUDIT_ENABLED = False
+        connections.close_all()
+
+        students, subject = self._setup(options["writers"])
+        try:
+            result = self._run(students, subject, options["writes"])
+        finally:
+            self._teardown()
+
+        profile = "baseline" if options["baseline"] else "configured"
+        self.stdout.write(f"Backend:     {connection.vendor} ({profile} profile)")
+        self.stdout.write(f"Writers:     {options['writers']} x {options['writes']} writes")
+        self.stdout.write(f"Committed:   {result['committed']}")
+        self.stdout.write(f"Lock errors: {result['errors']}")
+        self.stdout.write(f"Elapsed:     {result['elapsed']:.2f}s")
+        self.stdout.write(f"Latency:     p50 {result['p50']:.2f}ms, p95 {result['p95']:.2f}ms")
+        self.stdout.write(self.style.SUCCESS(f"Throughput:  {result['committed'] / result['elapsed']:.0f} writes/s"))
+
+    def _setup(self, writers):
+        self._teardown()
+        course = Course.objects.create(name=PREFIX, code=PREFIX, semester=1)
+        subject = Subject.objects.create(name=PREFIX, code=PREFIX)
+        students = []
+        for i in range(writers):
+            user = User.objects.create(username=f"{PREFIX}-{i}")
+            profile = UserProfile.objects.create(user=user, role="student")
+            students.append(Student.objects.create(
+                user_profile=profile, student_id=f"{PREFIX}-{i}", roll_number=f"{PREFIX}-{i}", course=course,
+            ))
+        return students, subject
+
+    def _teardown(self):
+        Attendance.objects.filter(subject__code=PREFIX).delete()
+        Student.objects.filter(student_id__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+        Course.objects.filter(code=PREFIX).delete()
+        Subject.objects.filter(code=PREFIX).delete()
+
+    def _run(self, students, subject, writes):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        start_date = datetime.date(2000, 1, 1)
+        barrier = threading.Barrier(len(students))
+
+        def writer(student):
+            local = []
+            failed = 0
+            barrier.wait()
+            try:
+                for i in range(writes):
+                    started = time.perf_counter()
+                    try:
+                        # One short transaction per write, like a request would
+                        with transaction.atomic():
+                            Attendance.objects.create(
+                                student=student,
+                                subject=subject,
+                                attendance_date=start_date + datetime.timedelta(days=i),
+                                status="present",
+                            )
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    local.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=writer, args=(s,)) for s in students]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        p50, p95 = percentiles(latencies)
+        return {
+            "committed": len(latencies),
+            "errors": sum(errors),
+            "elapsed": elapsed,
+            "p50": p50,
+            "p95": p95,
+        }
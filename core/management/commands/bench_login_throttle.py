@@ -0,0 +1,83 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.benchmarks import collect_queries, percentiles
+from core.throttle import unlock
+
+PREFIX = "bench-login"
+
+# TEST-NET-1, never a real client
+ADDRESS = "192.0.2.1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the CPU cost of a login attempt that reaches the password hasher "
+        "against one turned away by the login throttle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rejected", type=int, default=500, help="Throttled attempts to time")
+
+    def handle(self, *args, **options):
+        user = self._setup()
+        client = Client(REMOTE_ADDR=ADDRESS)
+        data = {"username": user.username, "password": "wrong password"}
+        # Every throttled attempt would otherwise log a 429 warning
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                hashed = self._time(client, data, settings.LOGIN_THROTTLE_USER_ATTEMPTS, expect=(200, 429))
+                rejected = self._time(client, data, options["rejected"], expect=(429,))
+        finally:
+            request_logger.setLevel(level)
+            self._teardown()
+
+        self.stdout.write(f"Hasher:            {settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1]}")
+        self._report("Checked attempts", hashed)
+        self._report("Rejected attempts", rejected)
+        self.stdout.write(self.style.SUCCESS(
+            f"A rejected attempt costs {rejected['cpu'] / hashed['cpu'] * 100:.2f}% of the CPU of a checked one "
+            f"({hashed['cpu'] / rejected['cpu']:.0f}x less)"
+        ))
+
+    def _report(self, label, result):
+        self.stdout.write(
+            f"{label + ':':<18} {result['count']:>5} x  CPU {result['cpu']:.3f}ms  "
+            f"wall p50 {result['p50']:.3f}ms p95 {result['p95']:.3f}ms  {result['queries']} queries"
+        )
+
+    def _time(self, client, data, count, expect):
+        cpu = 0.0
+        wall = []
+        queries = 0
+        for _ in range(count):
+            with collect_queries() as collector:
+                started, started_cpu = time.perf_counter(), time.process_time()
+                response = client.post("/login/", data)
+                cpu += time.process_time() - started_cpu
+                wall.append((time.perf_counter() - started) * 1000)
+            if response.status_code not in expect:
+                raise RuntimeError(f"Login returned {response.status_code}")
+            queries = max(queries, collector.count)
+        p50, p95 = percentiles(wall)
+        return {"count": count, "cpu": cpu / count * 1000, "p50": p50, "p95": p95, "queries": queries}
+
+    def _setup(self):
+        self._teardown()
+        user = User.objects.create(username=PREFIX)
+        user.set_password("correct password")
+        user.save()
+        return user
+
+    def _teardown(self):
+        unlock(ADDRESS, PREFIX)
+        User.objects.filter(username=PREFIX).delete()
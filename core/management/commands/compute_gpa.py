@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count
+
+from core.models import AcademicStanding, Course
+from core.standing import BATCH_SIZE, HONOR_ROLL_CGPA, refresh_course, refresh_standings
+
+
+class Command(BaseCommand):
+    help = (
+        "Update credit-weighted GPA/CGPA standings for students whose results "
+        "changed since the last run. Run it from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute every course")
+        parser.add_argument("--course", action="append", help="Recompute only this course code (repeatable)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Students computed per query")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["course"]:
+            courses = list(Course.objects.filter(code__in=options["course"]))
+            missing = set(options["course"]) - {c.code for c in courses}
+            if missing:
+                raise CommandError(f"Unknown courses: {', '.join(sorted(missing))}")
+            saved = sum(refresh_course(course) for course in courses)
+        else:
+            saved = refresh_standings(rebuild=options["rebuild"], batch_size=options["batch_size"])
+
+        stats = AcademicStanding.objects.aggregate(students=Count("id"), cgpa=Avg("cgpa"))
+        honors = AcademicStanding.objects.filter(cgpa__gte=HONOR_ROLL_CGPA).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved {saved} standings in {time.perf_counter() - started:.2f}s "
+            f"({stats['students']} students, mean CGPA {stats['cgpa'] or 0:.2f}, {honors} on the honor roll)"
+        ))
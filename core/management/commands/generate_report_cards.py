@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Course, ReportCard
+from core.reports import RENDER_FORMATS, build_report_cards, render_report_cards
+
+
+class Command(BaseCommand):
+    help = "Compute report cards for a course (or every course) and optionally render them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("term", help='Term label stored on the report cards, e.g. "2025-S1"')
+        parser.add_argument("--course", help="Course code (default: every course)")
+        parser.add_argument("--start", help="First day of the term (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Last day of the term (YYYY-MM-DD)")
+        parser.add_argument("--render", choices=RENDER_FORMATS, help="Render the cards after computing them")
+        parser.add_argument("--output", default="report_cards", help="Directory for rendered files")
+        parser.add_argument("--workers", type=int, help="Rendering processes (default: CPU count)")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = courses.filter(code=options["course"])
+            if not courses.exists():
+                raise CommandError(f"Course {options['course']!r} does not exist")
+
+        if options["render"] == "pdf":
+            try:
+                import weasyprint  # noqa: F401
+            except ImportError:
+                raise CommandError("PDF rendering requires weasyprint (pip install weasyprint)")
+
+        term = options["term"]
+        started = time.perf_counter()
+        total = 0
+        for course in courses:
+            cards = build_report_cards(course, term, start=options["start"], end=options["end"])
+            total += len(cards)
+            self.stdout.write(f"{course.code}: {len(cards)} report cards")
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed {total} report cards in {time.perf_counter() - started:.2f}s"
+        ))
+
+        if options["render"]:
+            started = time.perf_counter()
+            paths = render_report_cards(
+                ReportCard.objects.filter(course__in=courses, term=term),
+                options["output"],
+                fmt=options["render"],
+                workers=options["workers"],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Rendered {len(paths)} files to {options['output']} in {time.perf_counter() - started:.2f}s"
+            ))
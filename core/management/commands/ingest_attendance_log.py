@@ -0,0 +1,51 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ingest import BATCH_LINES, IngestError, ingest_log
+
+
+class Command(BaseCommand):
+    help = (
+        "Load RFID/biometric gate reader logs (card id, timestamp as CSV or JSONL) "
+        "into attendance, continuing from where the previous run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Log files")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension")
+        parser.add_argument("--batch-lines", type=int, default=BATCH_LINES, help="Lines read per upsert")
+        parser.add_argument("--follow", action="store_true", help="Keep tailing a single log until stopped")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between checks with --follow")
+
+    def handle(self, *args, **options):
+        if options["follow"] and len(options["paths"]) > 1:
+            raise CommandError("--follow takes a single log")
+        stopping = []
+        if options["follow"]:
+            signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+
+        for path in options["paths"]:
+            started = time.perf_counter()
+            try:
+                stats = ingest_log(
+                    path, fmt=options["format"], batch_lines=options["batch_lines"],
+                    follow=options["follow"], poll=options["poll"], stop=lambda: bool(stopping),
+                )
+            except IngestError as exc:
+                raise CommandError(str(exc))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopped; the next run continues from the last checkpoint.")
+                return
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {stats['lines']} lines in {elapsed:.2f}s "
+                f"({stats['lines'] / elapsed if elapsed else 0:.0f} lines/s), {stats['written']} attendance rows written"
+            ))
+            skipped = stats["malformed"] + stats["unknown_cards"] + stats["outside_slots"]
+            if skipped:
+                self.stdout.write(
+                    f"  skipped {stats['malformed']} malformed lines, {stats['unknown_cards']} unknown cards, "
+                    f"{stats['outside_slots']} taps outside timetable slots"
+                )
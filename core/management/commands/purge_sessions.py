@@ -0,0 +1,40 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired rows from the django_session table in small batches, "
+        "so the purge never holds the write lock for long. Run it from cron, "
+        "or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per statement")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to wait between batches")
+        parser.add_argument("--every", type=int, help="Repeat the purge every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            deleted = self.purge(options["batch_size"], options["pause"])
+            self.stdout.write(f"Deleted {deleted} expired sessions in {time.perf_counter() - started:.2f}s")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
+
+    def purge(self, batch_size, pause):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list("session_key", flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            time.sleep(pause)
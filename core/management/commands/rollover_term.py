@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Course
+from core.rollover import RolloverError, apply_rollover, plan_rollover
+
+
+class Command(BaseCommand):
+    help = (
+        "End-of-term rollover: move active students to the next semester's course "
+        "(creating it if needed), graduate final-semester students and copy subject "
+        "and teacher mappings forward, in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", action="append", help="Course code to roll over (repeatable; default: all)")
+        parser.add_argument(
+            "--final-semester", type=int,
+            help="Students in courses at this semester graduate (default: ROLLOVER_FINAL_SEMESTER)",
+        )
+        parser.add_argument("--term", help="Term being closed, e.g. 2025-2026/T1 (default: the current term)")
+        parser.add_argument("--dry-run", action="store_true", help="Show the plan without changing anything")
+
+    def handle(self, *args, **options):
+        courses = None
+        if options["course"]:
+            courses = list(Course.objects.filter(code__in=options["course"]))
+            missing = set(options["course"]) - {c.code for c in courses}
+            if missing:
+                raise CommandError(f"Unknown courses: {', '.join(sorted(missing))}")
+
+        try:
+            plan = plan_rollover(courses, final_semester=options["final_semester"], term=options["term"])
+        except RolloverError as exc:
+            raise CommandError(str(exc))
+
+        if options["dry_run"]:
+            for line in plan.describe():
+                self.stdout.write(line)
+            summary = plan.summary()
+        else:
+            started = time.perf_counter()
+            try:
+                summary = apply_rollover(plan)
+            except RolloverError as exc:
+                raise CommandError(str(exc))
+            plan.timings["total_apply"] = time.perf_counter() - started
+
+        for key, value in summary.items():
+            self.stdout.write(f"{key.replace('_', ' ').capitalize():<26} {value}")
+        for phase, seconds in plan.timings.items():
+            self.stdout.write(f"  {phase:<24} {seconds * 1000:>9.1f}ms")
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was changed."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Rollover complete."))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.analytics import refresh_attendance_daily
+
+
+class Command(BaseCommand):
+    help = "Fold new or changed attendance rows into the AttendanceDaily rollup."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Ignore the watermark and recompute every day")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days, rows = refresh_attendance_daily(rebuild=options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {days} days ({rows} rollup rows) in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,107 @@
+import json
+import logging
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmarks import CASES, BenchContext, missing_requirements, run_case
+
+
+class Command(BaseCommand):
+    help = "Time key code paths against the current database and save the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("cases", nargs="*", help="Case names or groups to run (default: all)")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed iterations per case")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed iterations per case")
+        parser.add_argument("--output", help="Write results to this JSON file")
+        parser.add_argument("--compare", help="Previous results JSON to compare against")
+        parser.add_argument("--list", action="store_true", help="List the available cases")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for name, func in CASES.items():
+                self.stdout.write(f"{func.group:<12} {name}")
+            return
+
+        selected = {
+            name: func for name, func in CASES.items()
+            if not options["cases"] or name in options["cases"] or func.group in options["cases"]
+        }
+        if not selected:
+            raise CommandError("No benchmark cases match %s" % ", ".join(options["cases"]))
+
+        baseline = {}
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                baseline = json.load(fh)["results"]
+
+        ctx = BenchContext()
+        results = {}
+        # A failing page is reported once below, not with a logged traceback per request
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            # The test client talks to "testserver"
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for name, func in selected.items():
+                    missing = missing_requirements(func)
+                    if missing:
+                        results[name] = {"group": func.group, "skipped": f"needs {', '.join(missing)}"}
+                    else:
+                        try:
+                            results[name] = run_case(func, ctx, options["repeat"], options["warmup"])
+                        except Exception as exc:
+                            results[name] = {"group": func.group, "error": f"{type(exc).__name__}: {exc}"}
+                    self._report(name, results[name], baseline.get(name))
+        finally:
+            request_logger.setLevel(level)
+
+        failed = sum("error" in result for result in results.values())
+        skipped = sum("skipped" in result for result in results.values())
+        if failed or skipped:
+            self.stdout.write(self.style.WARNING(
+                f"{len(results) - failed - skipped} timed, {failed} failed (not timed), {skipped} skipped"
+            ))
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({"meta": self._meta(options), "results": results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['output']}"))
+
+    def _report(self, name, result, previous):
+        if "error" in result:
+            self.stdout.write(self.style.ERROR(f"{name:<30} failed: {result['error']}"))
+            return
+        if "skipped" in result:
+            self.stdout.write(self.style.WARNING(f"{name:<30} skipped: {result['skipped']}"))
+            return
+        line = f"{name:<30} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  {result['queries']:>5} queries"
+        if previous and "p50_ms" in previous and previous["p50_ms"]:
+            change = (result["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"] * 100
+            line += f"  ({change:+.1f}% p50, {result['queries'] - previous['queries']:+d} queries)"
+        self.stdout.write(line)
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "warmup": options["warmup"],
+        }
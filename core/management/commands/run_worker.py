@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import requeue_stale, work
+
+
+def _process_main(worker, poll, once, stop, stale_after):
+    # Ctrl-C reaches every process in the group; let the parent ask workers
+    # to stop between jobs instead of interrupting one half way
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(worker, poll=poll, once=once, stop=stop, stale_after=stale_after)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs from the Job table with a pool of worker "
+        "threads or processes. Stop with Ctrl-C or SIGTERM; running jobs finish first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time")
+        parser.add_argument(
+            "--pool", choices=["thread", "process"], default="thread",
+            help="Run jobs in threads (I/O-bound work) or processes (CPU-bound work)",
+        )
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+        parser.add_argument(
+            "--stale-after", type=int,
+            help=(
+                "Requeue running jobs that haven't reported progress for this many seconds "
+                "(default: JOB_STALE_SECONDS); checked at start and every minute"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        if concurrency < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        recovered = requeue_stale(options["stale_after"])
+        if recovered:
+            self.stdout.write(self.style.WARNING(f"Recovered {recovered} jobs from stopped workers"))
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        if options["pool"] == "process":
+            # Children must open their own database connections
+            connections.close_all()
+            stop = multiprocessing.Event()
+            workers = [
+                multiprocessing.Process(
+                    target=_process_main,
+                    args=(f"{prefix}:{i}", options["poll"], options["once"], stop, options["stale_after"]),
+                )
+                for i in range(concurrency)
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=work, args=(f"{prefix}:{i}",),
+                    kwargs={
+                        "poll": options["poll"], "once": options["once"], "stop": stop,
+                        "stale_after": options["stale_after"],
+                    },
+                )
+                for i in range(concurrency)
+            ]
+
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        self.stdout.write(f"Started {concurrency} {options['pool']} workers")
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running jobs to finish")
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.models import RiskScore
+from core.risk import BATCH_SIZE, refresh_risk_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Update at-risk scores for students whose attendance, results or "
+        "submissions changed since the last run. Run it from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Rescore every student")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Students scored per batch")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        scored = refresh_risk_scores(rebuild=options["rebuild"], batch_size=options["batch_size"])
+        levels = dict(RiskScore.objects.values_list("level").annotate(count=Count("id")))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {scored} students in {time.perf_counter() - started:.2f}s "
+            f"(high {levels.get('high', 0)}, medium {levels.get('medium', 0)}, low {levels.get('low', 0)})"
+        ))
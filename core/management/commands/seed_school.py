@@ -0,0 +1,300 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import (
+    Assignment, AssignmentSubmission, Attendance, Course, CourseSubject, Exam,
+    Parent, Result, Student, Subject, Teacher, TeacherSubject, Timetable, UserProfile,
+)
+
+PREFIX = "seed"
+PASSWORD = "password"
+
+PROGRAMS = ["BSc Computer Science", "BBA", "BSc Physics", "BA Economics", "BSc Mathematics", "BCom"]
+FIRST_NAMES = ["Aarav", "Sita", "Ram", "Gita", "Hari", "Anita", "Bikash", "Puja", "Suman", "Rita", "Nabin", "Asha"]
+LAST_NAMES = ["Sharma", "Thapa", "Gurung", "Shrestha", "Rai", "Karki", "Adhikari", "Tamang", "Magar", "Joshi"]
+DAYS = ["mon", "tue", "wed", "thu", "fri"]
+SLOTS = [datetime.time(9), datetime.time(10), datetime.time(11), datetime.time(13), datetime.time(14)]
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic institution for load testing and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=4, help="Programs (courses)")
+        parser.add_argument("--sections", type=int, default=2, help="Sections per course")
+        parser.add_argument("--students", type=int, default=40, help="Students per section")
+        parser.add_argument("--subjects", type=int, default=5, help="Subjects per course")
+        parser.add_argument("--teachers", type=int, default=10, help="Teachers")
+        parser.add_argument("--days", type=int, default=180, help="School days of attendance")
+        parser.add_argument("--start", default="2025-01-06", help="First school day (YYYY-MM-DD)")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+        parser.add_argument("--flush", action="store_true", help="Delete previously seeded data first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.password = make_password(PASSWORD)
+        started = time.perf_counter()
+
+        if options["flush"]:
+            self._step("Flushed previous seed data", self.flush)
+
+        with transaction.atomic():
+            admin = self._users(["admin"], "admin")[0]
+            User.objects.filter(pk=admin.pk).update(is_staff=True, is_superuser=True)
+            teachers = self._step("Teachers", self.create_teachers, options["teachers"])
+            courses = self._step("Courses", self.create_courses, options["courses"], options["sections"], teachers)
+            subjects = self._step("Subjects", self.create_subjects, courses, options["subjects"], teachers)
+            students = self._step("Students and parents", self.create_students, courses, options["students"])
+            self._step("Timetable", self.create_timetable, courses, subjects, teachers)
+            self._step("Exams and results", self.create_results, courses, subjects, students)
+            self._step("Assignments", self.create_assignments, courses, subjects, students, teachers)
+
+        start = datetime.date.fromisoformat(options["start"])
+        self._step("Attendance", self.create_attendance, students, subjects, start, options["days"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(courses)} sections, {len(students)} students in {time.perf_counter() - started:.1f}s. "
+            f"Log in as {admin.username!r} / {PASSWORD!r}."
+        ))
+
+    def _step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        if isinstance(result, int):
+            count = f" ({result})"
+        elif isinstance(result, (list, dict)):
+            count = f" ({len(result)})"
+        else:
+            count = ""
+        self.stdout.write(f"{label}{count}: {time.perf_counter() - started:.2f}s")
+        return result
+
+    def _bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def _batched(self, model, rows):
+        """Insert a generator of unsaved objects in batches; returns the count."""
+        batch, total = [], 0
+        for obj in rows:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        return total
+
+    def _name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def _users(self, names, role):
+        users = []
+        for name in names:
+            first, last = self._name()
+            users.append(User(
+                username=f"{PREFIX}_{name}", first_name=first, last_name=last,
+                email=f"{name}@{PREFIX}.example.com", password=self.password,
+            ))
+        users = self._bulk(User, users)
+        profiles = self._bulk(UserProfile, [UserProfile(user=u, role=role) for u in users])
+        for user, profile in zip(users, profiles):
+            user.profile = profile
+        return users
+
+    def flush(self):
+        User.objects.filter(username__startswith=f"{PREFIX}_").delete()
+        Parent.objects.filter(email__endswith=f"@{PREFIX}.example.com").delete()
+        Course.objects.filter(code__startswith=f"{PREFIX.upper()}-").delete()
+        Subject.objects.filter(code__startswith=f"{PREFIX.upper()}-").delete()
+
+    def create_teachers(self, count):
+        users = self._users([f"teacher{i}" for i in range(count)], "teacher")
+        return self._bulk(Teacher, [
+            Teacher(
+                user_profile=user.profile,
+                employee_id=f"{PREFIX.upper()}-T{i:04d}",
+                department=self.rng.choice(PROGRAMS),
+                joining_date=datetime.date(2015, 1, 1) + datetime.timedelta(days=self.rng.randrange(3000)),
+            )
+            for i, user in enumerate(users)
+        ])
+
+    def create_courses(self, count, sections, teachers):
+        courses = []
+        for i in range(count):
+            program = PROGRAMS[i % len(PROGRAMS)]
+            for s in range(sections):
+                section = chr(ord("A") + s)
+                courses.append(Course(
+                    name=program,
+                    code=f"{PREFIX.upper()}-C{i:02d}-{section}",
+                    semester=i % 8 + 1,
+                    section=section,
+                    class_teacher=self.rng.choice(teachers),
+                ))
+        return self._bulk(Course, courses)
+
+    def create_subjects(self, courses, per_course, teachers):
+        """Returns {course: [subjects]}; sections of a program share subjects."""
+        by_program = {}
+        subjects = {}
+        for course in courses:
+            program = course.code.split("-")[1]
+            if program not in by_program:
+                by_program[program] = self._bulk(Subject, [
+                    Subject(
+                        name=f"{course.name} {j + 1}",
+                        code=f"{PREFIX.upper()}-{program}-S{j}",
+                        credits=self.rng.choice([2, 3, 3, 4]),
+                    )
+                    for j in range(per_course)
+                ])
+            subjects[course] = by_program[program]
+
+        self._bulk(CourseSubject, [
+            CourseSubject(course=course, subject=subject, semester=course.semester)
+            for course, subs in subjects.items() for subject in subs
+        ])
+        self._bulk(TeacherSubject, [
+            TeacherSubject(course=course, subject=subject, teacher=self.rng.choice(teachers))
+            for course, subs in subjects.items() for subject in subs
+        ])
+        return subjects
+
+    def create_students(self, courses, per_section):
+        names = [f"student{c}_{i}" for c in range(len(courses)) for i in range(per_section)]
+        users = self._users(names, "student")
+        parent_users = self._users([f"parent{c}_{i}" for c in range(len(courses)) for i in range(per_section)], "parent")
+        parents = self._bulk(Parent, [
+            Parent(
+                user_profile=user.profile,
+                name=user.get_full_name(),
+                email=user.email,
+                phone=f"98{self.rng.randrange(10 ** 8):08d}",
+                relation=self.rng.choice(["Father", "Mother", "Guardian"]),
+            )
+            for user in parent_users
+        ])
+        students = []
+        for n, (user, parent) in enumerate(zip(users, parents)):
+            course = courses[n // per_section]
+            students.append(Student(
+                user_profile=user.profile,
+                student_id=f"{PREFIX.upper()}-{n:06d}",
+                roll_number=f"{PREFIX.upper()}-R{n:06d}",
+                course=course,
+                parent=parent,
+                gender=self.rng.choice(["male", "female"]),
+                date_of_birth=datetime.date(2003, 1, 1) + datetime.timedelta(days=self.rng.randrange(1500)),
+                admission_date=datetime.date(2024, 7, 1),
+            ))
+        return self._bulk(Student, students)
+
+    def create_timetable(self, courses, subjects, teachers):
+        return self._bulk(Timetable, [
+            Timetable(
+                course=course,
+                subject=subjects[course][(d + s) % len(subjects[course])],
+                teacher=self.rng.choice(teachers),
+                day_of_week=day,
+                start_time=slot,
+                end_time=(datetime.datetime.combine(datetime.date.today(), slot) + datetime.timedelta(minutes=50)).time(),
+                room=f"R{self.rng.randrange(100, 400)}",
+            )
+            for course in courses
+            for d, day in enumerate(DAYS)
+            for s, slot in enumerate(SLOTS)
+        ])
+
+    def create_results(self, courses, subjects, students):
+        exams = self._bulk(Exam, [
+            Exam(
+                subject=subject, course=course, exam_name=f"{exam_type.title()} {subject.code}",
+                exam_type=exam_type, exam_date=exam_date, total_marks=100,
+            )
+            for course in courses
+            for subject in subjects[course]
+            for exam_type, exam_date in [("midterm", datetime.date(2025, 3, 15)), ("final", datetime.date(2025, 6, 20))]
+        ])
+        exams_by_course = {}
+        for exam in exams:
+            exams_by_course.setdefault(exam.course_id, []).append(exam)
+
+        def rows():
+            for student in students:
+                ability = self.rng.gauss(62, 15)
+                for exam in exams_by_course[student.course_id]:
+                    marks = max(0, min(100, int(self.rng.gauss(ability, 10))))
+                    yield Result(
+                        student=student, subject_id=exam.subject_id, exam=exam,
+                        marks_obtained=marks, total_marks=100, percentage=marks,
+                    )
+        return self._batched(Result, rows())
+
+    def create_assignments(self, courses, subjects, students, teachers):
+        assignments = self._bulk(Assignment, [
+            Assignment(
+                subject=subject, teacher=self.rng.choice(teachers), title=f"Assignment {n + 1} ({subject.code})",
+                due_date=datetime.datetime(2025, 2 + n * 2, 10, tzinfo=datetime.timezone.utc),
+            )
+            for subject in {s for subs in subjects.values() for s in subs}
+            for n in range(3)
+        ])
+        by_subject = {}
+        for assignment in assignments:
+            by_subject.setdefault(assignment.subject_id, []).append(assignment)
+        subjects_by_course = {course.pk: subs for course, subs in subjects.items()}
+
+        def rows():
+            for student in students:
+                for subject in subjects_by_course[student.course_id]:
+                    for assignment in by_subject[subject.pk]:
+                        status = self.rng.choices(["submitted", "late", "not_submitted"], [80, 12, 8])[0]
+                        yield AssignmentSubmission(
+                            assignment=assignment, student=student, status=status,
+                            submission_date=assignment.due_date if status != "not_submitted" else None,
+                            marks=self.rng.randrange(40, 100) if status != "not_submitted" else None,
+                        )
+        return self._batched(AssignmentSubmission, rows())
+
+    def create_attendance(self, students, subjects, start, days):
+        subjects_by_course = {course.pk: subs for course, subs in subjects.items()}
+        school_days = []
+        day = start
+        while len(school_days) < days:
+            if day.weekday() < 5:
+                school_days.append(day)
+            day += datetime.timedelta(days=1)
+
+        def rows():
+            for student in students:
+                # Each student has their own attendance habit
+                present_rate = min(0.99, max(0.4, self.rng.gauss(0.85, 0.1)))
+                for date in school_days:
+                    for subject in subjects_by_course[student.course_id]:
+                        roll = self.rng.random()
+                        if roll < present_rate:
+                            status = "present"
+                        elif roll < present_rate + 0.04:
+                            status = "late"
+                        elif roll < present_rate + 0.06:
+                            status = "leave"
+                        else:
+                            status = "absent"
+                        yield Attendance(
+                            student=student, course_id=student.course_id, subject=subject,
+                            attendance_date=date, status=status,
+                        )
+
+        with transaction.atomic():
+            return self._batched(Attendance, rows())
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.notifications import collect_notifications, send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Collect absences and results written since the last run and send each "
+        "parent one digest of them. Run it from cron, e.g. every window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.NOTIFICATION_WORKERS, help="Sending threads")
+        parser.add_argument(
+            "--window", type=int, default=settings.NOTIFICATION_WINDOW_MINUTES,
+            help="Minutes a parent waits between digests",
+        )
+        parser.add_argument("--collect-only", action="store_true", help="Record notifications without sending")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        seen = collect_notifications()
+        self.stdout.write(f"Collected {seen} absences and results")
+        if options["collect_only"]:
+            return
+        stats = send_digests(workers=options["workers"], window=options["window"])
+        elapsed = time.perf_counter() - started
+        style = self.style.WARNING if stats["failed"] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Sent {stats['sent']} digests in {elapsed:.2f}s "
+            f"({stats['failed']} failed and left for the next run, {stats['skipped']} notifications skipped)"
+        ))
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that must not be imported while a web worker boots
+HEAVY_MODULES = ["pandas", "numpy", "joblib", "sklearn", "scipy", "weasyprint"]
+
+# Runs in a fresh interpreter: boot a worker the way gunicorn/uvicorn would
+# (WSGI application + URLconf) and report time, memory and loaded modules.
+WORKER_SCRIPT = """
+import json, os, resource, sys, time
+started = time.perf_counter()
+from sms_project.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    pass
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    maxrss //= 1024
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_kb': rss_kb or maxrss,
+    'max_rss_kb': maxrss,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into ``{module: (self_us, cumulative_us)}``."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot a web worker in a fresh interpreter with -X importtime and report "
+        "import cost, resident memory and any heavy modules pulled in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20, help="Show the N most expensive top-level imports")
+        parser.add_argument("--output", help="Write the report to this JSON file")
+        parser.add_argument(
+            "--strict", action="store_true",
+            help="Fail if any of the heavy modules (%s) is imported" % ", ".join(HEAVY_MODULES),
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "sms_project.settings"))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", WORKER_SCRIPT],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        if proc.returncode:
+            raise CommandError(f"Worker failed to start:\n{proc.stderr[-2000:]}")
+
+        worker = json.loads(proc.stdout.strip().splitlines()[-1])
+        imports = parse_importtime(proc.stderr)
+        # Top-level packages, by cumulative cost
+        packages = {}
+        for name, (_self_us, cumulative_us) in imports.items():
+            if "." not in name:
+                packages[name] = max(packages.get(name, 0), cumulative_us)
+        top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options["top"]]
+        heavy = sorted({m.split(".")[0] for m in worker["modules"]} & set(HEAVY_MODULES))
+
+        self.stdout.write(f"Worker boot:   {worker['seconds'] * 1000:.0f}ms")
+        self.stdout.write(f"Imports:       {len(imports)} modules, {sum(s for s, _ in imports.values()) / 1000:.0f}ms self time")
+        self.stdout.write(f"Resident:      {worker['rss_kb'] / 1024:.1f} MB (peak {worker['max_rss_kb'] / 1024:.1f} MB)")
+        self.stdout.write("Most expensive top-level imports:")
+        for name, cumulative_us in top:
+            self.stdout.write(f"  {cumulative_us / 1000:>8.1f}ms  {name}")
+
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"Heavy modules imported at boot: {', '.join(heavy)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No heavy modules imported at boot."))
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({
+                    "boot_ms": worker["seconds"] * 1000,
+                    "rss_kb": worker["rss_kb"],
+                    "max_rss_kb": worker["max_rss_kb"],
+                    "imports": {name: {"self_us": s, "cumulative_us": c} for name, (s, c) in imports.items()},
+                    "heavy_modules": heavy,
+                }, fh, indent=2)
+
+        if options["strict"] and heavy:
+            raise CommandError(f"Heavy modules imported at boot: {', '.join(heavy)}")
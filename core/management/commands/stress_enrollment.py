@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.models import Count, Q
+
+from core.benchmarks import percentiles
+from core.enrollment import CourseFull, enroll, seats_taken
+from core.models import Course, Student, UserProfile
+
+PREFIX = "stress-enroll"
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel enrollments at a few small courses and check that none ends "
+        "up over capacity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=4, help="Courses to enroll into")
+        parser.add_argument("--capacity", type=int, default=25, help="Capacity of each course")
+        parser.add_argument("--attempts", type=int, default=400, help="Enrollments to attempt in total")
+        parser.add_argument("--workers", type=int, default=16, help="Concurrent threads")
+        parser.add_argument(
+            "--naive", action="store_true",
+            help="Count and insert without the course lock, to show the race enroll() prevents",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for course choice")
+
+    def handle(self, *args, **options):
+        # Throwaway rows: keep them out of the audit trail
+        settings.AUDIT_ENABLED = False
+        connections.close_all()
+        courses, profiles = self._setup(options["courses"], options["capacity"], options["attempts"])
+        try:
+            result = self._run(courses, profiles, options)
+            enrolled = dict(
+                Course.objects.filter(pk__in=[c.pk for c in courses])
+                .annotate(n=Count("student", filter=Q(student__status="active")))
+                .values_list("code", "n")
+            )
+        finally:
+            self._teardown()
+
+        capacity = options["capacity"]
+        self.stdout.write(f"Backend:     {connections['default'].vendor}{' (naive)' if options['naive'] else ''}")
+        self.stdout.write(f"Workers:     {options['workers']}, {options['attempts']} attempts, "
+                          f"{options['courses']} courses x {capacity} seats")
+        self.stdout.write(f"Enrolled:    {result['enrolled']}")
+        self.stdout.write(f"Full:        {result['full']}")
+        self.stdout.write(f"Lock errors: {result['errors']}")
+        self.stdout.write(f"Latency:     p50 {result['p50']:.2f}ms, p95 {result['p95']:.2f}ms")
+        self.stdout.write(f"Throughput:  {options['attempts'] / result['elapsed']:.0f} attempts/s")
+        for code, count in sorted(enrolled.items()):
+            self.stdout.write(f"  {code:<20} {count:>4}/{capacity}")
+
+        over = {code: count for code, count in enrolled.items() if count > capacity}
+        if over:
+            raise CommandError(f"Over capacity: {', '.join(f'{code} ({count})' for code, count in over.items())}")
+        if result["enrolled"] != sum(enrolled.values()):
+            raise CommandError("Enrollments reported and students saved disagree")
+        self.stdout.write(self.style.SUCCESS("No course exceeded its capacity."))
+
+    def _setup(self, courses, capacity, attempts):
+        self._teardown()
+        courses = Course.objects.bulk_create([
+            Course(name=PREFIX, code=f"{PREFIX}-{i}", semester=1, section=str(i), capacity=capacity)
+            for i in range(courses)
+        ])
+        User.objects.bulk_create([User(username=f"{PREFIX}-{i}") for i in range(attempts)])
+        users = User.objects.filter(username__startswith=PREFIX).order_by("pk")
+        UserProfile.objects.bulk_create([UserProfile(user=user, role="student") for user in users])
+        profiles = list(UserProfile.objects.filter(user__username__startswith=PREFIX).order_by("pk"))
+        return courses, profiles
+
+    def _teardown(self):
+        Student.objects.filter(student_id__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+        Course.objects.filter(code__startswith=PREFIX).delete()
+
+    def _run(self, courses, profiles, options):
+        rng = random.Random(options["seed"])
+        work = [(profile, rng.choice(courses)) for profile in profiles]
+        lock = threading.Lock()
+        latencies = []
+        counts = {"enrolled": 0, "full": 0, "errors": 0}
+        barrier = threading.Barrier(options["workers"])
+
+        def attempt(profile, course):
+            student = Student(
+                user_profile=profile,
+                student_id=f"{PREFIX}-{profile.pk}",
+                roll_number=f"{PREFIX}-{profile.pk}",
+            )
+            if not options["naive"]:
+                enroll(student, course)
+                return
+            if seats_taken(course) >= course.capacity:
+                raise CourseFull(course)
+            student.course = course
+            student.save()
+
+        def worker():
+            local = []
+            tally = {"enrolled": 0, "full": 0, "errors": 0}
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        if not work:
+                            break
+                        profile, course = work.pop()
+                    started = time.perf_counter()
+                    try:
+                        attempt(profile, course)
+                        tally["enrolled"] += 1
+                    except CourseFull:
+                        tally["full"] += 1
+                    except OperationalError:
+                        tally["errors"] += 1
+                        continue
+                    local.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+                for key, value in tally.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=worker) for _ in range(options["workers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        p50, p95 = percentiles(latencies)
+        return {**counts, "elapsed": elapsed, "p50": p50, "p95": p95}
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ml.training import TrainingError, train
+from core.routers import read_from_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the pass/fail model on a time-based split, report validation "
+        "metrics and write a versioned, checksummed artifact."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--validation", type=float, default=0.2, help="Share of samples (latest exam dates) held out")
+        parser.add_argument("--n-estimators", type=int, default=200, help="Trees in the forest")
+        parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel fitting jobs (-1: all CPUs)")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed")
+        parser.add_argument("--output-dir", help="Artifact directory (default: ML_MODEL_DIR)")
+        parser.add_argument("--no-promote", action="store_true", help="Don't make this the model the predictor serves")
+
+    def handle(self, *args, **options):
+        if not 0 < options["validation"] < 1:
+            raise CommandError("--validation must be between 0 and 1")
+        try:
+            import sklearn  # noqa: F401
+            import joblib  # noqa: F401
+        except ImportError:
+            raise CommandError("Training requires scikit-learn and joblib (pip install scikit-learn)")
+
+        try:
+            with read_from_replica():
+                metadata = train(
+                    validation=options["validation"],
+                    n_estimators=options["n_estimators"],
+                    n_jobs=options["n_jobs"],
+                    seed=options["seed"],
+                    output_dir=options["output_dir"],
+                    promote=not options["no_promote"],
+                )
+        except TrainingError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"Trained on {metadata['samples']['train']} samples, validated on "
+            f"{metadata['samples']['validation']} from {metadata['split_date']}"
+        )
+        self.stdout.write(f"Features {metadata['features_seconds']:.2f}s, fit {metadata['fit_seconds']:.2f}s")
+        self.stdout.write(json.dumps(metadata["metrics"], indent=2))
+        state = "published" if not options["no_promote"] else "written (not published)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Model {metadata['version']} {state}: {metadata['artifact']} sha256 {metadata['sha256'][:12]}"
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+from core.warmup import project_template_names, reset_template_cache, warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every project template, report syntax errors and compare cold "
+        "compilation with lookups from the warm template cache."
+    )
+
+    def handle(self, *args, **options):
+        reset_template_cache()
+        compiled, errors, cold = warm_templates(force=True)
+        for name, error in errors:
+            self.stderr.write(self.style.ERROR(f"{name}: {error}"))
+
+        engine = engines["django"]
+        names = project_template_names(engine)
+        started = time.perf_counter()
+        for name in names:
+            try:
+                engine.get_template(name)
+            except Exception:
+                pass
+        warm = time.perf_counter() - started
+
+        self.stdout.write(f"Templates:     {compiled} compiled, {len(errors)} failed")
+        self.stdout.write(f"Cold compile:  {cold * 1000:.3f}ms")
+        self.stdout.write(f"Warm lookup:   {warm * 1000:.3f}ms")
+        if not settings.TEMPLATE_CACHE:
+            self.stdout.write(self.style.WARNING(
+                "TEMPLATE_CACHE is off; warm lookups use Django's default loaders."
+            ))
+        if errors:
+            raise CommandError(f"{len(errors)} templates failed to compile")
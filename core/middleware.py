@@ -0,0 +1,83 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import audit
+from .instrumentation import QueryCollector, registry
+from .routers import allow_replica_reads, finish_routing, has_written, replica_configured, start_routing
+
+REPLICA_PIN_KEY = '_replica_pinned_until'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let views marked ``replica_reads`` read from the replica, and keep a
+    session on the primary for ``REPLICA_STICKY_SECONDS`` after it writes.
+    Not loaded without a replica, so writes don't also save the session.
+    """
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, 'session', None)
+        pinned = session is not None and session.get(REPLICA_PIN_KEY, 0) > time.time()
+        tokens = start_routing(pinned=pinned)
+        try:
+            response = self.get_response(request)
+            if has_written() and session is not None:
+                session[REPLICA_PIN_KEY] = time.time() + settings.REPLICA_STICKY_SECONDS
+        finally:
+            finish_routing(tokens)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        if getattr(view, 'replica_reads', False):
+            allow_replica_reads()
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record wall time, query count, SQL time and repeated queries for every
+    request into ``core.instrumentation.registry``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector(settings.SLOW_QUERY_MS)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else '<unresolved>'
+        registry.record(view, wall_ms, collector)
+        return response
+
+
+class AuditUserMiddleware:
+    """Attribute audit entries recorded during a request to its user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Resolved only if something is audited, so other requests don't load the user
+        token = audit.set_user(lambda: request.user.pk if request.user.is_authenticated else None)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.reset_user(token)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_student_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=20)),
+                ('subjects', models.JSONField(default=list)),
+                ('marks_obtained', models.IntegerField(default=0)),
+                ('total_marks', models.IntegerField(default=0)),
+                ('percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('grade', models.CharField(blank=True, max_length=5, null=True)),
+                ('attendance_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('class_rank', models.IntegerField(blank=True, null=True)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'term', 'class_rank'], name='core_report_course__4b7400_idx')],
+                'unique_together': {('student', 'term')},
+            },
+        ),
+    ]
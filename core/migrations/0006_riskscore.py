@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignmentsubmission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='result',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='RiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('level', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='low', max_length=6)),
+                ('recent_attendance', models.FloatField(blank=True, null=True)),
+                ('attendance_change', models.FloatField(blank=True, null=True)),
+                ('missed_submissions', models.IntegerField(default=0)),
+                ('latest_percentage', models.FloatField(blank=True, null=True)),
+                ('marks_change', models.FloatField(blank=True, null=True)),
+                ('pass_probability', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='core_risksc_score_01555b_idx'), models.Index(fields=['level', '-score'], name='core_risksc_level_cf3252_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=9, unique=True)),
+                ('start', models.DateField()),
+                ('end', models.DateField()),
+                ('rows', models.IntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('student_id', models.BigIntegerField()),
+                ('subject_id', models.BigIntegerField()),
+                ('attendance_date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late'), ('leave', 'Leave')], max_length=10)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('academic_year', models.CharField(max_length=9)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student_id', 'attendance_date'], name='core_attend_student_5a5a55_idx'), models.Index(fields=['attendance_date'], name='core_attend_attenda_276025_idx'), models.Index(fields=['academic_year'], name='core_attend_academi_8fff9b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['course', 'status'], name='core_studen_course__059c72_idx'),
+        ),
+    ]
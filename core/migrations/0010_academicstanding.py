@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_student_course_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcademicStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.IntegerField()),
+                ('gpa', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('cgpa', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('credits_attempted', models.IntegerField(default=0)),
+                ('credits_earned', models.IntegerField(default=0)),
+                ('terms', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='standing', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-cgpa'], name='core_academ_cgpa_0dd4d9_idx'), models.Index(fields=['semester', '-gpa'], name='core_academ_semeste_be326f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_academicstanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('absence', 'Absence'), ('result', 'Result')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('skipped', 'Skipped')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.parent')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'parent'], name='core_notifi_status_52048f_idx'), models.Index(fields=['status', 'sent_at'], name='core_notifi_status_82476a_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True)),
+                ('inode', models.BigIntegerField(default=0)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('lines', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='card_id',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_auditentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermRollover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=20)),
+                ('students', models.IntegerField(default=0)),
+                ('rolled_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollovers', to='core.course')),
+                ('successor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rolled_into', to='core.course')),
+            ],
+            options={
+                'unique_together': {('term', 'course')},
+            },
+        ),
+    ]
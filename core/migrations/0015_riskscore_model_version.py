@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_termrollover'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskscore',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_riskscore_model_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditentry',
+            name='action',
+            field=models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('bulk_update', 'Bulk update'), ('delete', 'Delete')], max_length=12),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_course(apps, schema_editor):
+    # The best record of where existing rows were marked is the student's course today
+    Attendance = apps.get_model('core', 'Attendance')
+    Student = apps.get_model('core', 'Student')
+    Attendance.objects.filter(course__isnull=True).update(
+        course=Subquery(Student.objects.filter(pk=OuterRef('student_id')).values('course_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_auditentry_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='course',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.course'),
+        ),
+        migrations.RunPython(backfill_course, migrations.RunPython.noop),
+    ]
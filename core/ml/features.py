@@ -0,0 +1,98 @@
+"""
+Per-student features for the pass/fail model.
+
+Features are always computed from rows dated strictly before a cut-off, so
+a training sample never sees the exam it is labelled with. Every feature is
+a grouped query over the whole cohort rather than a query per student;
+attendance includes archived years when the cut-off reaches them.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+
+from core.archive import aggregate_attendance
+from core.models import AssignmentSubmission, Result
+from core.reports import ATTENDED_STATUSES
+
+FEATURES = ['attendance_rate', 'prior_pct', 'prior_exams', 'submission_rate']
+
+# Result percentage needed to pass an exam
+PASS_PERCENTAGE = 40
+
+SUBMITTED_STATUSES = ['submitted', 'late']
+
+# Stand-in for a feature with no history yet (e.g. before the first exam)
+MISSING = -1.0
+
+
+def _rate(part, whole):
+    return part / whole if whole else MISSING
+
+
+def features_as_of(cutoff=None, student_ids=None):
+    """
+    Return ``{student_id: [feature values in FEATURES order]}`` using only
+    attendance, results and submissions dated before ``cutoff`` (everything
+    when ``cutoff`` is None), for ``student_ids`` or every student with data.
+    """
+    results = Result.objects.filter(marks_obtained__isnull=False, total_marks__gt=0, exam__isnull=False)
+    submissions = AssignmentSubmission.objects.all()
+    if cutoff is not None:
+        results = results.filter(exam__exam_date__lt=cutoff)
+        submissions = submissions.filter(assignment__due_date__date__lt=cutoff)
+    by_student = {}
+    if student_ids is not None:
+        by_student = {'student_id__in': list(student_ids)}
+        results = results.filter(**by_student)
+        submissions = submissions.filter(**by_student)
+
+    rows = defaultdict(lambda: [MISSING, MISSING, 0.0, MISSING])
+    attendance = aggregate_attendance(
+        ['student_id'],
+        {'total': Count('id'), 'attended': Count('id', filter=Q(status__in=ATTENDED_STATUSES))},
+        end=cutoff - timedelta(days=1) if cutoff is not None else None,
+        **by_student,
+    )
+    for (student_id,), row in attendance.items():
+        rows[student_id][0] = _rate(row['attended'], row['total'])
+    for row in results.values('student_id').annotate(
+        obtained=Sum('marks_obtained'), possible=Sum('total_marks'), exams=Count('exam', distinct=True),
+    ):
+        rows[row['student_id']][1] = _rate(row['obtained'], row['possible'])
+        rows[row['student_id']][2] = float(row['exams'])
+    for row in submissions.values('student_id').annotate(
+        total=Count('id'), done=Count('id', filter=Q(status__in=SUBMITTED_STATUSES)),
+    ):
+        rows[row['student_id']][3] = _rate(row['done'], row['total'])
+
+    if student_ids is not None:
+        return {student_id: rows[student_id] for student_id in student_ids}
+    return dict(rows)
+
+
+def training_samples(progress=None):
+    """
+    Return ``[(exam_date, student_id, features, passed)]`` ordered by date:
+    one sample per student per exam date, labelled by the marks of that
+    date's exams and described by features from before it.
+    ``progress(done, total)`` is called after each exam date.
+    """
+    outcomes = defaultdict(dict)
+    for row in (
+        Result.objects.filter(marks_obtained__isnull=False, total_marks__gt=0, exam__isnull=False)
+        .values('exam__exam_date', 'student_id')
+        .annotate(obtained=Sum('marks_obtained'), possible=Sum('total_marks'))
+    ):
+        passed = row['obtained'] * 100 >= PASS_PERCENTAGE * row['possible']
+        outcomes[row['exam__exam_date']][row['student_id']] = int(passed)
+
+    samples = []
+    for i, exam_date in enumerate(sorted(outcomes)):
+        labels = outcomes[exam_date]
+        features = features_as_of(exam_date, list(labels))
+        for student_id, passed in labels.items():
+            samples.append((exam_date, student_id, features[student_id], passed))
+        if progress:
+            progress(i + 1, len(outcomes))
+    return samples
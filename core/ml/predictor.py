@@ -1,6 +1,80 @@
-import joblib
+import json
+import os
+import warnings
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .features import FEATURES, features_as_of
+
+# joblib (and the scikit-learn model it unpickles) is only imported the first
+# time a prediction is made, so web workers that never predict don't pay for it
+
+
+def current_metadata():
+    """Metadata of the model to serve: ML_MODEL_VERSION if set, else latest.json."""
+    if settings.ML_MODEL_VERSION:
+        name = f"pass_fail-{settings.ML_MODEL_VERSION}.json"
+    else:
+        name = "latest.json"
+    path = os.path.join(settings.ML_MODEL_DIR, name)
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        raise ImproperlyConfigured(f"No pass/fail model at {path}; run manage.py train_model") from None
+
+
+@lru_cache(maxsize=2)
+def _load(version, artifact, checksum):
+    from .training import sha256
+
+    path = os.path.join(settings.ML_MODEL_DIR, artifact)
+    if sha256(path) != checksum:
+        raise ImproperlyConfigured(f"Checksum mismatch for {path}; refusing to load it")
+    import joblib
+    return joblib.load(path)
+
+
+def get_model():
+    """Return ``(model, metadata)``; a newly published version is picked up on the next call."""
+    metadata = current_metadata()
+    if metadata["features"] != FEATURES:
+        raise ImproperlyConfigured(f"Model {metadata['version']} was trained on different features")
+    return _load(metadata["version"], metadata["artifact"], metadata["sha256"]), metadata
+
+
+def pass_probabilities(rows):
+    """Probability of passing for each row of feature values (FEATURES order)."""
+    model, _metadata = get_model()
+    column = list(model.classes_).index(1)
+    return model.predict_proba(rows)[:, column].tolist()
+
+
+def predict_students(student_ids):
+    """Return ``{student_id: 1 (pass) or 0 (fail)}`` from the students' data to date."""
+    features = features_as_of(student_ids=list(student_ids))
+    ids = list(features)
+    if not ids:
+        return {}
+    model, _metadata = get_model()
+    return dict(zip(ids, model.predict([features[i] for i in ids]).tolist()))
+
+
+@lru_cache(maxsize=1)
+def _load_legacy(path):
+    import joblib
+    return joblib.load(path)
 
-model = joblib.load("ml/pass_fail_model.pkl")
 
 def predict_pass_fail(attendance, avg_marks):
-    return model.predict([[attendance, avg_marks]])[0]
+    """
+    Deprecated: 1 (pass) or 0 (fail) from the two-feature model at
+    ML_MODEL_PATH. Use ``predict_students``, which serves the published
+    versioned model.
+    """
+    warnings.warn(
+        "predict_pass_fail() is deprecated; use predict_students()", DeprecationWarning, stacklevel=2,
+    )
+    return _load_legacy(settings.ML_MODEL_PATH).predict([[attendance, avg_marks]])[0]
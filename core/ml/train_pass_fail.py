@@ -1,28 +1,20 @@
-import pandas as pd
-from django.db.models import Avg
-from core.models import Student, Result, Attendance
+from core.routers import read_from_replica
 
-def export_training_data():
-    data = []
+from .features import FEATURES, training_samples
 
-    students = Student.objects.all()
 
-    for s in students:
-        attendance_count = Attendance.objects.filter(student=s, status="Present").count()
-        total_attendance = Attendance.objects.filter(student=s).count()
+def export_training_data(path="ml/pass_fail_training_data.csv", progress=None):
+    # pandas is heavy; only import it when an export actually runs
+    import pandas as pd
 
-        attendance_percentage = (attendance_count / total_attendance * 100) if total_attendance > 0 else 0
+    with read_from_replica():
+        samples = training_samples(progress)
 
-        avg_marks = Result.objects.filter(student=s).aggregate(Avg("marks_obtained"))["marks_obtained__avg"] or 0
-
-        label = 1 if avg_marks >= 40 else 0  # pass if >= 40
-
-        data.append({
-            "attendance": attendance_percentage,
-            "avg_marks": avg_marks,
-            "pass_fail": label,
-        })
-
-    df = pd.DataFrame(data)
-    df.to_csv("ml/pass_fail_training_data.csv", index=False)
+    # One row per student per exam date; features predate the exam
+    df = pd.DataFrame(
+        [dict(zip(FEATURES, features), exam_date=exam_date, student_id=student_id, pass_fail=passed)
+         for exam_date, student_id, features, passed in samples],
+        columns=["exam_date", "student_id", *FEATURES, "pass_fail"],
+    )
+    df.to_csv(path, index=False)
     print("Training data exported successfully.")
@@ -0,0 +1,141 @@
+"""
+Train, evaluate and publish the pass/fail model.
+
+Samples are split by time: the most recent exam dates are held out for
+validation, so the reported metrics describe how the model does on exams
+it has not seen yet. Each run writes a versioned artifact plus a metadata
+file carrying its SHA-256, metrics and training time, and (unless told not
+to) points ``latest.json`` at it for ``core.ml.predictor`` to pick up.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .features import FEATURES, training_samples
+
+MODEL_NAME = 'pass_fail'
+LATEST = 'latest.json'
+
+
+class TrainingError(Exception):
+    pass
+
+
+def time_split(samples, validation=0.2):
+    """
+    Split date-ordered ``samples`` into ``(train, validation, split_date)``;
+    all samples of one exam date land on the same side.
+    """
+    counts = Counter(sample[0] for sample in samples)
+    dates = sorted(counts)
+    if len(dates) < 2:
+        raise TrainingError("Need results from at least two exam dates for a time-based split")
+    target = len(samples) * (1 - validation)
+    seen = 0
+    split_date = dates[-1]
+    for i, exam_date in enumerate(dates[:-1]):
+        seen += counts[exam_date]
+        if seen >= target:
+            split_date = dates[i + 1]
+            break
+    train = [sample for sample in samples if sample[0] < split_date]
+    held_out = [sample for sample in samples if sample[0] >= split_date]
+    return train, held_out, split_date
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _metrics(y_true, y_pred, y_score):
+    from sklearn import metrics
+
+    result = {
+        'accuracy': metrics.accuracy_score(y_true, y_pred),
+        'precision': metrics.precision_score(y_true, y_pred, zero_division=0),
+        'recall': metrics.recall_score(y_true, y_pred, zero_division=0),
+        'f1': metrics.f1_score(y_true, y_pred, zero_division=0),
+        'pass_rate': sum(y_true) / len(y_true),
+    }
+    # AUC is undefined when the validation window has a single class
+    result['roc_auc'] = metrics.roc_auc_score(y_true, y_score) if len(set(y_true)) > 1 else None
+    return {key: round(value, 4) if value is not None else None for key, value in result.items()}
+
+
+def train(validation=0.2, n_estimators=200, n_jobs=-1, seed=42, output_dir=None, promote=True):
+    """Train a model, write its artifacts and return its metadata."""
+    import joblib
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+
+    started = time.perf_counter()
+    samples = training_samples()
+    train_set, validation_set, split_date = time_split(samples, validation)
+    if len({sample[3] for sample in train_set}) < 2:
+        raise TrainingError("Training window contains a single class; need both passes and fails")
+    features_seconds = time.perf_counter() - started
+
+    params = {
+        'n_estimators': n_estimators,
+        'min_samples_leaf': 5,
+        'class_weight': 'balanced',
+        'random_state': seed,
+        'n_jobs': n_jobs,
+    }
+    model = RandomForestClassifier(**params)
+    started = time.perf_counter()
+    model.fit([sample[2] for sample in train_set], [sample[3] for sample in train_set])
+    fit_seconds = time.perf_counter() - started
+
+    x_val = [sample[2] for sample in validation_set]
+    y_val = [sample[3] for sample in validation_set]
+    pass_column = list(model.classes_).index(1)
+    metrics = _metrics(y_val, model.predict(x_val).tolist(), model.predict_proba(x_val)[:, pass_column].tolist())
+
+    output_dir = output_dir or settings.ML_MODEL_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    trained_at = datetime.now(timezone.utc)
+    version = trained_at.strftime('%Y%m%dT%H%M%SZ')
+    artifact = f'{MODEL_NAME}-{version}.joblib'
+    joblib.dump(model, os.path.join(output_dir, artifact))
+
+    metadata = {
+        'name': MODEL_NAME,
+        'version': version,
+        'artifact': artifact,
+        'sha256': sha256(os.path.join(output_dir, artifact)),
+        'features': FEATURES,
+        'trained_at': trained_at.isoformat(),
+        'split_date': split_date.isoformat(),
+        'samples': {'train': len(train_set), 'validation': len(validation_set)},
+        'metrics': metrics,
+        'features_seconds': round(features_seconds, 3),
+        'fit_seconds': round(fit_seconds, 3),
+        'params': params,
+        'sklearn': sklearn.__version__,
+    }
+    with open(os.path.join(output_dir, f'{MODEL_NAME}-{version}.json'), 'w') as fh:
+        json.dump(metadata, fh, indent=2)
+    if promote:
+        publish(version, output_dir)
+    return metadata
+
+
+def publish(version, output_dir=None):
+    """Point ``latest.json`` at ``version``; the swap is atomic."""
+    output_dir = output_dir or settings.ML_MODEL_DIR
+    with open(os.path.join(output_dir, f'{MODEL_NAME}-{version}.json')) as fh:
+        metadata = json.load(fh)
+    tmp = os.path.join(output_dir, f'.{LATEST}.tmp')
+    with open(tmp, 'w') as fh:
+        json.dump(metadata, fh, indent=2)
+    os.replace(tmp, os.path.join(output_dir, LATEST))
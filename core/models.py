@@ -1,6 +1,14 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from . import audit
+
 # Extending the built-in User model for roles
 class UserProfile(models.Model):
     ROLE_CHOICES = [
@@ -89,6 +97,7 @@ class Student(models.Model):
     user_profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE)
     student_id = models.CharField(max_length=50, unique=True)
     roll_number = models.CharField(max_length=20, unique=True)
+    card_id = models.CharField(max_length=32, unique=True, blank=True, null=True) # RFID/biometric gate card
 
     course = models.ForeignKey(Course, on_delete=models.PROTECT)
 
@@ -108,6 +117,13 @@ class Student(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status']),
+            # Seat counts for enrollment
+            models.Index(fields=['course', 'status']),
+        ]
+
     def __str__(self):
         name = self.user_profile.user.get_full_name() or self.user_profile.user.username
         return f"{name} ({self.roll_number})"
@@ -137,7 +153,118 @@ class TeacherSubject(models.Model):
     def __str__(self):
         return f"{self.teacher} teaches {self.subject} in {self.course}"
 
-class Attendance(models.Model):
+class AuditedQuerySet(models.QuerySet):
+    """Records field changes made by ``update()``, ``bulk_update()`` and ``delete()``; see core.audit."""
+
+    def update(self, **kwargs):
+        fields = audit.audited_fields(self.model)
+        if not settings.AUDIT_ENABLED:
+            return super().update(**kwargs)
+        constants, expressions = {}, {}
+        for name, value in kwargs.items():
+            field = self.model._meta.get_field(name)
+            if field.attname not in fields:
+                continue
+            if hasattr(value, 'resolve_expression'):
+                expressions[field.attname] = ExpressionWrapper(value, output_field=field)
+            else:
+                constants[field.attname] = field.to_python(value.pk if isinstance(value, models.Model) else value)
+        if not constants and not expressions:
+            return super().update(**kwargs)
+        attnames = [*constants, *expressions]
+        aliases = [f'audit_new_{attname}' for attname in expressions]
+        with transaction.atomic(using=self.db):
+            # One read of the old values, with the new value of each expression
+            # computed alongside: the UPDATE evaluates it against the same row
+            rows = self.annotate(**dict(zip(aliases, expressions.values()))).values_list('pk', *attnames, *aliases)
+            changed = {}
+            for row in rows:
+                before = dict(zip(attnames, row[1:len(attnames) + 1]))
+                after = {**constants, **dict(zip(expressions, row[len(attnames) + 1:]))}
+                changed[row[0]] = audit.diff(before, after, fields)
+            count = super().update(**kwargs)
+            audit.record(self.model, changed, 'bulk_update', using=self.db)
+        return count
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        # Written through update() above, which records the changes to ``fields``
+        count = super().bulk_update(objs, fields, batch_size=batch_size)
+        for obj in objs:
+            obj._audit_loaded = {**getattr(obj, '_audit_loaded', {}), **obj._audit_current(fields)}
+        return count
+
+    bulk_update.alters_data = True
+
+    def delete(self):
+        if not settings.AUDIT_ENABLED:
+            return super().delete()
+        fields = audit.audited_fields(self.model)
+        with transaction.atomic(using=self.db):
+            removed = {
+                row[0]: audit.diff(dict(zip(fields, row[1:])), dict.fromkeys(fields), fields)
+                for row in self.values_list('pk', *fields)
+            }
+            deleted = super().delete()
+            audit.record(self.model, removed, 'delete', using=self.db)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class AuditedModel(models.Model):
+    """
+    Remembers the values an instance was loaded with so ``save()`` can
+    record which fields it changed; see core.audit.
+    """
+    objects = AuditedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_loaded = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        self._audit_changes(
+            'create' if created else 'update', fields=kwargs.get('update_fields'), using=self._state.db,
+        )
+
+    def delete(self, *args, **kwargs):
+        fields = audit.audited_fields(type(self))
+        pk, using = self.pk, self._state.db
+        current = {attname: self.__dict__.get(attname) for attname in fields}
+        deleted = super().delete(*args, **kwargs)
+        audit.record(type(self), {pk: audit.diff(current, dict.fromkeys(fields), fields)}, 'delete', using=using)
+        return deleted
+
+    def _audit_current(self, fields=None):
+        """``{attname: value}`` of the audited ``fields`` (field names; all by default) set on this instance."""
+        audited = audit.audited_fields(type(self))
+        names = set(fields) if fields is not None else None
+        return {
+            attname: self.__dict__[attname]
+            for attname, name in audited.items()
+            if attname in self.__dict__ and (names is None or name in names or attname in names)
+        }
+
+    def _audit_changes(self, action, fields=None, using=None):
+        """Record the changes to ``fields`` (all audited fields by default) since the snapshot."""
+        current = self._audit_current(fields)
+        before = {} if action == 'create' else getattr(self, '_audit_loaded', {})
+        # Without a snapshot (an instance built by hand) only the new values are known
+        changes = audit.diff(before, current, audit.audited_fields(type(self)))
+        audit.record(type(self), {self.pk: changes}, action, using=using)
+        self._audit_loaded = {**getattr(self, '_audit_loaded', {}), **current}
+
+class Attendance(AuditedModel):
     STATUS_CHOICES = [
         ('present', 'Present'),
         ('absent', 'Absent'),
@@ -145,19 +272,29 @@ class Attendance(models.Model):
         ('leave', 'Leave'),
     ]
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    # The student's course when marked; a later transfer or rollover doesn't move the history
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, editable=False)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     attendance_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='absent')
     remarks = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # rollup and risk score watermarks
 
     class Meta:
         unique_together = ('student', 'subject', 'attendance_date')
+        indexes = [
+            models.Index(fields=['attendance_date', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.subject} on {self.attendance_date}: {self.get_status_display()}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.course_id is None:
+            self.course_id = self.student.course_id
+        super().save(*args, **kwargs)
+
 class Assignment(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
@@ -171,7 +308,7 @@ class Assignment(models.Model):
     def __str__(self):
         return self.title
 
-class AssignmentSubmission(models.Model):
+class AssignmentSubmission(AuditedModel):
     STATUS_CHOICES = [
         ('submitted', 'Submitted'),
         ('pending', 'Pending'),
@@ -185,10 +322,13 @@ class AssignmentSubmission(models.Model):
     feedback = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # risk score watermark
 
     class Meta:
         unique_together = ('assignment', 'student')
+        indexes = [
+            models.Index(fields=['status']),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.assignment.title}: {self.get_status_display()}"
@@ -216,7 +356,7 @@ class Exam(models.Model):
     def __str__(self):
         return f"{self.exam_name} for {self.subject} ({self.course})"
 
-class Result(models.Model):
+class Result(AuditedModel):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     exam = models.ForeignKey(Exam, on_delete=models.SET_NULL, null=True, blank=True)
@@ -226,10 +366,13 @@ class Result(models.Model):
     grade = models.CharField(max_length=5, blank=True, null=True) # A, B, C, D, F
     remarks = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # risk score watermark
 
     class Meta:
         unique_together = ('student', 'subject', 'exam')
+        indexes = [
+            models.Index(fields=['grade']),
+        ]
 
     def __str__(self):
         return f"Result for {self.student} in {self.subject}"
@@ -259,3 +402,273 @@ class Timetable(models.Model):
 
     def __str__(self):
         return f"{self.course} - {self.subject} on {self.get_day_of_week_display()} at {self.start_time}"
+
+class ReportCard(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    term = models.CharField(max_length=20) # e.g. "2025-S1"
+    subjects = models.JSONField(default=list) # per-subject marks, grade and rank
+    marks_obtained = models.IntegerField(default=0)
+    total_marks = models.IntegerField(default=0)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    grade = models.CharField(max_length=5, blank=True, null=True)
+    attendance_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    class_rank = models.IntegerField(blank=True, null=True)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'term')
+        indexes = [
+            models.Index(fields=['course', 'term', 'class_rank']),
+        ]
+
+    def __str__(self):
+        return f"Report card for student #{self.student_id} ({self.term})"
+
+class AttendanceDaily(models.Model):
+    """Per course, subject and day attendance counts maintained by core.analytics."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    date = models.DateField()
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    late = models.IntegerField(default=0)
+    leave = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('course', 'subject', 'date')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    @property
+    def total(self):
+        return self.present + self.absent + self.late + self.leave
+
+    def __str__(self):
+        return f"Course #{self.course_id} / subject #{self.subject_id} on {self.date}"
+
+class RollupWatermark(models.Model):
+    """Highest source ``updated_at`` already folded into a rollup."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+    def since(self):
+        """
+        Lower bound (exclusive) of the next incremental read: ``value`` less
+        ``WATERMARK_OVERLAP_SECONDS``. ``updated_at`` is stamped before a
+        transaction commits, so a row stamped just below ``value`` may not
+        have been visible yet when ``value`` was read; rows in the overlap
+        are read again, and whatever consumes them must be idempotent.
+        """
+        if self.value is None:
+            return None
+        return self.value - timedelta(seconds=settings.WATERMARK_OVERLAP_SECONDS)
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_worker``."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    task = models.CharField(max_length=100) # name registered with core.jobs.task
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0) # higher runs first
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.IntegerField(default=0) # 0-100
+    message = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'priority']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+
+class RiskScore(models.Model):
+    """Early-warning score per student, kept current by core.risk."""
+    LEVEL_CHOICES = [
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High'),
+    ]
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='risk')
+    score = models.FloatField(default=0) # 0-100, higher is more at risk
+    level = models.CharField(max_length=6, choices=LEVEL_CHOICES, default='low')
+    recent_attendance = models.FloatField(blank=True, null=True) # last ATTENDANCE_WINDOW days
+    attendance_change = models.FloatField(blank=True, null=True) # vs the window before
+    missed_submissions = models.IntegerField(default=0)
+    latest_percentage = models.FloatField(blank=True, null=True)
+    marks_change = models.FloatField(blank=True, null=True) # latest exam vs earlier average
+    pass_probability = models.FloatField(blank=True, null=True) # from the pass/fail model, if published
+    model_version = models.CharField(max_length=50, blank=True, default='') # '' when scored without the model
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score']),
+            models.Index(fields=['level', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} risk {self.score:.0f} ({self.get_level_display()})"
+
+class AttendanceArchive(models.Model):
+    """
+    Attendance from closed academic years, moved out of ``Attendance`` by
+    core.archive. May live in a separate database (ARCHIVE_DATABASE_URL),
+    so students and subjects are plain ids rather than foreign keys.
+    """
+    id = models.BigIntegerField(primary_key=True) # id it had in Attendance
+    student_id = models.BigIntegerField()
+    subject_id = models.BigIntegerField()
+    attendance_date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.STATUS_CHOICES)
+    remarks = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    academic_year = models.CharField(max_length=9) # e.g. 2024-2025
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student_id', 'attendance_date']),
+            models.Index(fields=['attendance_date']),
+            models.Index(fields=['academic_year']),
+        ]
+
+    def __str__(self):
+        return f"Archived attendance {self.id} on {self.attendance_date}: {self.get_status_display()}"
+
+class ArchivedYear(models.Model):
+    """An academic year whose attendance has been moved to the archive."""
+    label = models.CharField(max_length=9, unique=True) # e.g. 2024-2025
+    start = models.DateField()
+    end = models.DateField()
+    rows = models.IntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.label} ({self.rows} rows)"
+
+class AcademicStanding(models.Model):
+    """Credit-weighted GPA and CGPA per student, kept current by core.standing."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='standing')
+    semester = models.IntegerField() # latest semester with graded results
+    gpa = models.DecimalField(max_digits=4, decimal_places=2) # that semester, 0-4
+    cgpa = models.DecimalField(max_digits=4, decimal_places=2) # every semester, 0-4
+    credits_attempted = models.IntegerField(default=0)
+    credits_earned = models.IntegerField(default=0) # subjects above an F
+    terms = models.JSONField(default=dict) # {"<semester>": "<gpa>"}
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-cgpa']),
+            models.Index(fields=['semester', '-gpa']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} CGPA {self.cgpa}"
+
+class Notification(models.Model):
+    """
+    An absence or result waiting to go out in its parent's next digest;
+    collected and sent by core.notifications.
+    """
+    KIND_CHOICES = [
+        ('absence', 'Absence'),
+        ('result', 'Result'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'), # parent unreachable, or the event no longer applies
+    ]
+    parent = models.ForeignKey(Parent, on_delete=models.CASCADE)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField() # Attendance or Result id
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        # One notification per absence or result, however often it is saved
+        unique_together = ('kind', 'object_id')
+        indexes = [
+            models.Index(fields=['status', 'parent']),
+            models.Index(fields=['status', 'sent_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} for parent #{self.parent_id} ({self.status})"
+
+class LogCheckpoint(models.Model):
+    """How far core.ingest has read an append-only attendance log."""
+    path = models.CharField(max_length=500, unique=True)
+    inode = models.BigIntegerField(default=0) # a new inode means the log was rotated
+    offset = models.BigIntegerField(default=0) # bytes read, always at a line boundary
+    lines = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} @ {self.offset}"
+
+class AuditEntry(models.Model):
+    """One audited change to a row of an ``AuditedModel``, written behind by core.audit."""
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('bulk_update', 'Bulk update'),
+        ('delete', 'Delete'),
+    ]
+    model = models.CharField(max_length=50) # model_name, e.g. "attendance"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=12, choices=ACTION_CHOICES)
+    changes = models.JSONField(encoder=DjangoJSONEncoder) # {field: [old, new]}
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    at = models.DateTimeField() # when the change was made, not when it was written
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'object_id', '-at']),
+            models.Index(fields=['-at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.model} #{self.object_id} at {self.at:%Y-%m-%d %H:%M:%S}"
+
+class TermRollover(models.Model):
+    """A course already rolled over this term, so running the rollover again is refused."""
+    term = models.CharField(max_length=20) # e.g. 2025-2026/T1
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='rollovers')
+    successor = models.ForeignKey(
+        Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='rolled_into',
+    ) # None when its students graduated
+    students = models.IntegerField(default=0)
+    rolled_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('term', 'course')
+
+    def __str__(self):
+        return f"{self.course} rolled over for {self.term}"
@@ -0,0 +1,290 @@
+"""
+Parent notification digests.
+
+``collect_notifications`` turns absences and results written since the
+stored watermark into ``Notification`` rows, one per source row however
+often it is saved, so the attendance and result write paths do nothing
+extra. ``send_digests`` folds each parent's pending notifications into one
+digest, at most one per ``NOTIFICATION_WINDOW_MINUTES``, and hands them to
+``NOTIFICATION_BACKEND`` in chunks on a bounded thread pool; each chunk
+reuses one backend connection. Only the main thread touches the database.
+Absences corrected since they were collected, and parents the backend
+cannot reach, are skipped instead of sent. Each chunk is marked sent as
+soon as it comes back, so a chunk that fails later can't cause the ones
+already delivered to go out again.
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Attendance, Notification, Parent, Result, RollupWatermark, Student
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'notifications'
+
+# Digests sent over one backend connection
+CHUNK_SIZE = 100
+
+# Parents whose digests are built per round of queries
+PARENT_BATCH = 500
+
+
+class Digest:
+    """Everything one parent hears about in this window, as plain data."""
+
+    def __init__(self, parent, students, notification_ids):
+        self.parent = parent
+        self.students = students
+        self.notification_ids = notification_ids
+
+    @property
+    def subject(self):
+        names = ', '.join(student['first_name'] for student in self.students)
+        return f"School update for {names}"
+
+    def render(self):
+        return render_to_string('notifications/digest.txt', {
+            'name': self.parent['name'],
+            'students': self.students,
+        })
+
+
+class NotificationBackend:
+    """
+    Delivers digests. ``send_digests`` creates one instance per chunk and
+    calls ``open``, ``send`` and ``close`` on it from a worker thread.
+    """
+
+    def reachable(self, parent):
+        """Whether ``parent`` (a dict of Parent fields) can be sent anything."""
+        return True
+
+    def open(self):
+        pass
+
+    def send(self, digests):
+        """Send ``digests`` and return the ones delivered."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class EmailBackend(NotificationBackend):
+    """
+    Email through Django's ``EMAIL_BACKEND``: SMTP in production, or the
+    file or console backends as a local stand-in.
+    """
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def reachable(self, parent):
+        return bool(parent['email'])
+
+    def open(self):
+        self.connection.open()
+
+    def send(self, digests):
+        delivered = []
+        for digest in digests:
+            message = EmailMessage(
+                digest.subject, digest.render(), to=[digest.parent['email']], connection=self.connection,
+            )
+            try:
+                message.send()
+            except OSError:  # includes SMTPException; retried next window
+                continue
+            delivered.append(digest)
+        return delivered
+
+    def close(self):
+        self.connection.close()
+
+
+def get_backend_class():
+    return import_string(settings.NOTIFICATION_BACKEND)
+
+
+def collect_notifications():
+    """
+    Record absences and results written since the last run as pending
+    notifications (once each) and return how many were seen. The first run
+    only sets the watermark, so parents aren't sent the school's history.
+    """
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    highs = [model.objects.aggregate(high=Max('updated_at'))['high'] for model in (Attendance, Result)]
+    high = max((h for h in highs if h is not None), default=None)
+    if high is None:
+        return 0
+
+    seen = 0
+    if watermark.value is not None:
+        # Rows in the overlap window are seen again; (kind, object_id) is unique
+        changed = {'updated_at__gt': watermark.since(), 'updated_at__lte': high, 'student__parent__isnull': False}
+        sources = [
+            ('absence', Attendance.objects.filter(status='absent', **changed)),
+            ('result', Result.objects.filter(marks_obtained__isnull=False, **changed)),
+        ]
+        for kind, queryset in sources:
+            rows = [
+                Notification(kind=kind, object_id=pk, student_id=student_id, parent_id=parent_id)
+                for pk, student_id, parent_id in queryset.values_list('pk', 'student_id', 'student__parent_id')
+            ]
+            Notification.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+            seen += len(rows)
+
+    watermark.value = high
+    watermark.save(update_fields=['value', 'updated_at'])
+    return seen
+
+
+def _student_names(student_ids):
+    names = {}
+    for row in Student.objects.filter(pk__in=student_ids).values(
+        'pk', 'roll_number', 'user_profile__user__first_name', 'user_profile__user__last_name',
+        'user_profile__user__username',
+    ):
+        first = row['user_profile__user__first_name'] or row['user_profile__user__username']
+        names[row['pk']] = {
+            'first_name': first,
+            'name': f"{first} {row['user_profile__user__last_name']}".strip(),
+            'roll_number': row['roll_number'],
+        }
+    return names
+
+
+def build_digests(parent_ids, backend):
+    """
+    Return ``(digests, skipped notification ids)`` for the pending
+    notifications of ``parent_ids``, in a fixed number of queries.
+    """
+    pending = list(
+        Notification.objects.filter(status='pending', parent_id__in=parent_ids)
+        .values('pk', 'parent_id', 'student_id', 'kind', 'object_id')
+    )
+    parents = {row['id']: row for row in Parent.objects.filter(pk__in=parent_ids).values('id', 'name', 'email', 'phone')}
+    ids = defaultdict(list)
+    for notification in pending:
+        ids[notification['kind']].append(notification['object_id'])
+    # An absence corrected since it was collected is no longer news
+    absences = {
+        row['pk']: {'date': row['attendance_date'], 'subject': row['subject__name']}
+        for row in Attendance.objects.filter(pk__in=ids['absence'], status='absent')
+        .values('pk', 'attendance_date', 'subject__name')
+    }
+    results = {
+        row['pk']: {
+            'subject': row['subject__name'], 'exam': row['exam__exam_name'], 'grade': row['grade'],
+            'marks_obtained': row['marks_obtained'], 'total_marks': row['total_marks'],
+        }
+        for row in Result.objects.filter(pk__in=ids['result'], marks_obtained__isnull=False)
+        .values('pk', 'subject__name', 'exam__exam_name', 'grade', 'marks_obtained', 'total_marks')
+    }
+    names = _student_names({notification['student_id'] for notification in pending})
+
+    by_parent = defaultdict(list)
+    for notification in pending:
+        by_parent[notification['parent_id']].append(notification)
+    digests = []
+    skipped = []
+    for parent_id, notifications in by_parent.items():
+        parent = parents.get(parent_id)
+        if parent is None or not backend.reachable(parent):
+            skipped.extend(notification['pk'] for notification in notifications)
+            continue
+        students = {}
+        used = []
+        for notification in sorted(notifications, key=lambda n: (n['student_id'], n['kind'], n['object_id'])):
+            source = (absences if notification['kind'] == 'absence' else results).get(notification['object_id'])
+            if source is None:
+                skipped.append(notification['pk'])
+                continue
+            student = students.setdefault(notification['student_id'], {
+                **names.get(notification['student_id'], {'first_name': '', 'name': '', 'roll_number': ''}),
+                'absences': [],
+                'results': [],
+            })
+            student['absences' if notification['kind'] == 'absence' else 'results'].append(source)
+            used.append(notification['pk'])
+        if used:
+            digests.append(Digest(parent, list(students.values()), used))
+    return digests, skipped
+
+
+def _deliver(backend_class, digests):
+    backend = backend_class()
+    try:
+        backend.open()
+    except OSError:  # e.g. SMTP server down; the chunk waits for the next run
+        return []
+    try:
+        return backend.send(digests)
+    finally:
+        try:
+            backend.close()
+        except Exception:
+            # The digests are out; losing that would send them again
+            logger.exception("Closing the notification backend failed")
+
+
+def send_digests(workers=None, window=None, backend_class=None):
+    """
+    Send one digest to every parent with pending notifications who hasn't
+    had one within ``window`` minutes. Returns ``{'sent', 'failed',
+    'skipped'}`` counts of digests (skipped counts notifications).
+    """
+    backend_class = backend_class or get_backend_class()
+    workers = workers or settings.NOTIFICATION_WORKERS
+    window = settings.NOTIFICATION_WINDOW_MINUTES if window is None else window
+    now = timezone.now()
+
+    pending = set(Notification.objects.filter(status='pending').values_list('parent_id', flat=True).distinct())
+    recent = set(
+        Notification.objects.filter(status='sent', sent_at__gt=now - timedelta(minutes=window))
+        .values_list('parent_id', flat=True).distinct()
+    )
+    parent_ids = sorted(pending - recent)
+    stats = {'sent': 0, 'failed': 0, 'skipped': 0}
+    probe = backend_class()
+
+    in_flight = {}  # future -> its chunk of digests
+
+    def finish(futures):
+        for future in futures:
+            chunk = in_flight.pop(future)
+            try:
+                delivered = future.result()
+            except Exception:
+                # One broken chunk (a backend bug, a bad address) mustn't stop the rest
+                logger.exception("Sending a chunk of %d digests failed", len(chunk))
+                delivered = []
+            ids = [pk for digest in delivered for pk in digest.notification_ids]
+            Notification.objects.filter(pk__in=ids).update(status='sent', sent_at=timezone.now())
+            stats['sent'] += len(delivered)
+            stats['failed'] += len(chunk) - len(delivered)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(parent_ids), PARENT_BATCH):
+            digests, skipped = build_digests(parent_ids[i:i + PARENT_BATCH], probe)
+            Notification.objects.filter(pk__in=skipped).update(status='skipped', sent_at=now)
+            stats['skipped'] += len(skipped)
+            for j in range(0, len(digests), CHUNK_SIZE):
+                finish([future for future in in_flight if future.done()])
+                # Bound the digests held in memory to a couple of chunks per worker
+                if len(in_flight) >= workers * 2:
+                    finish(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                chunk = digests[j:j + CHUNK_SIZE]
+                in_flight[pool.submit(_deliver, backend_class, chunk)] = chunk
+        for future in as_completed(list(in_flight)):
+            finish([future])
+    return stats
@@ -0,0 +1,51 @@
+"""
+Paginators for very large tables.
+
+``EstimatedCountPaginator`` avoids the ``COUNT(*)`` that Django's paginator
+runs on every page: for an unfiltered queryset on a big table it uses the
+database's own row estimate instead. Filtered querysets are still counted
+exactly, as they are usually small enough for an index to answer.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+
+def estimated_count(model, using='default'):
+    """Cheap approximate row count of ``model``'s table, or None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    # SQLite keeps no estimate; the primary key range is an index lookup
+    bounds = model._default_manager.using(using).aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['high'] is None or not isinstance(bounds['high'], int):
+        return None
+    return bounds['high'] - bounds['low'] + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this many rows an exact count is cheap enough
+    threshold = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,200 @@
+"""
+Report-card engine.
+
+Builds report cards for a whole course in a handful of grouped queries
+instead of one query per student and subject, and renders them in a
+process pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connections
+from django.db.models import Count, F, FloatField, Q, Sum, Window
+from django.db.models.functions import Cast, Rank
+from django.template.loader import render_to_string
+from django.utils.text import get_valid_filename
+
+from .archive import aggregate_attendance
+from .models import ReportCard, Result, Student, Subject
+
+# Lowest percentage needed for each grade, highest first
+GRADE_SCALE = [
+    (80, 'A'),
+    (70, 'B'),
+    (60, 'C'),
+    (40, 'D'),
+    (0, 'F'),
+]
+
+# Statuses that count towards attendance percentage
+ATTENDED_STATUSES = ['present', 'late']
+
+# Formats render_report_cards can write
+RENDER_FORMATS = ['html', 'pdf']
+
+
+def grade_for(percentage):
+    """Return the letter grade for a percentage."""
+    for minimum, grade in GRADE_SCALE:
+        if percentage >= minimum:
+            return grade
+    return GRADE_SCALE[-1][1]
+
+
+def _percent(part, whole):
+    if not whole:
+        return Decimal('0.00')
+    return (Decimal(part) * 100 / Decimal(whole)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _percentage_expression():
+    return Cast(F('obtained'), FloatField()) * 100.0 / Cast(F('possible'), FloatField())
+
+
+def build_report_cards(course, term, start=None, end=None):
+    """
+    Compute and persist report cards for every student in ``course``.
+
+    ``start``/``end`` optionally restrict results (by exam date) and
+    attendance to the term. Returns the saved ``ReportCard`` rows.
+    """
+    results = Result.objects.filter(student__course=course, marks_obtained__isnull=False)
+    if start:
+        results = results.filter(exam__exam_date__gte=start)
+    if end:
+        results = results.filter(exam__exam_date__lte=end)
+    student_ids = list(Student.objects.filter(course=course).values_list('id', flat=True))
+
+    # Per-subject marks with the rank inside each subject
+    subject_rows = (
+        results.values('student_id', 'subject_id')
+        .annotate(obtained=Sum('marks_obtained'), possible=Sum('total_marks'))
+        .filter(possible__gt=0)
+        .annotate(pct=_percentage_expression())
+        .annotate(rank=Window(Rank(), partition_by=[F('subject_id')], order_by=F('pct').desc()))
+        .order_by('student_id', 'subject_id')
+    )
+
+    # Overall marks with the class rank
+    overall_rows = (
+        results.values('student_id')
+        .annotate(obtained=Sum('marks_obtained'), possible=Sum('total_marks'))
+        .filter(possible__gt=0)
+        .annotate(pct=_percentage_expression())
+        .annotate(rank=Window(Rank(), order_by=F('pct').desc()))
+    )
+
+    # Reads archived years too when the term reaches back into them
+    attendance_rows = aggregate_attendance(
+        ['student_id'],
+        {'total': Count('id'), 'attended': Count('id', filter=Q(status__in=ATTENDED_STATUSES))},
+        start=start, end=end, student_id__in=student_ids,
+    )
+
+    subjects = {s['id']: s for s in Subject.objects.values('id', 'name', 'code')}
+    overall = {row['student_id']: row for row in overall_rows}
+    attended = {student_id: row for (student_id,), row in attendance_rows.items()}
+
+    per_student = {}
+    for row in subject_rows:
+        percentage = _percent(row['obtained'], row['possible'])
+        subject = subjects[row['subject_id']]
+        per_student.setdefault(row['student_id'], []).append({
+            'subject': subject['name'],
+            'code': subject['code'],
+            'marks_obtained': row['obtained'],
+            'total_marks': row['possible'],
+            'percentage': str(percentage),
+            'grade': grade_for(percentage),
+            'rank': row['rank'],
+        })
+
+    cards = []
+    for student_id in student_ids:
+        totals = overall.get(student_id)
+        days = attended.get(student_id)
+        percentage = _percent(totals['obtained'], totals['possible']) if totals else Decimal('0.00')
+        cards.append(ReportCard(
+            student_id=student_id,
+            course=course,
+            term=term,
+            subjects=per_student.get(student_id, []),
+            marks_obtained=totals['obtained'] if totals else 0,
+            total_marks=totals['possible'] if totals else 0,
+            percentage=percentage,
+            grade=grade_for(percentage) if totals else None,
+            attendance_percentage=_percent(days['attended'], days['total']) if days else Decimal('0.00'),
+            class_rank=totals['rank'] if totals else None,
+        ))
+
+    return ReportCard.objects.bulk_create(
+        cards,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['student', 'term'],
+        update_fields=[
+            'course', 'subjects', 'marks_obtained', 'total_marks', 'percentage',
+            'grade', 'attendance_percentage', 'class_rank', 'generated_at',
+        ],
+    )
+
+
+# ---------------------------------------------------
+# RENDERING
+# ---------------------------------------------------
+
+def report_card_context(card):
+    """Plain, picklable context for one report card."""
+    user = card.student.user_profile.user
+    return {
+        'filename': get_valid_filename(f"{card.student.roll_number}_{card.term}"),
+        'student_name': user.get_full_name() or user.username,
+        'roll_number': card.student.roll_number,
+        'course': str(card.course),
+        'term': card.term,
+        'subjects': card.subjects,
+        'marks_obtained': card.marks_obtained,
+        'total_marks': card.total_marks,
+        'percentage': str(card.percentage),
+        'grade': card.grade or '-',
+        'attendance_percentage': str(card.attendance_percentage),
+        'class_rank': card.class_rank,
+    }
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _render_one(args):
+    context, output_dir, fmt = args
+    html = render_to_string('reports/report_card.html', context)
+    path = os.path.join(output_dir, f"{context['filename']}.{fmt}")
+    if fmt == 'pdf':
+        from weasyprint import HTML
+        HTML(string=html).write_pdf(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(html)
+    return path
+
+
+def render_report_cards(queryset, output_dir, fmt='html', workers=None):
+    """
+    Render the report cards in ``queryset`` to ``output_dir`` as HTML or PDF
+    files using a process pool. Returns the written paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cards = queryset.select_related('student__user_profile__user', 'course')
+    jobs = [(report_card_context(card), output_dir, fmt) for card in cards]
+    if not jobs:
+        return []
+
+    # Workers never touch the database; don't let them inherit open connections
+    connections.close_all()
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(_render_one, jobs, chunksize=chunksize))
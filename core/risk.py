@@ -0,0 +1,257 @@
+"""
+At-risk student early warning.
+
+``RiskScore`` keeps one 0-100 score per student built from their recent
+attendance and its trend, missed assignment submissions, and the direction
+of their exam marks, blended with the pass/fail model when one has been
+published. ``refresh_risk_scores`` only rescores students whose
+``Attendance``, ``Result`` or ``AssignmentSubmission`` rows changed since
+the stored watermark, or whose pending submissions fell due since the last
+run, a batch of students per set of grouped queries. Each score records the
+model version it was blended with (blank for marks-only scores), and every
+student is rescored when the published version changes, so the index never
+mixes the two. Dashboards read the indexed ``score`` column.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .archive import aggregate_attendance
+from .models import Attendance, AssignmentSubmission, Result, RiskScore, RollupWatermark, Student
+from .reports import ATTENDED_STATUSES
+
+WATERMARK = 'risk_scores'
+
+# Students scored per round of queries
+BATCH_SIZE = 500
+
+# Recent attendance is the last ATTENDANCE_WINDOW days of recorded
+# attendance, compared with the window before it
+ATTENDANCE_WINDOW = 28
+
+# Points (out of 100) each signal can contribute
+WEIGHTS = {
+    'attendance': 35,         # low recent attendance
+    'attendance_change': 15,  # falling attendance
+    'missed': 20,             # missed submissions
+    'marks': 20,              # low latest exam percentage
+    'marks_change': 10,       # falling marks
+}
+MISSED_CAP = 5              # missed submissions for the full weight
+ATTENDANCE_DROP_CAP = 0.5   # attendance drop (fraction) for the full weight
+MARKS_TARGET = 60           # latest percentage at or above this adds nothing
+MARKS_DROP_CAP = 30         # percentage-point drop for the full weight
+
+# Share of the final score taken from the pass/fail model, when published
+MODEL_WEIGHT = 0.5
+
+LEVELS = [(50, 'high'), (25, 'medium'), (0, 'low')]
+
+TRACKED = [Attendance, Result, AssignmentSubmission]
+
+
+def level_for(score):
+    for threshold, level in LEVELS:
+        if score >= threshold:
+            return level
+    return 'low'
+
+
+def _clip(value, cap):
+    return min(max(value, 0), cap) / cap
+
+
+def score(recent_attendance, attendance_change, missed, latest_percentage, marks_change, pass_probability=None):
+    points = 0.0
+    if recent_attendance is not None:
+        points += (1 - recent_attendance) * WEIGHTS['attendance']
+    if attendance_change is not None:
+        points += _clip(-attendance_change, ATTENDANCE_DROP_CAP) * WEIGHTS['attendance_change']
+    points += _clip(missed, MISSED_CAP) * WEIGHTS['missed']
+    if latest_percentage is not None:
+        points += _clip(MARKS_TARGET - latest_percentage, MARKS_TARGET) * WEIGHTS['marks']
+    if marks_change is not None:
+        points += _clip(-marks_change, MARKS_DROP_CAP) * WEIGHTS['marks_change']
+    if pass_probability is not None:
+        points = points * (1 - MODEL_WEIGHT) + (1 - pass_probability) * 100 * MODEL_WEIGHT
+    return round(points, 2)
+
+
+def _attendance(student_ids, anchor):
+    """``{student_id: (recent rate, change vs the window before)}``."""
+    recent = anchor - timedelta(days=ATTENDANCE_WINDOW)
+    prior = recent - timedelta(days=ATTENDANCE_WINDOW)
+    attended = Q(status__in=ATTENDED_STATUSES)
+    rows = aggregate_attendance(
+        ['student_id'],
+        {
+            'recent_total': Count('id', filter=Q(attendance_date__gt=recent)),
+            'recent_attended': Count('id', filter=Q(attendance_date__gt=recent) & attended),
+            'prior_total': Count('id', filter=Q(attendance_date__lte=recent)),
+            'prior_attended': Count('id', filter=Q(attendance_date__lte=recent) & attended),
+        },
+        start=prior + timedelta(days=1), end=anchor, student_id__in=student_ids,
+    )
+    result = {}
+    for (student_id,), row in rows.items():
+        rate = row['recent_attended'] / row['recent_total'] if row['recent_total'] else None
+        before = row['prior_attended'] / row['prior_total'] if row['prior_total'] else None
+        result[student_id] = (rate, rate - before if rate is not None and before is not None else None)
+    return result
+
+
+def _missed(student_ids, now):
+    rows = (
+        AssignmentSubmission.objects.filter(student_id__in=student_ids)
+        .filter(Q(status='not_submitted') | Q(status='pending', assignment__due_date__lt=now))
+        .values('student_id')
+        .annotate(missed=Count('id'))
+    )
+    return {row['student_id']: row['missed'] for row in rows}
+
+
+def _marks(student_ids):
+    """``{student_id: (latest exam percentage, change vs earlier average)}``."""
+    per_date = defaultdict(list)
+    rows = (
+        Result.objects.filter(
+            student_id__in=student_ids, exam__isnull=False, marks_obtained__isnull=False, total_marks__gt=0,
+        )
+        .values('student_id', 'exam__exam_date')
+        .annotate(obtained=Sum('marks_obtained'), possible=Sum('total_marks'))
+        .order_by('student_id', 'exam__exam_date')
+    )
+    for row in rows:
+        per_date[row['student_id']].append(row['obtained'] * 100 / row['possible'])
+    result = {}
+    for student_id, percentages in per_date.items():
+        latest = percentages[-1]
+        earlier = percentages[:-1]
+        result[student_id] = (latest, latest - sum(earlier) / len(earlier) if earlier else None)
+    return result
+
+
+def _pass_probabilities(student_ids):
+    from .ml.features import features_as_of
+    from .ml.predictor import pass_probabilities
+
+    features = features_as_of(student_ids=student_ids)
+    return dict(zip(student_ids, pass_probabilities([features[i] for i in student_ids])))
+
+
+def _model_version():
+    """Version of the published pass/fail model, or '' when none can be used."""
+    try:
+        from .ml.predictor import get_model
+        _model, metadata = get_model()
+    except (ImportError, ImproperlyConfigured):
+        return ''
+    return str(metadata['version'])
+
+
+def score_students(student_ids, model_version=None):
+    """Recompute and save ``RiskScore`` rows for ``student_ids``; returns the count."""
+    if not student_ids:
+        return 0
+    if model_version is None:
+        model_version = _model_version()
+    anchor = Attendance.objects.aggregate(last=Max('attendance_date'))['last'] or timezone.localdate()
+    now = timezone.now()
+
+    attendance = _attendance(student_ids, anchor)
+    missed = _missed(student_ids, now)
+    marks = _marks(student_ids)
+    probabilities = _pass_probabilities(student_ids) if model_version else {}
+
+    rows = []
+    for student_id in student_ids:
+        recent, attendance_change = attendance.get(student_id, (None, None))
+        latest, marks_change = marks.get(student_id, (None, None))
+        probability = probabilities.get(student_id)
+        value = score(recent, attendance_change, missed.get(student_id, 0), latest, marks_change, probability)
+        rows.append(RiskScore(
+            student_id=student_id,
+            score=value,
+            level=level_for(value),
+            recent_attendance=recent,
+            attendance_change=attendance_change,
+            missed_submissions=missed.get(student_id, 0),
+            latest_percentage=latest,
+            marks_change=marks_change,
+            pass_probability=probability,
+            model_version=model_version,
+            computed_at=now,
+        ))
+    RiskScore.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=[
+            'score', 'level', 'recent_attendance', 'attendance_change', 'missed_submissions',
+            'latest_percentage', 'marks_change', 'pass_probability', 'model_version', 'computed_at',
+        ],
+    )
+    return len(rows)
+
+
+def refresh_risk_scores(rebuild=False, batch_size=BATCH_SIZE, progress=None):
+    """
+    Rescore students with attendance, results or submissions changed since
+    the last run, or with pending submissions that fell due since then
+    (every student with ``rebuild=True``, on the first run, or when the
+    published model version changed). ``progress(done, total)`` is called
+    after each batch. Returns the number of students rescored.
+    """
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    highs = [model.objects.aggregate(high=Max('updated_at'))['high'] for model in TRACKED]
+    high = max((h for h in highs if h is not None), default=None)
+    model_version = _model_version()
+    now = timezone.now()
+
+    if rebuild or not watermark.value or RiskScore.objects.exclude(model_version=model_version).exists():
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+    else:
+        changed = set()
+        if high is not None:
+            for model in TRACKED:
+                changed.update(
+                    model.objects.filter(updated_at__gt=watermark.since(), updated_at__lte=high)
+                    .values_list('student_id', flat=True)
+                    .distinct()
+                )
+        # Missed by the passage of time alone: no row changes when a due date passes
+        changed.update(
+            AssignmentSubmission.objects.filter(
+                status='pending', assignment__due_date__gt=watermark.updated_at, assignment__due_date__lte=now,
+            )
+            .values_list('student_id', flat=True)
+            .distinct()
+        )
+        # Students added since the last run have nothing to change yet
+        changed.update(Student.objects.filter(risk__isnull=True).values_list('pk', flat=True))
+        student_ids = sorted(changed)
+
+    scored = 0
+    for i in range(0, len(student_ids), batch_size):
+        scored += score_students(student_ids[i:i + batch_size], model_version=model_version)
+        if progress:
+            progress(min(i + batch_size, len(student_ids)), len(student_ids))
+
+    # updated_at marks this run for the next one's due-date check: ``now``,
+    # not the time of saving, so nothing falling due meanwhile is skipped
+    RollupWatermark.objects.filter(pk=watermark.pk).update(value=high or watermark.value, updated_at=now)
+    return scored
+
+
+def at_risk_students(course=None, levels=('high', 'medium')):
+    """Scores at the given levels, highest first, served from the score index."""
+    scores = RiskScore.objects.filter(level__in=levels).select_related(
+        'student__user_profile__user', 'student__course',
+    ).order_by('-score')
+    if course is not None:
+        scores = scores.filter(student__course=course)
+    return scores
@@ -0,0 +1,244 @@
+"""
+End-of-term rollover.
+
+``plan_rollover`` works out the whole transition in memory: each course's
+successor (same name and section, next semester, created when missing),
+which active students move there, which final-semester students graduate,
+and which ``CourseSubject``/``TeacherSubject`` mappings are copied to
+successors that have none yet. ``apply_rollover`` then writes it in one
+transaction with ``bulk_create`` and a handful of set-based UPDATEs,
+instead of one save per student.
+
+Each course rolled over is recorded in ``TermRollover`` for the term, and
+a second rollover of it (or of a course that received its students) in
+the same term is refused. So is a rollover that would put a successor
+course over its capacity; ``apply_rollover`` rechecks both with the
+courses locked.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .archive import academic_year
+from .enrollment import SEATED_STATUSES
+from .models import Course, CourseSubject, Student, TeacherSubject, TermRollover
+
+
+class RolloverError(Exception):
+    pass
+
+
+def current_term(day=None):
+    """Label of the term containing ``day`` (default today), e.g. ``2025-2026/T1``."""
+    day = day or timezone.localdate()
+    label, start, _ = academic_year(day)
+    months = (day.year - start.year) * 12 + day.month - start.month
+    return f'{label}/T{months * settings.TERMS_PER_YEAR // 12 + 1}'
+
+
+def successor_code(course):
+    suffix = f'-S{course.semester}'
+    base = course.code[:-len(suffix)] if course.code.endswith(suffix) else course.code
+    return f'{base}-S{course.semester + 1}'
+
+
+class RolloverPlan:
+    def __init__(self, term):
+        self.term = term
+        self.moves = {}            # course id -> successor Course (saved or new)
+        self.new_courses = []      # successors to create
+        self.graduating = []       # final-semester course ids
+        self.students = {}         # course id -> active students in it
+        self.course_subjects = []  # (successor, subject id, semester)
+        self.teacher_subjects = [] # (successor, subject id, teacher id)
+        self.codes = {}            # course id -> code, for describe()
+        self.timings = {}
+
+    @property
+    def promoted(self):
+        return sum(self.students.get(course_id, 0) for course_id in self.moves)
+
+    @property
+    def graduated(self):
+        return sum(self.students.get(course_id, 0) for course_id in self.graduating)
+
+    def summary(self):
+        return {
+            'students_promoted': self.promoted,
+            'students_graduated': self.graduated,
+            'courses_created': len(self.new_courses),
+            'course_subjects_copied': len(self.course_subjects),
+            'teacher_subjects_copied': len(self.teacher_subjects),
+        }
+
+    def describe(self):
+        """One line per course, for dry runs."""
+        lines = [f"Term {self.term}"]
+        for course_id, successor in self.moves.items():
+            new = ' (new)' if successor.pk is None else ''
+            lines.append(f"{self.codes[course_id]} -> {successor.code}{new}: {self.students.get(course_id, 0)} students")
+        for course_id in self.graduating:
+            lines.append(f"{self.codes[course_id]}: {self.students.get(course_id, 0)} students graduate")
+        return lines
+
+
+def _count_students(course_ids):
+    return dict(
+        Student.objects.filter(course_id__in=course_ids, status__in=SEATED_STATUSES)
+        .values_list('course_id').annotate(count=Count('id'))
+    )
+
+
+def _check_repeat(plan):
+    """Refuse courses already rolled over this term, or filled by this term's rollover."""
+    sources = set(plan.moves) | set(plan.graduating)
+    done = TermRollover.objects.filter(term=plan.term).filter(Q(course_id__in=sources) | Q(successor_id__in=sources))
+    repeated = sorted({plan.codes[course_id] for pair in done.values_list('course_id', 'successor_id')
+                       for course_id in pair if course_id in sources})
+    if repeated:
+        raise RolloverError(f"Already rolled over for {plan.term}: {', '.join(repeated)}")
+
+
+def _check_capacity(plan):
+    """Refuse a rollover that would put any successor course over its capacity."""
+    sources = set(plan.moves) | set(plan.graduating)
+    existing = {successor.pk for successor in plan.moves.values() if successor.pk is not None}
+    # Students of a successor that is itself rolled over leave it
+    staying = _count_students(existing - sources)
+    load = {}
+    for course_id, successor in plan.moves.items():
+        key = successor.pk or successor.code
+        load.setdefault(key, [successor, staying.get(successor.pk, 0)])[1] += plan.students.get(course_id, 0)
+    overfull = [
+        f"{successor.code} ({seats} for {successor.capacity} seats)"
+        for successor, seats in load.values() if seats > successor.capacity
+    ]
+    if overfull:
+        raise RolloverError(f"Successor courses would be over capacity: {', '.join(sorted(overfull))}")
+
+
+def plan_rollover(courses=None, final_semester=None, term=None):
+    """
+    Compute the rollover of ``courses`` (default: every course) for
+    ``term`` (default: the current one); raises ``RolloverError`` if it
+    was already done or doesn't fit.
+    """
+    started = time.perf_counter()
+    final_semester = final_semester or settings.ROLLOVER_FINAL_SEMESTER
+    plan = RolloverPlan(term or current_term())
+    every = list(Course.objects.all())
+    by_slot = {(c.name, c.section, c.semester): c for c in every}
+    codes = {c.code for c in every}
+    sources = every if courses is None else list(courses)
+    plan.codes = {c.pk: c.code for c in every}
+
+    for course in sources:
+        if course.semester >= final_semester:
+            plan.graduating.append(course.pk)
+            continue
+        successor = by_slot.get((course.name, course.section, course.semester + 1))
+        if successor is None:
+            code = successor_code(course)
+            if code in codes:
+                raise RolloverError(f"Can't create the next semester of {course.code}: code {code} is taken")
+            successor = Course(
+                name=course.name,
+                code=code,
+                semester=course.semester + 1,
+                section=course.section,
+                capacity=course.capacity,
+                description=course.description,
+                class_teacher_id=course.class_teacher_id,
+            )
+            by_slot[(course.name, course.section, course.semester + 1)] = successor
+            codes.add(code)
+            plan.new_courses.append(successor)
+        plan.moves[course.pk] = successor
+
+    _check_repeat(plan)
+    plan.students = _count_students([c.pk for c in sources])
+    _check_capacity(plan)
+
+    # Copy mappings only into successors that have none of their own
+    mapped = set(CourseSubject.objects.values_list('course_id', flat=True).distinct())
+    taught = set(TeacherSubject.objects.values_list('course_id', flat=True).distinct())
+    copy_subjects = {pk: s for pk, s in plan.moves.items() if s.pk is None or s.pk not in mapped}
+    copy_teachers = {pk: s for pk, s in plan.moves.items() if s.pk is None or s.pk not in taught}
+    for course_id, subject_id in CourseSubject.objects.filter(
+        course_id__in=list(copy_subjects),
+    ).values_list('course_id', 'subject_id'):
+        successor = copy_subjects[course_id]
+        plan.course_subjects.append((successor, subject_id, successor.semester))
+    for course_id, subject_id, teacher_id in TeacherSubject.objects.filter(
+        course_id__in=list(copy_teachers),
+    ).values_list('course_id', 'subject_id', 'teacher_id'):
+        plan.teacher_subjects.append((copy_teachers[course_id], subject_id, teacher_id))
+
+    plan.timings['plan'] = time.perf_counter() - started
+    return plan
+
+
+def _timed(plan, name, func):
+    started = time.perf_counter()
+    result = func()
+    plan.timings[name] = time.perf_counter() - started
+    return result
+
+
+@transaction.atomic
+def apply_rollover(plan):
+    """
+    Write ``plan`` in one transaction; returns ``plan.summary()``. Raises
+    ``RolloverError`` if, with the courses locked, it was done meanwhile or
+    no longer fits.
+    """
+    now = timezone.now()
+    sources = list(plan.moves) + plan.graduating
+    existing = [successor.pk for successor in plan.moves.values() if successor.pk is not None]
+    # Lock in primary key order, like enroll(), so admissions wait for the move
+    list(Course.objects.select_for_update().filter(pk__in=sources + existing).order_by('pk').values_list('pk'))
+    _check_repeat(plan)
+    plan.students = _count_students(sources)
+    _check_capacity(plan)
+
+    if plan.new_courses:
+        _timed(plan, 'create_courses', lambda: Course.objects.bulk_create(plan.new_courses))
+
+    active = Q(status__in=SEATED_STATUSES)
+    if plan.moves:
+        # One statement moves every cohort; each row's CASE sees its old course
+        course = Case(
+            *[When(course_id=course_id, then=Value(successor.pk)) for course_id, successor in plan.moves.items()],
+            default=F('course_id'),
+            output_field=BigIntegerField(),
+        )
+        _timed(plan, 'promote_students', lambda: Student.objects.filter(
+            active, course_id__in=list(plan.moves),
+        ).update(course_id=course, updated_at=now))
+    if plan.graduating:
+        _timed(plan, 'graduate_students', lambda: Student.objects.filter(
+            active, course_id__in=plan.graduating,
+        ).update(status='graduated', updated_at=now))
+
+    _timed(plan, 'copy_mappings', lambda: (
+        CourseSubject.objects.bulk_create([
+            CourseSubject(course_id=successor.pk, subject_id=subject_id, semester=semester)
+            for successor, subject_id, semester in plan.course_subjects
+        ], batch_size=1000, ignore_conflicts=True),
+        TeacherSubject.objects.bulk_create([
+            TeacherSubject(course_id=successor.pk, subject_id=subject_id, teacher_id=teacher_id)
+            for successor, subject_id, teacher_id in plan.teacher_subjects
+        ], batch_size=1000, ignore_conflicts=True),
+    ))
+    TermRollover.objects.bulk_create([
+        TermRollover(term=plan.term, course_id=course_id, successor_id=successor.pk,
+                     students=plan.students.get(course_id, 0))
+        for course_id, successor in plan.moves.items()
+    ] + [
+        TermRollover(term=plan.term, course_id=course_id, students=plan.students.get(course_id, 0))
+        for course_id in plan.graduating
+    ])
+    return plan.summary()
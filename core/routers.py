@@ -0,0 +1,115 @@
+"""
+Read-replica routing.
+
+Reads go to the ``replica`` database only when the code asked for it
+(views marked with ``replica_reads``, or inside ``read_from_replica()``),
+and never after the current request or session has written, so users
+always see their own changes. Every write goes to ``default``.
+
+Archived attendance is the exception: when an ``archive`` database is
+configured, ``ArchiveRouter`` sends that table there for reads, writes and
+migrations.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+ARCHIVE = 'archive'
+
+# Models stored in the archive database, when there is one
+ARCHIVE_MODELS = {'attendancearchive'}
+
+# Apps whose reads must always see the latest write (e.g. the session that
+# carries the sticky-after-write marker itself)
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('replica_pinned', default=False)
+_wrote = ContextVar('replica_wrote', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def start_routing(pinned=False):
+    """Reset routing state for a new request; returns tokens for ``finish_routing``."""
+    return _replica_reads.set(False), _pinned.set(pinned), _wrote.set(False)
+
+
+def finish_routing(tokens):
+    for var, token in zip((_replica_reads, _pinned, _wrote), tokens):
+        var.reset(token)
+
+
+def allow_replica_reads():
+    _replica_reads.set(True)
+
+
+def has_written():
+    return _wrote.get()
+
+
+@contextmanager
+def read_from_replica():
+    """Send reads inside the block to the replica (unless pinned by a write)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view_func):
+    """Mark a function view as read-only so its queries may use the replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+class ReplicaReadMixin:
+    """Mark a class-based view as read-only so its queries may use the replica."""
+    replica_reads = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_configured() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        if _replica_reads.get() and not _pinned.get() and not _wrote.get():
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, REPLICA}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ArchiveRouter:
+    def _archived(self, app_label, model_name):
+        return app_label == 'core' and model_name in ARCHIVE_MODELS
+
+    def db_for_read(self, model, **hints):
+        if ARCHIVE in settings.DATABASES and self._archived(model._meta.app_label, model._meta.model_name):
+            return ARCHIVE
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if ARCHIVE not in settings.DATABASES:
+            return None
+        if db == ARCHIVE:
+            return self._archived(app_label, model_name)
+        if self._archived(app_label, model_name):
+            return False
+        return None
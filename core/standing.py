@@ -0,0 +1,161 @@
+"""
+Credit-weighted GPA and CGPA.
+
+Each subject a student sat in a semester (the semester of the exam's
+course) gets one grade from its combined marks that term, as on report
+cards, worth ``GRADE_POINTS`` times ``Subject.credits``. Term GPA is the
+credit-weighted mean over that semester's subjects and CGPA the mean over
+all of them. ``refresh_course`` computes a whole course from one grouped
+query, ``update_standing`` recomputes a single student after one of their
+results changes, and ``refresh_standings`` catches up on results changed
+since the stored watermark. Deleted results leave no row to find, so the
+admin recomputes the students whose results (or exams) it deletes; deletes
+made elsewhere need a rebuild. ``AcademicStanding`` keeps the figures for
+ranking and honor-roll queries; rebuild it after changing credits.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import F, Max, Sum, Window
+from django.db.models.functions import Rank
+
+from .models import AcademicStanding, Course, Result, RollupWatermark, Student
+from .reports import _percent, grade_for
+
+WATERMARK = 'standings'
+
+# Students computed per query when catching up
+BATCH_SIZE = 500
+
+GRADE_POINTS = {'A': 4, 'B': 3, 'C': 2, 'D': 1, 'F': 0}
+
+HONOR_ROLL_CGPA = Decimal('3.50')
+
+
+def _gpa(points, credits):
+    if not credits:
+        return Decimal('0.00')
+    return (Decimal(points) / Decimal(credits)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def compute_standings(**filters):
+    """
+    Return unsaved ``AcademicStanding`` rows for students with graded
+    results matching ``filters``, from one grouped query.
+    """
+    rows = (
+        Result.objects.filter(marks_obtained__isnull=False, total_marks__gt=0, exam__isnull=False, **filters)
+        .values('student_id', 'subject_id', semester=F('exam__course__semester'), credits=F('subject__credits'))
+        .annotate(obtained=Sum('marks_obtained'), possible=Sum('total_marks'))
+    )
+    # student -> semester -> [points x credits, credits, credits earned]
+    terms = defaultdict(lambda: defaultdict(lambda: [0, 0, 0]))
+    for row in rows:
+        if row['credits'] <= 0:
+            continue
+        grade = grade_for(_percent(row['obtained'], row['possible']))
+        term = terms[row['student_id']][row['semester']]
+        term[0] += GRADE_POINTS[grade] * row['credits']
+        term[1] += row['credits']
+        if GRADE_POINTS[grade]:
+            term[2] += row['credits']
+
+    standings = []
+    for student_id, by_semester in terms.items():
+        latest = max(by_semester)
+        points, attempted, earned = (sum(values) for values in zip(*by_semester.values()))
+        standings.append(AcademicStanding(
+            student_id=student_id,
+            semester=latest,
+            gpa=_gpa(*by_semester[latest][:2]),
+            cgpa=_gpa(points, attempted),
+            credits_attempted=attempted,
+            credits_earned=earned,
+            terms={str(semester): str(_gpa(*term[:2])) for semester, term in sorted(by_semester.items())},
+        ))
+    return standings
+
+
+def save_standings(standings, student_ids):
+    """Upsert ``standings`` and drop rows of ``student_ids`` left without results."""
+    AcademicStanding.objects.bulk_create(
+        standings,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['semester', 'gpa', 'cgpa', 'credits_attempted', 'credits_earned', 'terms', 'computed_at'],
+    )
+    graded = {standing.student_id for standing in standings}
+    AcademicStanding.objects.filter(student_id__in=[pk for pk in student_ids if pk not in graded]).delete()
+    return len(standings)
+
+
+def refresh_course(course):
+    """Recompute every student of ``course``; returns the number with a standing."""
+    student_ids = list(Student.objects.filter(course=course).values_list('pk', flat=True))
+    return save_standings(compute_standings(student__course=course), student_ids)
+
+
+def update_standing(student_id):
+    """Recompute one student, e.g. after saving one of their results."""
+    return save_standings(compute_standings(student_id=student_id), [student_id])
+
+
+def update_standings(student_ids, batch_size=BATCH_SIZE, progress=None):
+    """
+    Recompute ``student_ids``, a batch per query, calling ``progress(done,
+    total)`` after each; returns the number of standings saved.
+    """
+    student_ids = sorted(set(student_ids))
+    saved = 0
+    for i in range(0, len(student_ids), batch_size):
+        batch = student_ids[i:i + batch_size]
+        saved += save_standings(compute_standings(student_id__in=batch), batch)
+        if progress:
+            progress(min(i + batch_size, len(student_ids)), len(student_ids))
+    return saved
+
+
+def refresh_standings(rebuild=False, batch_size=BATCH_SIZE, progress=None):
+    """
+    Recompute students whose results changed since the last run (every
+    course with ``rebuild=True``, or on the first run). ``progress(done,
+    total)`` is called after each course or batch. Returns the number of
+    standings saved.
+    """
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+    high = Result.objects.aggregate(high=Max('updated_at'))['high']
+
+    saved = 0
+    if rebuild or not watermark.value:
+        courses = list(Course.objects.order_by('pk'))
+        for i, course in enumerate(courses):
+            saved += refresh_course(course)
+            if progress:
+                progress(i + 1, len(courses))
+    elif high is not None:
+        saved = update_standings(
+            Result.objects.filter(updated_at__gt=watermark.since(), updated_at__lte=high)
+            .values_list('student_id', flat=True)
+            .distinct(),
+            batch_size,
+            progress,
+        )
+
+    if high is not None:
+        watermark.value = high
+        watermark.save(update_fields=['value', 'updated_at'])
+    return saved
+
+
+def ranked_standings(course=None):
+    """Standings by CGPA, highest first, with a ``rank`` (within ``course`` if given)."""
+    standings = AcademicStanding.objects.select_related('student__user_profile__user', 'student__course')
+    if course is not None:
+        standings = standings.filter(student__course=course)
+    return standings.annotate(rank=Window(Rank(), order_by=F('cgpa').desc())).order_by('-cgpa')
+
+
+def honor_roll(course=None, minimum=HONOR_ROLL_CGPA):
+    """Students with a CGPA of at least ``minimum``, served from the CGPA index."""
+    return ranked_standings(course).filter(cgpa__gte=minimum)
@@ -0,0 +1,23 @@
+import logging
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed, precompressed (gzip/brotli) static files.
+
+    A stylesheet that references a file missing from the static sources
+    keeps the reference as written instead of failing collectstatic.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            logger.warning("Static file %s is referenced but missing; leaving the reference unhashed", name)
+            return name
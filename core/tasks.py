@@ -0,0 +1,81 @@
+"""
+Background tasks run by ``manage.py run_worker``; see ``core.jobs``.
+
+Each task takes the running ``Job`` plus its JSON payload as keyword
+arguments, and returns a JSON-serialisable result.
+"""
+from .jobs import heartbeat, reporter, set_progress, task
+from .models import Course, ReportCard
+
+
+@task('report_cards')
+def report_cards(job, term, course=None, start=None, end=None, render=None, output='report_cards'):
+    from .reports import build_report_cards, render_report_cards
+
+    courses = Course.objects.order_by('code')
+    if course:
+        courses = courses.filter(code=course)
+    courses = list(courses)
+    steps = len(courses) + (1 if render else 0)
+
+    counts = {}
+    for i, item in enumerate(courses):
+        counts[item.code] = len(build_report_cards(item, term, start=start, end=end))
+        set_progress(job, (i + 1) * 100 // max(steps, 1), f"Computed report cards for {item.code}")
+
+    result = {'term': term, 'report_cards': counts}
+    if render:
+        paths = render_report_cards(ReportCard.objects.filter(course__in=courses, term=term), output, fmt=render)
+        result['rendered'] = len(paths)
+        result['output'] = output
+    return result
+
+
+@task('attendance_rollup')
+def attendance_rollup(job, rebuild=False):
+    from .analytics import refresh_attendance_daily
+
+    days, rows = refresh_attendance_daily(rebuild=rebuild, progress=reporter(job, "Recomputing days"))
+    return {'days': days, 'rows': rows}
+
+
+@task('ml_training_export', max_attempts=1)
+def ml_training_export(job):
+    from .ml.train_pass_fail import export_training_data
+
+    export_training_data(progress=reporter(job, "Building samples"))
+    return {'path': 'ml/pass_fail_training_data.csv'}
+
+
+@task('train_model', max_attempts=1)
+def train_model(job, **options):
+    from .ml.training import train
+
+    set_progress(job, 10, "Training pass/fail model")
+    with heartbeat(job):
+        metadata = train(**options)
+    return {'version': metadata['version'], 'metrics': metadata['metrics']}
+
+
+@task('risk_scores')
+def risk_scores(job, rebuild=False):
+    from .risk import refresh_risk_scores
+
+    return {'scored': refresh_risk_scores(rebuild=rebuild, progress=reporter(job, "Scoring students"))}
+
+
+@task('standings')
+def standings(job, rebuild=False):
+    from .standing import refresh_standings
+
+    return {'saved': refresh_standings(rebuild=rebuild, progress=reporter(job, "Computing standings"))}
+
+
+@task('notifications')
+def notifications(job, workers=None):
+    from .notifications import collect_notifications, send_digests
+
+    set_progress(job, 10, "Collecting absences and results")
+    collected = collect_notifications()
+    set_progress(job, 50, "Sending digests")
+    return {'collected': collected, **send_digests(workers=workers)}
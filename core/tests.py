@@ -1,3 +1,1214 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from time import sleep
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import InterfaceError, connection, transaction
+from django.db.models import Count, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    analytics, api, archive, audit, benchmarks, db, ical, ingest, instrumentation, jobs, notifications,
+    reports, risk, rollover, routers, standing, tables, throttle, warmup,
+)
+from .enrollment import CourseFull, activate, enroll
+from .management.commands import startup_report
+from .middleware import REPLICA_PIN_KEY, ReplicaRoutingMiddleware
+from .ml import features, predictor, training
+from .models import (
+    AcademicStanding, ArchivedYear, Attendance, AttendanceArchive, AttendanceDaily, AuditEntry, Course,
+    CourseSubject, Exam, Job, LogCheckpoint, Notification, Parent, ReportCard, Result, RiskScore, Student,
+    Subject, Teacher, TermRollover, Timetable, UserProfile,
+)
+from .pagination import EstimatedCountPaginator
+from .storage import StaticFilesStorage
+from .views import StudentListView
+
+
+def make_profile(username, role):
+    return UserProfile.objects.create(user=User.objects.create(username=username), role=role)
+
+
+def make_student(course, number, status='active', **fields):
+    return Student.objects.create(
+        user_profile=make_profile(f'student{number}', 'student'),
+        student_id=f'S{number}', roll_number=f'R{number}', course=course, status=status, **fields,
+    )
+
+
+# ---------------------------------------------------
+# REPORT CARDS
+# ---------------------------------------------------
+
+class ReportCardTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.subject = Subject.objects.create(name='Mechanics', code='MEC')
+        exam = Exam.objects.create(subject=self.subject, course=self.course, exam_name='Midterm', exam_date=MONDAY)
+        self.students = [make_student(self.course, number) for number in range(3)]
+        for student, marks in zip(self.students, [85, 55]):
+            Result.objects.create(student=student, subject=self.subject, exam=exam, marks_obtained=marks)
+        for status in ['present', 'late', 'absent', 'present']:
+            Attendance.objects.create(
+                student=self.students[0], subject=self.subject, status=status,
+                attendance_date=MONDAY + timedelta(days=Attendance.objects.count()),
+            )
+
+    def test_cards_carry_marks_grades_ranks_and_attendance(self):
+        reports.build_report_cards(self.course, '2024-T1')
+        cards = {card.student_id: card for card in ReportCard.objects.all()}
+        first, second, absent = (cards[student.pk] for student in self.students)
+        self.assertEqual((first.percentage, first.grade, first.class_rank), (Decimal('85.00'), 'A', 1))
+        self.assertEqual((second.percentage, second.grade, second.class_rank), (Decimal('55.00'), 'D', 2))
+        self.assertEqual(first.attendance_percentage, Decimal('75.00'))
+        self.assertEqual(first.subjects[0]['rank'], 1)
+        self.assertEqual((absent.grade, absent.class_rank, absent.subjects), (None, None, []))
+
+    def test_rebuilding_a_term_updates_the_cards_in_place(self):
+        reports.build_report_cards(self.course, '2024-T1')
+        Result.objects.filter(student=self.students[1]).update(marks_obtained=95)
+        reports.build_report_cards(self.course, '2024-T1')
+        self.assertEqual(ReportCard.objects.count(), 3)
+        self.assertEqual(ReportCard.objects.get(student=self.students[1]).class_rank, 1)
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        with CaptureQueriesContext(connection) as small:
+            reports.build_report_cards(self.course, '2024-T1')
+        for number in range(3, 10):
+            make_student(self.course, number)
+        with self.assertNumQueries(len(small)):
+            reports.build_report_cards(self.course, '2024-T1')
+
+    def test_cards_render_to_html(self):
+        reports.build_report_cards(self.course, '2024-T1')
+        card = ReportCard.objects.select_related('student__user_profile__user', 'course').get(student=self.students[0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = reports._render_one((reports.report_card_context(card), directory, 'html'))
+            with open(path, encoding='utf-8') as fh:
+                html = fh.read()
+        self.assertTrue(path.endswith('R0_2024-T1.html'))
+        self.assertIn('Mechanics', html)
+
+
+# ---------------------------------------------------
+# DATABASE PROFILE
+# ---------------------------------------------------
+
+class DatabaseProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_connections_get_the_configured_pragmas(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -4000}):
+            db.apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4000)
+
+    def test_other_backends_are_left_alone(self):
+        other = mock.Mock(vendor='postgresql')
+        db.apply_sqlite_pragmas(sender=None, connection=other)
+        other.cursor.assert_not_called()
+
+    def test_sqlite_takes_the_write_lock_up_front_and_waits_for_it(self):
+        options = connection.settings_dict['OPTIONS']
+        self.assertEqual((options['transaction_mode'], options['timeout']), ('IMMEDIATE', 20))
+
+
+# ---------------------------------------------------
+# READ REPLICA ROUTING
+# ---------------------------------------------------
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        for target in ('core.routers.replica_configured', 'core.middleware.replica_configured'):
+            patcher = mock.patch(target, return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.router = routers.ReplicaRouter()
+        tokens = routers.start_routing()
+        self.addCleanup(routers.finish_routing, tokens)
+
+    def read(self):
+        return self.router.db_for_read(Student)
+
+    def serve(self, request, respond):
+        """Run ``respond()`` as a replica-reading view behind the routing middleware."""
+        middleware = ReplicaRoutingMiddleware(None)
+
+        def get_response(request):
+            middleware.process_view(request, StudentListView.as_view(), (), {})
+            return respond()
+        middleware.get_response = get_response
+        return middleware(request)
+
+    def test_reads_use_the_replica_only_when_asked(self):
+        self.assertEqual(self.read(), routers.PRIMARY)
+        with routers.read_from_replica():
+            self.assertEqual(self.read(), routers.REPLICA)
+            self.assertEqual(self.router.db_for_read(Session), routers.PRIMARY)
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        with routers.read_from_replica():
+            self.assertEqual(self.router.db_for_write(Student), routers.PRIMARY)
+            self.assertEqual(self.read(), routers.PRIMARY)
+
+    def test_session_sticks_to_the_primary_after_it_writes(self):
+        request = RequestFactory().get('/')
+        request.session = {}
+        self.assertEqual(self.serve(request, lambda: HttpResponse(self.read())).content.decode(), routers.REPLICA)
+
+        def write():
+            self.router.db_for_write(Student)
+            return HttpResponse()
+        self.serve(request, write)
+        self.assertIn(REPLICA_PIN_KEY, request.session)
+        self.assertEqual(self.serve(request, lambda: HttpResponse(self.read())).content.decode(), routers.PRIMARY)
+
+
+# ---------------------------------------------------
+# INSTRUMENTATION
+# ---------------------------------------------------
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.addCleanup(instrumentation.registry.reset)
+
+    def test_fingerprint_folds_literals_and_in_lists(self):
+        self.assertEqual(
+            instrumentation.fingerprint("SELECT * FROM t WHERE a = 'x' AND b = 12 AND c IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)",
+        )
+
+    def test_histogram_percentiles_are_bucket_bounds(self):
+        histogram = instrumentation.Histogram([10, 100])
+        for value in [1, 2, 50, 500]:
+            histogram.observe(value)
+        self.assertEqual((histogram.percentile(50), histogram.percentile(75), histogram.percentile(99)),
+                         (10, 100, float('inf')))
+
+    def test_requests_are_recorded_per_view_with_repeated_queries(self):
+        Course.objects.create(name='Physics', code='PHY1', semester=1)
+        with override_settings(SLOW_QUERY_MS=0):
+            self.client.get(reverse('course_list'))
+        stats = instrumentation.registry.snapshot()
+        view = stats['views']['course_list']
+        self.assertEqual((view['requests'], view['queries']['count']), (1, 1))
+        self.assertTrue(stats['slow_queries'])
+        self.assertIn('sms_view_queries_bucket{view="course_list",le="+Inf"} 1', instrumentation.registry.prometheus())
+
+    def test_collector_counts_duplicates(self):
+        collector = instrumentation.QueryCollector(slow_query_ms=1000)
+        execute = mock.Mock()
+        for pk in (1, 2):
+            collector(execute, f'SELECT * FROM t WHERE id = {pk}', None, False, {})
+        instrumentation.registry.record('view', 5.0, collector)
+        duplicates = instrumentation.registry.snapshot()['views']['view']['duplicate_queries']
+        self.assertEqual(duplicates, [{'sql': 'SELECT * FROM t WHERE id = ?', 'repeats': 1}])
+
+
+# ---------------------------------------------------
+# BENCHMARKS AND SEED DATA
+# ---------------------------------------------------
+
+class BenchmarkTests(TestCase):
+    def test_percentiles(self):
+        self.assertEqual(benchmarks.percentiles([]), (0.0, 0.0))
+        self.assertEqual(benchmarks.percentiles([4.0]), (4.0, 4.0))
+        p50, p95 = benchmarks.percentiles([float(value) for value in range(1, 101)])
+        self.assertEqual((round(p50, 2), round(p95, 2)), (50.5, 95.95))
+
+    def test_cases_report_missing_requirements(self):
+        register = benchmarks.case('optional_dependency', 'tests', requires=('json', 'no_such_module_here'))
+        func = register(lambda ctx: None)
+        self.addCleanup(benchmarks.CASES.pop, 'optional_dependency')
+        self.assertEqual(benchmarks.missing_requirements(func), ['no_such_module_here'])
+
+    def test_failing_case_raises_before_it_is_timed(self):
+        func = mock.Mock(side_effect=benchmarks.CaseError('500'), group='tests')
+        with self.assertRaises(benchmarks.CaseError):
+            benchmarks.run_case(func, None, repeat=5, warmup=0)
+        self.assertEqual(func.call_count, 1)
+
+    def test_run_case_times_and_counts_queries(self):
+        func = mock.Mock(side_effect=lambda ctx: list(Course.objects.all()), group='tests')
+        result = benchmarks.run_case(func, None, repeat=3, warmup=1)
+        self.assertEqual((func.call_count, result['queries'], result['group']), (4, 1, 'tests'))
+
+    def test_seeded_school_is_reproducible(self):
+        options = {'courses': 1, 'sections': 1, 'students': 3, 'subjects': 2, 'teachers': 2, 'days': 3,
+                   'stdout': StringIO()}
+        call_command('seed_school', **options)
+        first = list(Attendance.objects.order_by('student__roll_number', 'attendance_date', 'subject__code')
+                     .values_list('student__roll_number', 'attendance_date', 'status'))
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertTrue(first)
+        call_command('seed_school', flush=True, **options)
+        again = list(Attendance.objects.order_by('student__roll_number', 'attendance_date', 'subject__code')
+                     .values_list('student__roll_number', 'attendance_date', 'status'))
+        self.assertEqual(again, first)
+
+
+# ---------------------------------------------------
+# TEMPLATE WARMUP
+# ---------------------------------------------------
+
+class TemplateWarmupTests(TestCase):
+    def test_only_project_templates_are_listed(self):
+        names = warmup.project_template_names(engines['django'])
+        self.assertIn('core/generic_list.html', names)
+        self.assertIn('notifications/digest.txt', names)
+        self.assertNotIn('admin/base.html', names)
+
+    @override_settings(TEMPLATE_WARMUP=False)
+    def test_warmup_is_off_unless_configured_or_forced(self):
+        self.assertEqual(warmup.warm_templates(), (0, [], 0.0))
+        compiled, errors, _seconds = warmup.warm_templates(force=True)
+        self.assertEqual((compiled, errors), (len(warmup.project_template_names(engines['django'])), []))
+
+    def test_broken_templates_are_reported(self):
+        names = ['core/generic_list.html', 'core/missing.html']
+        with mock.patch.object(warmup, 'project_template_names', return_value=names), \
+                self.assertLogs('core.warmup', 'WARNING'):
+            compiled, errors, _seconds = warmup.warm_templates(force=True)
+        self.assertEqual((compiled, [name for name, error in errors]), (1, ['core/missing.html']))
+
+
+# ---------------------------------------------------
+# WORKER START-UP
+# ---------------------------------------------------
+
+class StartupReportTests(TestCase):
+    def test_parse_importtime(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   json.decoder\n'
+            'import time:        80 |        400 | json\n'
+            'something else\n'
+        )
+        self.assertEqual(startup_report.parse_importtime(stderr), {'json.decoder': (120, 120), 'json': (80, 400)})
+
+    def test_worker_boots_without_heavy_modules(self):
+        out = StringIO()
+        call_command('startup_report', strict=True, top=1, stdout=out)
+        self.assertIn('No heavy modules imported at boot.', out.getvalue())
+        # json is always loaded, so a list naming it must fail
+        with mock.patch.object(startup_report, 'HEAVY_MODULES', ['json']), self.assertRaises(CommandError):
+            call_command('startup_report', strict=True, top=1, stdout=StringIO())
+
+
+# ---------------------------------------------------
+# STATIC FILES
+# ---------------------------------------------------
+
+class StaticStorageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = StaticFilesStorage(location=directory.name, base_url='/static/')
+
+    def test_existing_files_get_content_hashed_names(self):
+        self.storage.save('css/site.css', ContentFile(b'body { color: red }'))
+        name = self.storage.hashed_name('css/site.css')
+        self.assertRegex(name, r'^css/site\.[0-9a-f]{12}\.css$')
+
+    def test_references_to_missing_files_are_kept_as_written(self):
+        with self.assertLogs('core.storage', 'WARNING'):
+            self.assertEqual(self.storage.hashed_name('img/missing.png'), 'img/missing.png')
+
+
+# ---------------------------------------------------
+# SESSIONS
+# ---------------------------------------------------
+
+class PurgeSessionsTests(TestCase):
+    def test_only_expired_sessions_are_purged_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_sessions', batch_size=2, pause=0, stdout=out)
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        deletes = [query for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+
+
+# ---------------------------------------------------
+# AT-RISK SCORES
+# ---------------------------------------------------
+
+class RiskScoreTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.subject = Subject.objects.create(name='Mechanics', code='MEC')
+        self.students = [make_student(course, number) for number in range(2)]
+        for student in self.students:
+            Attendance.objects.create(student=student, subject=self.subject, attendance_date=MONDAY, status='present')
+
+    def test_score_weights_the_signals(self):
+        self.assertEqual(risk.score(1.0, 0.0, 0, 90, 5), 0)
+        self.assertEqual(risk.score(0.0, -0.5, 5, 0, -30), 100)
+        self.assertEqual(risk.score(1.0, 0.0, 0, 90, 5, pass_probability=0.2), 40)
+        self.assertEqual(risk.level_for(40), 'medium')
+
+    @override_settings(WATERMARK_OVERLAP_SECONDS=0)
+    def test_refresh_rescores_only_changed_students(self):
+        self.assertEqual(risk.refresh_risk_scores(), 2)
+        self.assertEqual(risk.refresh_risk_scores(), 0)
+        Attendance.objects.filter(student=self.students[1]).update(status='absent', updated_at=timezone.now())
+        self.assertEqual(risk.refresh_risk_scores(), 1)
+        self.assertEqual(RiskScore.objects.get(student=self.students[1]).recent_attendance, 0)
+
+    def test_a_new_model_version_rescores_everyone(self):
+        risk.refresh_risk_scores()
+        with mock.patch.object(risk, '_model_version', return_value='7'), \
+                mock.patch.object(risk, '_pass_probabilities', return_value={}):
+            self.assertEqual(risk.refresh_risk_scores(), 2)
+        self.assertEqual(set(RiskScore.objects.values_list('model_version', flat=True)), {'7'})
+
+
+# ---------------------------------------------------
+# PAGINATION
+# ---------------------------------------------------
+
+class PaginatorTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        for number in range(3):
+            make_student(self.course, number)
+
+    def test_big_tables_use_the_estimated_count(self):
+        Student.objects.get(student_id='S1').delete()
+        paginator = EstimatedCountPaginator(Student.objects.order_by('pk'), 100)
+        with mock.patch.object(EstimatedCountPaginator, 'threshold', 1):
+            # SQLite estimates from the primary key range, gaps included
+            self.assertEqual(paginator.count, 3)
+        filtered = EstimatedCountPaginator(Student.objects.filter(course=self.course).order_by('pk'), 100)
+        with mock.patch.object(EstimatedCountPaginator, 'threshold', 1):
+            self.assertEqual(filtered.count, 2)
+
+    def test_admin_changelist_skips_the_full_count(self):
+        self.client.force_login(User.objects.create(username='admin', is_staff=True, is_superuser=True))
+        with mock.patch.object(EstimatedCountPaginator, 'threshold', 1):
+            response = self.client.get(reverse('admin:core_student_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['cl'].paginator, EstimatedCountPaginator)
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+
+# ---------------------------------------------------
+# ARCHIVAL
+# ---------------------------------------------------
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        subject = Subject.objects.create(name='Mechanics', code='MEC')
+        for number in range(2):
+            student = make_student(course, number)
+            Attendance.objects.create(student=student, subject=subject, attendance_date=MONDAY, status='present')
+            Attendance.objects.create(
+                student=student, subject=subject, attendance_date=date(2024, 5, number + 1), status='absent',
+            )
+
+    def test_archive_year_moves_the_closed_year(self):
+        self.assertEqual(archive.archive_year('2023-2024', dry_run=True), 2)
+        self.assertEqual(AttendanceArchive.objects.count(), 0)
+        self.assertEqual(archive.archive_year('2023-2024', batch_size=1), 2)
+        self.assertEqual(Attendance.objects.filter(attendance_date__lt=date(2024, 4, 1)).count(), 0)
+        self.assertEqual(ArchivedYear.objects.get(label='2023-2024').rows, 2)
+        self.assertEqual(archive.archived_through(), date(2024, 3, 31))
+        # Re-running after the move finds nothing left to do
+        self.assertEqual(archive.archive_year('2023-2024'), 0)
+        self.assertEqual(AttendanceArchive.objects.count(), 2)
+
+    def test_open_year_cannot_be_archived(self):
+        with self.assertRaises(archive.ArchiveError):
+            archive.archive_year(archive.academic_year(timezone.localdate())[0])
+
+    def test_aggregates_read_the_archive_only_when_needed(self):
+        archive.archive_year('2023-2024')
+        totals = archive.aggregate_attendance(['status'], {'days': Count('pk')})
+        self.assertEqual(totals, {('present',): {'days': 2}, ('absent',): {'days': 2}})
+        recent = archive.aggregate_attendance(['status'], {'days': Count('pk')}, start=date(2024, 4, 1))
+        self.assertEqual(recent, {('absent',): {'days': 2}})
+
+    def test_api_refuses_archived_dates(self):
+        archive.archive_year('2023-2024')
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+        url = reverse('api', args=['attendance'])
+        self.assertEqual(self.client.get(url, {'from': '2024-01-01'}).status_code, 410)
+        self.assertEqual(len(self.client.get(url, {'from': '2024-04-01'}).json()['data']), 2)
+
+
+# ---------------------------------------------------
+# TERM ROLLOVER
+# ---------------------------------------------------
+
+class RolloverTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY-S1', semester=1, capacity=2)
+        final = Course.objects.create(name='Chemistry', code='CHM-S2', semester=2)
+        subject = Subject.objects.create(name='Mechanics', code='MEC')
+        CourseSubject.objects.create(course=self.course, subject=subject, semester=1)
+        self.students = [make_student(self.course, number) for number in range(2)]
+        self.students.append(make_student(final, 2))
+
+    def roll(self):
+        return rollover.apply_rollover(rollover.plan_rollover(final_semester=2, term='2024-2025/T1'))
+
+    def test_rollover_promotes_and_graduates(self):
+        summary = self.roll()
+        self.assertEqual(
+            (summary['students_promoted'], summary['students_graduated'], summary['courses_created']), (2, 1, 1),
+        )
+        successor = Course.objects.get(code='PHY-S2')
+        self.assertEqual(Student.objects.filter(course=successor).count(), 2)
+        self.assertEqual(Student.objects.get(pk=self.students[2].pk).status, 'graduated')
+        self.assertTrue(CourseSubject.objects.filter(course=successor, semester=2).exists())
+
+    def test_second_rollover_in_a_term_is_refused(self):
+        self.roll()
+        with self.assertRaises(rollover.RolloverError):
+            self.roll()
+        self.assertEqual(Course.objects.filter(code__startswith='PHY').count(), 2)
+        self.assertEqual(TermRollover.objects.count(), 2)
+
+    def test_overfull_successor_is_refused(self):
+        Course.objects.create(name='Physics', code='PHY-S2', semester=2, capacity=1)
+        with self.assertRaises(rollover.RolloverError):
+            self.roll()
+        self.assertEqual(Student.objects.filter(course=self.course).count(), 2)
+
+
+# ---------------------------------------------------
+# ACADEMIC STANDING
+# ---------------------------------------------------
+
+class StandingTests(TestCase):
+    def setUp(self):
+        first = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        second = Course.objects.create(name='Physics', code='PHY2', semester=2)
+        mechanics = Subject.objects.create(name='Mechanics', code='MEC', credits=4)
+        optics = Subject.objects.create(name='Optics', code='OPT', credits=2)
+        exams = [
+            Exam.objects.create(subject=subject, course=course, exam_name='Final', exam_date=MONDAY)
+            for subject, course in [(mechanics, first), (optics, first), (mechanics, second)]
+        ]
+        self.students = [make_student(second, number) for number in range(2)]
+        self.results = {}
+        for student, marks in zip(self.students, [(85, 55, 95), (95, 95, None)]):
+            for exam, mark in zip(exams, marks):
+                if mark is not None:
+                    self.results[student.pk, exam.pk] = Result.objects.create(
+                        student=student, subject=exam.subject, exam=exam, marks_obtained=mark,
+                    )
+        self.optics = exams[1]
+
+    def test_gpa_is_credit_weighted_per_semester(self):
+        self.assertEqual(standing.refresh_standings(), 2)
+        record = AcademicStanding.objects.get(student=self.students[0])
+        # Semester 1: A (4) x 4 credits + D (1) x 2 credits over 6 credits
+        self.assertEqual(record.terms, {'1': '3.00', '2': '4.00'})
+        self.assertEqual((record.semester, record.gpa, record.cgpa), (2, Decimal('4.00'), Decimal('3.40')))
+        self.assertEqual((record.credits_attempted, record.credits_earned), (10, 10))
+
+    def test_honor_roll_ranks_by_cgpa(self):
+        standing.refresh_standings()
+        ranked = [(row.student_id, row.rank) for row in standing.ranked_standings()]
+        self.assertEqual(ranked, [(self.students[1].pk, 1), (self.students[0].pk, 2)])
+        self.assertEqual([row.student_id for row in standing.honor_roll()], [self.students[1].pk])
+
+    @override_settings(WATERMARK_OVERLAP_SECONDS=0)
+    def test_refresh_recomputes_only_changed_results(self):
+        standing.refresh_standings()
+        self.assertEqual(standing.refresh_standings(), 0)
+        result = self.results[self.students[0].pk, self.optics.pk]
+        result.marks_obtained = 95
+        result.save()
+        self.assertEqual(standing.refresh_standings(), 1)
+        self.assertEqual(AcademicStanding.objects.get(student=self.students[0]).cgpa, Decimal('4.00'))
+
+    def test_student_without_results_loses_the_standing(self):
+        standing.refresh_standings()
+        Result.objects.filter(student=self.students[1]).delete()
+        self.assertEqual(standing.update_standings([self.students[1].pk]), 0)
+        self.assertFalse(AcademicStanding.objects.filter(student=self.students[1]).exists())
+
+
+# ---------------------------------------------------
+# ENROLLMENT
+# ---------------------------------------------------
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1, capacity=2)
+
+    def test_enroll_refuses_a_full_course(self):
+        make_student(self.course, 1)
+        make_student(self.course, 2)
+        other = Course.objects.create(name='Chemistry', code='CHE1', semester=1)
+        student = make_student(other, 3)
+        with self.assertRaises(CourseFull):
+            enroll(student, self.course)
+        student.refresh_from_db()
+        self.assertEqual(student.course, other)
+
+    def test_enrolled_student_keeps_their_seat(self):
+        student = make_student(self.course, 1)
+        make_student(self.course, 2)
+        student.city = 'Pune'
+        enroll(student, self.course)
+        self.assertEqual(Student.objects.get(pk=student.pk).city, 'Pune')
+
+    def test_inactive_students_take_no_seat(self):
+        make_student(self.course, 1)
+        make_student(self.course, 2, status='inactive')
+        enroll(make_student(self.course, 3, status='inactive'), self.course)
+        enroll(Student(
+            user_profile=make_profile('student4', 'student'), student_id='S4', roll_number='R4',
+            course=self.course, status='active',
+        ), self.course)
+        self.assertEqual(Student.objects.filter(course=self.course, status='active').count(), 2)
+
+    def test_activate_stops_at_capacity(self):
+        make_student(self.course, 1)
+        for number in (2, 3, 4):
+            make_student(self.course, number, status='inactive')
+        activated, refused = activate(Student.objects.filter(course=self.course))
+        self.assertEqual((activated, refused), (1, {'PHY1': 2}))
+        self.assertEqual(Student.objects.filter(course=self.course, status='active').count(), 2)
+
+
+# ---------------------------------------------------
+# BACKGROUND JOBS
+# ---------------------------------------------------
+
+@jobs.task('tests.add', max_attempts=2)
+def add(job, a, b):
+    return {'sum': a + b}
+
+
+@jobs.task('tests.fail', max_attempts=2)
+def fail(job):
+    raise ValueError('boom')
+
+
+class JobTests(TestCase):
+    def test_claim_takes_the_highest_priority_due_job(self):
+        low = jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        high = jobs.enqueue('tests.add', {'a': 3, 'b': 4}, priority=5)
+        jobs.enqueue('tests.add', {'a': 5, 'b': 6}, priority=9, delay=3600)
+
+        job = jobs.claim('worker-1')
+        self.assertEqual((job.pk, job.status, job.locked_by, job.attempts), (high.pk, 'running', 'worker-1', 1))
+        self.assertEqual(jobs.claim('worker-2').pk, low.pk)
+        self.assertIsNone(jobs.claim('worker-3'))
+
+    def test_run_job_records_the_result(self):
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        self.assertTrue(jobs.run_job(jobs.claim('worker')))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.progress, job.result), ('succeeded', 100, {'sum': 3}))
+
+    def test_failed_job_is_retried_then_failed(self):
+        jobs.enqueue('tests.fail')
+        self.assertFalse(jobs.run_job(jobs.claim('worker')))
+        job = Job.objects.get()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertFalse(jobs.run_job(jobs.claim('worker')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn('ValueError: boom', job.error)
+
+    def test_requeue_stale_spares_jobs_reporting_progress(self):
+        for _ in range(2):
+            jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        stale, alive = jobs.claim('dead'), jobs.claim('alive')
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        jobs.set_progress(alive, 50, 'halfway')
+
+        self.assertEqual(jobs.requeue_stale(seconds=3600), 1)
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_by), ('queued', None))
+        self.assertEqual((alive.status, alive.locked_by), ('running', 'alive'))
+
+    def test_requeue_stale_fails_jobs_out_of_attempts(self):
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2}, max_attempts=1)
+        jobs.claim('dead')
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(seconds=3600), 1)
+        self.assertEqual(Job.objects.get().status, 'failed')
+
+    def test_reporter_maps_loop_progress_onto_a_range(self):
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        job = jobs.claim('worker')
+        jobs.reporter(job, 'Halfway', start=10, end=50)(1, 2)
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.message), (30, 'Halfway'))
+
+
+class WorkerTests(TransactionTestCase):
+    def test_heartbeat_keeps_a_long_step_alive(self):
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        job = jobs.claim('worker')
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        with jobs.heartbeat(job, every=0.05):
+            sleep(0.3)
+        self.assertEqual(jobs.requeue_stale(seconds=3600), 0)
+
+    def test_worker_requeues_stale_jobs_between_jobs(self):
+        jobs.enqueue('tests.add', {'a': 1, 'b': 2})
+        jobs.claim('dead')
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        with mock.patch.object(jobs, 'REQUEUE_EVERY', 0):
+            self.assertEqual(jobs.work('worker', once=True, stale_after=3600), 1)
+        self.assertEqual(Job.objects.get().status, 'succeeded')
+
+
+# ---------------------------------------------------
+# LOGIN THROTTLING
+# ---------------------------------------------------
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-tests'}}
+
+
+@override_settings(
+    CACHES=LOCMEM,
+    LOGIN_THROTTLE_WINDOW=300,
+    LOGIN_THROTTLE_USER_ATTEMPTS=3,
+    LOGIN_THROTTLE_IP_ATTEMPTS=10,
+    LOGIN_THROTTLE_USERNAME_ATTEMPTS=6,
+    LOGIN_LOCKOUT_SECONDS=60,
+    LOGIN_LOCKOUT_MAX_SECONDS=100,
+    LOGIN_THROTTLE_TRUSTED_PROXY_HEADER='',
+)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, ip='198.51.100.1', **extra):
+        return self.factory.post('/login/', REMOTE_ADDR=ip, **extra)
+
+    def fail(self, username, times, ip='198.51.100.1'):
+        return [throttle.record_failure(self.request(ip), username) for _ in range(times)]
+
+    def test_locks_the_username_from_that_ip(self):
+        self.assertEqual(self.fail('alice', 3), [0, 0, 60])
+        self.assertEqual(throttle.locked_for(self.request(), 'Alice '), 60)
+        self.assertEqual(throttle.locked_for(self.request(), 'bob'), 0)
+        self.assertEqual(throttle.locked_for(self.request('198.51.100.2'), 'alice'), 0)
+
+    def test_lockouts_grow_up_to_the_maximum(self):
+        self.assertEqual(self.fail('alice', 3)[-1], 60)
+        self.assertEqual(self.fail('alice', 3)[-1], 100)
+
+    def test_success_forgets_the_failures(self):
+        self.fail('alice', 2)
+        throttle.record_success(self.request(), 'alice')
+        self.assertEqual(self.fail('alice', 2), [0, 0])
+
+    def test_limits_one_ip_across_usernames(self):
+        for number in range(9):
+            self.fail(f'user{number}', 1)
+        self.assertEqual(self.fail('last', 1), [60])
+        self.assertEqual(throttle.locked_for(self.request(), 'anyone'), 60)
+
+    def test_limits_one_username_across_ips(self):
+        locked = [throttle.record_failure(self.request(f'203.0.113.{number}'), 'alice') for number in range(6)]
+        self.assertEqual(locked, [0, 0, 0, 0, 0, 60])
+        self.assertEqual(throttle.locked_for(self.request('203.0.113.99'), 'alice'), 60)
+
+    def test_unlock_lifts_every_lockout(self):
+        self.fail('alice', 6)
+        throttle.unlock('198.51.100.1', 'alice')
+        self.assertEqual(throttle.locked_for(self.request(), 'alice'), 0)
+
+    @override_settings(LOGIN_THROTTLE_TRUSTED_PROXY_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_client_ip_from_the_trusted_proxy_header(self):
+        request = self.request('10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.7')
+        self.assertEqual(throttle.client_ip(request), '198.51.100.7')
+        with override_settings(LOGIN_THROTTLE_TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(throttle.client_ip(request), '1.2.3.4')
+        self.assertEqual(throttle.client_ip(self.request('10.0.0.1')), '10.0.0.1')
+
+    def test_login_view_turns_locked_attempts_away(self):
+        user = User.objects.create(username='alice')
+        user.set_password('right password')
+        user.save()
+        for _ in range(3):
+            self.client.post('/login/', {'username': 'alice', 'password': 'wrong password'})
+        with mock.patch('django.contrib.auth.backends.ModelBackend.authenticate') as authenticate:
+            response = self.client.post('/login/', {'username': 'alice', 'password': 'right password'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        authenticate.assert_not_called()
+
+
+# ---------------------------------------------------
+# GATE LOG INGESTION
+# ---------------------------------------------------
+
+# A Monday
+MONDAY = date(2024, 1, 1)
+
+
+def make_teacher(number=1):
+    return Teacher.objects.create(user_profile=make_profile(f'teacher{number}', 'teacher'), employee_id=f'T{number}')
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.subject = Subject.objects.create(name='Mechanics', code='MEC')
+        Timetable.objects.create(
+            course=course, subject=self.subject, teacher=make_teacher(), day_of_week='mon',
+            start_time=time(9), end_time=time(10),
+        )
+        self.student = make_student(course, 1, card_id='CARD1')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'gate.csv')
+
+    def write(self, text, mode='a'):
+        with open(self.path, mode) as fh:
+            fh.write(text)
+
+    def status(self, day=MONDAY):
+        return Attendance.objects.get(student=self.student, subject=self.subject, attendance_date=day).status
+
+    def test_marks_present_or_late(self):
+        self.write('card,timestamp\nCARD1,2024-01-01T09:05:00\nCARD1,2024-01-08T09:30:00\nNOPE,2024-01-01T09:00:00\n')
+        stats = ingest.ingest_log(self.path)
+        self.assertEqual((stats['lines'], stats['written'], stats['unknown_cards']), (4, 2, 1))
+        self.assertEqual(self.status(), 'present')
+        self.assertEqual(self.status(MONDAY + timedelta(days=7)), 'late')
+
+    def test_reads_only_what_was_appended(self):
+        self.write('CARD1,2024-01-01T09:30:00\n')
+        ingest.ingest_log(self.path)
+        self.write('CARD1,2024-01-01T09:05:00\nCARD1,2024-01-08T09:0')
+        stats = ingest.ingest_log(self.path)
+        self.assertEqual((stats['lines'], stats['written']), (1, 1))
+        self.assertEqual(self.status(), 'present')
+
+        # The unfinished line is read once it is complete
+        self.write('5:00\n')
+        self.assertEqual(ingest.ingest_log(self.path)['lines'], 1)
+        checkpoint = LogCheckpoint.objects.get(path=self.path)
+        self.assertEqual((checkpoint.offset, checkpoint.lines), (os.path.getsize(self.path), 3))
+
+    def test_a_worse_tap_never_overwrites_a_better_mark(self):
+        self.write('CARD1,2024-01-01T09:05:00\n')
+        ingest.ingest_log(self.path)
+        self.write('CARD1,2024-01-01T09:40:00\n')
+        self.assertEqual(ingest.ingest_log(self.path)['written'], 0)
+        self.assertEqual(self.status(), 'present')
+
+    def test_rotated_log_is_read_from_the_start(self):
+        self.write('CARD1,2024-01-01T09:30:00\nCARD1,2024-01-01T09:31:00\n')
+        ingest.ingest_log(self.path)
+        rotated = self.path + '.new'
+        with open(rotated, 'w') as fh:
+            fh.write('CARD1,2024-01-08T09:05:00\n')
+        os.replace(rotated, self.path)
+
+        stats = ingest.ingest_log(self.path)
+        self.assertEqual((stats['lines'], stats['written']), (1, 1))
+        checkpoint = LogCheckpoint.objects.get(path=self.path)
+        self.assertEqual((checkpoint.inode, checkpoint.offset), (os.stat(self.path).st_ino, os.path.getsize(self.path)))
+
+    def test_truncated_log_is_read_from_the_start(self):
+        self.write('CARD1,2024-01-01T09:30:00\nCARD1,2024-01-01T09:31:00\n')
+        ingest.ingest_log(self.path)
+        self.write('CARD1,2024-01-08T09:05:00\n', mode='w')
+        self.assertEqual(ingest.ingest_log(self.path)['lines'], 1)
+        self.assertEqual(self.status(MONDAY + timedelta(days=7)), 'present')
+    @override_settings(AUDIT_ENABLED=True)
+    def test_overwritten_marks_are_audited(self):
+        self.write('CARD1,2024-01-01T09:30:00\n')
+        ingest.ingest_log(self.path)
+        self.write('CARD1,2024-01-01T09:05:00\n')
+        with mock.patch.object(audit.buffer, 'add') as add, self.captureOnCommitCallbacks(execute=True):
+            ingest.ingest_log(self.path)
+        [entry] = add.call_args.args[0]
+        self.assertEqual((entry.action, entry.changes), ('bulk_update', {'status': ['late', 'present']}))
+
+
+# ---------------------------------------------------
+# AUDIT TRAIL
+# ---------------------------------------------------
+
+@override_settings(AUDIT_ENABLED=True)
+class AuditTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.student = make_student(course, 1)
+        self.subject = Subject.objects.create(name='Mechanics', code='MEC')
+        self.attendance = Attendance.objects.create(
+            student=self.student, subject=self.subject, attendance_date=MONDAY, status='absent',
+        )
+        self.entries = []
+        patcher = mock.patch.object(audit.buffer, 'add', side_effect=self.entries.extend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def recorded(self):
+        return [(entry.action, entry.object_id, entry.changes) for entry in self.entries]
+
+    def test_save_records_the_changed_fields(self):
+        attendance = Attendance.objects.get()
+        attendance.status = 'late'
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.save()
+        self.assertEqual(self.recorded(), [('update', attendance.pk, {'status': ['absent', 'late']})])
+
+    def test_save_with_update_fields_records_only_those(self):
+        attendance = Attendance.objects.get()
+        attendance.status = 'late'
+        attendance.remarks = 'not saved'
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.save(update_fields=['status'])
+        self.assertEqual(self.recorded(), [('update', attendance.pk, {'status': ['absent', 'late']})])
+
+    def test_bulk_update_records_each_row_once(self):
+        attendance = Attendance.objects.get()
+        attendance.status = 'late'
+        attendance.remarks = 'bus'
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.bulk_update([attendance], ['remarks'])
+        self.assertEqual(self.recorded(), [('bulk_update', attendance.pk, {'remarks': [None, 'bus']})])
+
+    def test_queryset_update_records_old_and_new_values(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(status='absent').update(status='present', updated_at=timezone.now())
+        self.assertEqual(self.recorded(), [('bulk_update', self.attendance.pk, {'status': ['absent', 'present']})])
+
+    def test_delete_records_the_deleted_values(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(pk=self.attendance.pk).delete()
+        [(action, object_id, changes)] = self.recorded()
+        self.assertEqual((action, object_id), ('delete', self.attendance.pk))
+        self.assertEqual(changes['status'], ['absent', None])
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        attendance = Attendance.objects.get()
+        attendance.status = 'late'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                attendance.save()
+                transaction.set_rollback(True)
+        self.assertEqual((callbacks, self.entries), ([], []))
+
+    def test_flush_writes_the_entries(self):
+        attendance = Attendance.objects.get()
+        attendance.status = 'leave'
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.save()
+        buffer = audit.AuditBuffer()
+        buffer.entries = list(self.entries)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(AuditEntry.objects.get().changes, {'status': ['absent', 'leave']})
+
+
+    def test_expression_update_reads_each_row_once(self):
+        # Savepoint, one SELECT, the UPDATE, release
+        with self.assertNumQueries(4), self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.update(status=Value('late'), remarks=Concat(Value('was '), 'status'))
+        self.assertEqual(self.recorded(), [
+            ('bulk_update', self.attendance.pk, {'status': ['absent', 'late'], 'remarks': [None, 'was absent']}),
+        ])
+
+    def test_archived_rows_are_not_recorded(self):
+        Attendance.objects.update(attendance_date=date(2020, 6, 1))
+        self.entries.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive.archive_year('2020-2021'), 1)
+        self.assertEqual(self.entries, [])
+
+    def test_failed_flush_keeps_the_entries(self):
+        buffer = audit.AuditBuffer()
+        buffer.entries = [AuditEntry(model='attendance', object_id=1, action='update', changes={}, at=timezone.now())]
+        with mock.patch.object(AuditEntry.objects, 'bulk_create', side_effect=InterfaceError), \
+                self.assertLogs('core.audit', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer.entries), 1)
+
+    def test_buffer_drops_the_oldest_entries_when_full(self):
+        buffer = audit.AuditBuffer()
+        buffer.pid = os.getpid()
+        with mock.patch.object(audit, 'MAX_PENDING', 2), self.assertLogs('core.audit', 'ERROR'):
+            buffer.add([1, 2, 3])
+        self.assertEqual(buffer.entries, [2, 3])
+
+
+# ---------------------------------------------------
+# LIST TABLES
+# ---------------------------------------------------
+
+class ListViewTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        for number in range(3):
+            make_student(self.course, number)
+
+    def test_table_compiles_columns_and_related_paths(self):
+        table = tables.Table(Student, ['student_id', tables.Column('parent.name', 'Parent'), 'course.code',
+                                       'get_status_display'])
+        self.assertEqual(table.headers, ['Student id', 'Parent', 'Code', 'Status'])
+        self.assertEqual(table.select_related, ['course', 'parent'])
+        student = Student.objects.get(student_id='S0')
+        [(obj, cells)] = table.rows([student])
+        self.assertEqual(cells, ['S0', '', 'PHY1', 'Active'])
+
+    def test_list_is_paginated_with_related_rows_in_one_query(self):
+        # Primary key range estimate, exact count (a small table), the page
+        with mock.patch.object(StudentListView, 'paginate_by', 2), self.assertNumQueries(3):
+            response = self.client.get(reverse('student_list') + '?page=2')
+        self.assertContains(response, '<td class="px-3 py-2">S2</td>', html=False)
+        self.assertNotContains(response, '<td class="px-3 py-2">S0</td>', html=False)
+        self.assertContains(response, 'Page 2 of 2')
+
+
+# ---------------------------------------------------
+# ATTENDANCE ROLLUP
+# ---------------------------------------------------
+
+class AttendanceRollupTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.successor = Course.objects.create(name='Physics', code='PHY2', semester=2)
+        self.subject = Subject.objects.create(name='Mechanics', code='MEC')
+        self.student = make_student(self.course, 1)
+        self.mark(MONDAY, 'present')
+
+    def mark(self, day, status):
+        return Attendance.objects.create(student=self.student, subject=self.subject, attendance_date=day, status=status)
+
+    def counts(self):
+        return list(AttendanceDaily.objects.order_by('date').values_list('course__code', 'date', 'present', 'absent'))
+
+    def test_refresh_folds_new_rows_into_the_day(self):
+        self.assertEqual(analytics.refresh_attendance_daily(), (1, 1))
+        other = make_student(self.course, 2)
+        Attendance.objects.create(student=other, subject=self.subject, attendance_date=MONDAY, status='absent')
+        analytics.refresh_attendance_daily()
+        self.assertEqual(self.counts(), [('PHY1', MONDAY, 1, 1)])
+
+    def test_rebuild_keeps_days_with_the_course_they_were_marked_in(self):
+        analytics.refresh_attendance_daily()
+        self.student.course = self.successor
+        self.student.save()
+        self.mark(MONDAY + timedelta(days=7), 'absent')
+        analytics.refresh_attendance_daily(rebuild=True)
+        self.assertEqual(self.counts(), [('PHY1', MONDAY, 1, 0), ('PHY2', MONDAY + timedelta(days=7), 0, 1)])
+
+    def test_archived_days_are_never_recomputed(self):
+        analytics.refresh_attendance_daily()
+        ArchivedYear.objects.create(label='2023-2024', start=MONDAY - timedelta(days=300), end=MONDAY)
+        Attendance.objects.filter(attendance_date=MONDAY).delete()
+        self.mark(MONDAY, 'absent')
+        analytics.refresh_attendance_daily(rebuild=True)
+        self.assertEqual(self.counts(), [('PHY1', MONDAY, 1, 0)])
+
+
+# ---------------------------------------------------
+# JSON API
+# ---------------------------------------------------
+
+class ApiTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.students = [make_student(course, number) for number in range(3)]
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+        self.url = reverse('api', args=['students'])
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_cursor_pages_through_the_rows(self):
+        first = self.get(limit=2, fields='student_id').json()
+        self.assertEqual([row['student_id'] for row in first['data']], ['S0', 'S1'])
+        self.assertEqual(list(first['data'][0]), ['id', 'student_id'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(([row['student_id'] for row in second['data']], second['next']), (['S2'], None))
+
+    def test_unchanged_page_answers_304(self):
+        response = self.get(limit=2)
+        again = self.client.get(self.url, {'limit': 2}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.students[1].status = 'inactive'
+        self.students[1].save()
+        changed = self.client.get(self.url, {'limit': 2}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_etag_covers_only_the_page(self):
+        etag = self.get(limit=1)['ETag']
+        self.students[2].status = 'inactive'
+        self.students[2].save()
+        self.assertEqual(self.get(limit=1)['ETag'], etag)
+
+    def test_large_pages_are_streamed(self):
+        with mock.patch.object(api, 'STREAM_THRESHOLD', 1):
+            response = self.get(limit=2, fields='student_id')
+            body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['student_id'] for row in body['data']], ['S0', 'S1'])
+        self.assertTrue(body['next'])
+
+    def test_encoders_agree_on_dates_and_times(self):
+        value = {'at': timezone.now(), 'day': MONDAY, 'time': time(9, 30, 0, 123456), 'marks': Decimal('71.50')}
+        orjson_output = api.dumps(value)
+        with mock.patch.object(api, 'orjson', None):
+            self.assertEqual(api.dumps(value), orjson_output)
+
+
+# ---------------------------------------------------
+# PASS/FAIL MODEL
+# ---------------------------------------------------
+
+class PassFailModelTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        self.student = make_student(course, 1)
+        subject = Subject.objects.create(name='Mechanics', code='MEC')
+        for day, marks in [(MONDAY, 30), (MONDAY + timedelta(days=30), 80)]:
+            exam = Exam.objects.create(subject=subject, course=course, exam_name=f'Test {day}', exam_date=day)
+            Result.objects.create(student=self.student, subject=subject, exam=exam, marks_obtained=marks)
+
+    def test_samples_only_see_earlier_exams(self):
+        first, second = features.training_samples()
+        self.assertEqual((first[0], first[3], first[2][1:3]), (MONDAY, 0, [features.MISSING, 0.0]))
+        self.assertEqual((second[3], second[2][1:3]), (1, [0.3, 1.0]))
+
+    def test_time_split_holds_out_the_latest_dates(self):
+        samples = [(MONDAY, 1, [], 1), (MONDAY, 2, [], 0), (MONDAY + timedelta(days=1), 1, [], 1)]
+        train, held_out, split_date = training.time_split(samples, validation=0.4)
+        self.assertEqual((len(train), len(held_out), split_date), (2, 1, MONDAY + timedelta(days=1)))
+        with self.assertRaises(training.TrainingError):
+            training.time_split(samples[:2])
+
+    def test_legacy_entry_point_still_predicts(self):
+        model = mock.Mock(**{'predict.return_value': [1]})
+        with mock.patch.object(predictor, '_load_legacy', return_value=model), \
+                self.assertWarns(DeprecationWarning):
+            self.assertEqual(predictor.predict_pass_fail(85.0, 62.5), 1)
+        model.predict.assert_called_once_with([[85.0, 62.5]])
+
+
+# ---------------------------------------------------
+# PARENT NOTIFICATIONS
+# ---------------------------------------------------
+
+class RecordingBackend(notifications.NotificationBackend):
+    sent = []
+
+    def send(self, digests):
+        if any(digest.parent['name'] == 'Broken' for digest in digests):
+            raise RuntimeError('backend bug')
+        self.sent.extend(digests)
+        return digests
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        subject = Subject.objects.create(name='Mechanics', code='MEC')
+        for number, name in enumerate(['Asha', 'Broken']):
+            parent = Parent.objects.create(name=name, email=f'{name.lower()}@example.com', phone='1')
+            student = make_student(course, number, parent=parent)
+            Attendance.objects.create(student=student, subject=subject, attendance_date=MONDAY, status='absent')
+        # The first run only sets the watermark; later ones re-read its overlap
+        notifications.collect_notifications()
+        RecordingBackend.sent = []
+
+    def test_each_absence_is_collected_once(self):
+        notifications.collect_notifications()
+        notifications.collect_notifications()
+        self.assertEqual(Notification.objects.filter(kind='absence').count(), 2)
+
+    def test_a_failing_chunk_does_not_hold_back_the_others(self):
+        notifications.collect_notifications()
+        with mock.patch.object(notifications, 'CHUNK_SIZE', 1), self.assertLogs('core.notifications', 'ERROR'):
+            stats = notifications.send_digests(workers=1, backend_class=RecordingBackend)
+        self.assertEqual(stats, {'sent': 1, 'failed': 1, 'skipped': 0})
+        self.assertEqual([digest.parent['name'] for digest in RecordingBackend.sent], ['Asha'])
+        self.assertEqual(
+            dict(Notification.objects.values_list('parent__name', 'status')), {'Asha': 'sent', 'Broken': 'pending'},
+        )
+
+
+# ---------------------------------------------------
+# CALENDAR FEEDS
+# ---------------------------------------------------
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Physics', code='PHY1', semester=1)
+        subject = Subject.objects.create(name='Mechanics', code='MEC')
+        teacher = Teacher.objects.create(
+            user_profile=make_profile('teacher', 'teacher'), employee_id='T1', department='Science',
+            qualification='MSc', joining_date=MONDAY,
+        )
+        Timetable.objects.create(
+            course=self.course, subject=subject, teacher=teacher, day_of_week='mon',
+            start_time=time(9), end_time=time(10), room='Lab, 2',
+        )
+
+    def render(self):
+        return ical.render(ical.course_feed(self.course))
+
+    def test_weekly_slot_repeats_until_the_end_of_the_year(self):
+        body = self.render()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=', body)
+        self.assertIn('LOCATION:Lab\\, 2\r\n', body)
+        self.assertRegex(body, r'DTSTART:\d{8}T090000Z\r\n')
+        self.assertNotIn('VTIMEZONE', body)
+
+    @override_settings(TIME_ZONE='Europe/London')
+    def test_local_times_come_with_their_timezone(self):
+        body = self.render()
+        self.assertRegex(body, r'DTSTART;TZID=Europe/London:\d{8}T090000\r\n')
+        self.assertIn('BEGIN:VTIMEZONE\r\nTZID:Europe/London\r\n', body)
+        # Back to GMT at 02:00 BST on the last Sunday of October
+        self.assertRegex(
+            body, r'BEGIN:STANDARD\r\nDTSTART:\d{4}10\d\dT020000\r\nTZOFFSETFROM:\+0100\r\nTZOFFSETTO:\+0000',
+        )
+
+    def test_long_lines_are_folded_on_character_boundaries(self):
+        folded = ical._fold('SUMMARY:' + 'é' * 60)
+        pieces = folded.split('\r\n ')
+        self.assertTrue(all(len(piece.encode()) <= 75 for piece in pieces))
+        self.assertEqual(''.join(pieces), 'SUMMARY:' + 'é' * 60)
+
+    def test_tokens_are_bound_to_their_feed(self):
+        user = User.objects.create(username='viewer')
+        token = ical.make_token(user, 'course', 'PHY1')
+        self.assertEqual(ical.read_token(token, 'course', 'PHY1'), user.pk)
+        self.assertIsNone(ical.read_token(token, 'course', 'CHE1'))
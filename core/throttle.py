@@ -0,0 +1,125 @@
+"""
+Login throttling.
+
+Failed logins are counted in the cache per client IP, per IP and username
+pair, and per username from any IP (with a higher limit, against guessing
+spread over many addresses), over a sliding window of
+``LOGIN_THROTTLE_WINDOW`` seconds:
+two fixed buckets, the previous one weighted by how much of it the window
+still covers. A key that reaches its limit is locked out, for
+``LOGIN_LOCKOUT_SECONDS`` the first time and twice as long on each further
+lockout within a day (up to ``LOGIN_LOCKOUT_MAX_SECONDS``). ``locked_for``
+is one cache read, so the login view turns a locked-out attempt away
+before the form touches the database or the password hasher.
+
+The client IP is ``REMOTE_ADDR`` unless ``LOGIN_THROTTLE_TRUSTED_PROXY_HEADER``
+names a header set by a reverse proxy in front of every request, such as
+``HTTP_X_FORWARDED_FOR``; then it is the address
+``LOGIN_THROTTLE_TRUSTED_PROXY_COUNT`` entries from the right of that
+header, the one the outermost trusted proxy saw. Entries further left come
+from the client and could be forged.
+
+Counters live in the ``default`` cache: per process with the local-memory
+backend, so point ``CACHE_URL`` at Redis or Memcached when several web
+processes serve logins.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Lockouts are counted towards the next one's length for this long
+STRIKES_TTL = 24 * 60 * 60
+
+
+def client_ip(request):
+    header = settings.LOGIN_THROTTLE_TRUSTED_PROXY_HEADER
+    if header:
+        addresses = [part.strip() for part in request.META.get(header, '').split(',') if part.strip()]
+        if addresses:
+            return addresses[-min(settings.LOGIN_THROTTLE_TRUSTED_PROXY_COUNT, len(addresses))]
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def _prefixes(ip, username):
+    """Cache key prefixes of the client IP, of the IP and username pair, and of the username."""
+    name = (username or '').strip().lower()
+    pair = hashlib.md5(f"{ip}|{name}".encode()).hexdigest()
+    return f'login:ip:{ip}', f'login:user:{pair}', f'login:name:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def _keys(request, username):
+    """``{cache key prefix: failures allowed per window}`` for this attempt."""
+    ip, pair, name = _prefixes(client_ip(request), username)
+    return {
+        ip: settings.LOGIN_THROTTLE_IP_ATTEMPTS,
+        pair: settings.LOGIN_THROTTLE_USER_ATTEMPTS,
+        name: settings.LOGIN_THROTTLE_USERNAME_ATTEMPTS,
+    }
+
+
+def locked_for(request, username):
+    """Seconds until this attempt may be made, or 0; a single cache read."""
+    locks = cache.get_many([f'{prefix}:locked' for prefix in _prefixes(client_ip(request), username)])
+    until = max(locks.values(), default=0)
+    return max(0, int(until - time.time() + 0.999))
+
+
+def _count(prefix, window, now):
+    """Add this failure to the current bucket; returns the sliding-window total."""
+    bucket = int(now // window)
+    current = f'{prefix}:{bucket}'
+    cache.add(current, 0, window * 2)
+    try:
+        count = cache.incr(current)
+    except ValueError:  # evicted between add and incr
+        cache.set(current, 1, window * 2)
+        count = 1
+    previous = cache.get(f'{prefix}:{bucket - 1}', 0)
+    return count + previous * (1 - (now % window) / window)
+
+
+def _lock(prefix, now):
+    """Lock ``prefix`` out, longer after each recent lockout; returns the seconds."""
+    strikes_key = f'{prefix}:strikes'
+    cache.add(strikes_key, 0, STRIKES_TTL)
+    try:
+        strikes = cache.incr(strikes_key)
+    except ValueError:
+        cache.set(strikes_key, 1, STRIKES_TTL)
+        strikes = 1
+    seconds = min(settings.LOGIN_LOCKOUT_SECONDS * 2 ** (strikes - 1), settings.LOGIN_LOCKOUT_MAX_SECONDS)
+    cache.set(f'{prefix}:locked', now + seconds, seconds)
+    # Start the next window clean rather than re-locking on the next failure
+    bucket = int(now // settings.LOGIN_THROTTLE_WINDOW)
+    cache.delete_many([f'{prefix}:{bucket}', f'{prefix}:{bucket - 1}'])
+    return seconds
+
+
+def record_failure(request, username):
+    """Count a failed login; returns the lockout it triggered in seconds, or 0."""
+    now = time.time()
+    window = settings.LOGIN_THROTTLE_WINDOW
+    locked = 0
+    for prefix, limit in _keys(request, username).items():
+        if _count(prefix, window, now) >= limit:
+            locked = max(locked, _lock(prefix, now))
+    return locked
+
+
+def record_success(request, username):
+    """Forget the failures of this IP and username pair (not of the IP or of the username)."""
+    _, prefix, _ = _prefixes(client_ip(request), username)
+    bucket = int(time.time() // settings.LOGIN_THROTTLE_WINDOW)
+    cache.delete_many([f'{prefix}:{bucket}', f'{prefix}:{bucket - 1}', f'{prefix}:strikes'])
+
+
+def unlock(ip, username):
+    """Lift the lockouts of ``ip``, ``username`` and the two together, and forget their failures."""
+    bucket = int(time.time() // settings.LOGIN_THROTTLE_WINDOW)
+    cache.delete_many([
+        f'{prefix}:{name}'
+        for prefix in _prefixes(ip, username)
+        for name in ('locked', 'strikes', bucket, bucket - 1)
+    ])
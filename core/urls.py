@@ -1,4 +1,5 @@
 from django.urls import path
+from .api import ApiView
 from .views import (
     RegisterView, CustomLoginView, logout_view,
     CourseListView, CourseCreateView, CourseUpdateView, CourseDeleteView,
@@ -6,7 +7,10 @@ from .views import (
     TeacherListView, TeacherCreateView, TeacherUpdateView,
     SubjectListView, SubjectCreateView,
     AssignmentListView, AssignmentCreateView,
-    AttendanceListView, ResultListView,
+    AttendanceListView, ResultListView, AtRiskListView, HonorRollView, AuditHistoryView,
+    CalendarLinksView, CalendarFeedView,
+    MetricsView,
+    JobStatusView, ReportCardJobView,
     home
 )
 
@@ -46,4 +50,23 @@ urlpatterns = [
     # Attendance and Results
     path("attendance/", AttendanceListView.as_view(), name="attendance_list"),
     path("results/", ResultListView.as_view(), name="result_list"),
+    path("at-risk/", AtRiskListView.as_view(), name="at_risk_list"),
+    path("honor-roll/", HonorRollView.as_view(), name="honor_roll"),
+    path("audit/<slug:model>/<int:pk>/", AuditHistoryView.as_view(), name="audit_history"),
+
+    # Calendar feeds
+    path("calendar/", CalendarLinksView.as_view(), name="calendar_links"),
+    path("calendar/me.ics", CalendarFeedView.as_view(kind="me"), name="calendar_me"),
+    path("calendar/course/<str:key>.ics", CalendarFeedView.as_view(kind="course"), name="calendar_course"),
+    path("calendar/teacher/<str:key>.ics", CalendarFeedView.as_view(kind="teacher"), name="calendar_teacher"),
+
+    # Instrumentation
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+
+    # Read-only JSON API
+    path("api/v1/<slug:resource>/", ApiView.as_view(), name="api"),
+
+    # Background jobs
+    path("jobs/<int:pk>/", JobStatusView.as_view(), name="job_status"),
+    path("jobs/report-cards/", ReportCardJobView.as_view(), name="report_card_job"),
 ]
@@ -1,14 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import logout, login
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.views import View
 from django.contrib import messages
 from django.db.models import Count, Avg
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 
+from .archive import archived_through
+from .enrollment import CourseFull, enroll
 from .forms import RegistrationForm
+from .ical import FeedError, feed_urls, read_token, resolve
+from .instrumentation import registry
+from .jobs import enqueue, job_status
+from .mixins import AdminOnlyMixin, StaffAndAdminMixin
+from .pagination import EstimatedCountPaginator
+from .reports import RENDER_FORMATS
+from .routers import ReplicaReadMixin
+from .standing import honor_roll
+from .tables import Column, TableListMixin
+from .throttle import locked_for, record_failure, record_success
 from .models import (
     Course,
     Student,
@@ -19,6 +36,10 @@ from .models import (
     Assignment,
     Attendance,
     Result,
+    Job,
+    RiskScore,
+    AcademicStanding,
+    AuditEntry,
 )
 
 # ---------------------------------------------------
@@ -51,12 +72,29 @@ class CustomLoginView(View):
         return render(request, self.template_name, {"form": AuthenticationForm()})
 
     def post(self, request):
+        username = request.POST.get("username", "")
+        # Checked before the form runs, so throttled attempts never reach the password hasher
+        wait = locked_for(request, username)
+        if wait:
+            return self.throttled(request, username, wait)
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
+            record_success(request, username)
             login(request, form.get_user())
             return redirect("home")
+        wait = record_failure(request, username)
+        if wait:
+            return self.throttled(request, username, wait)
         return render(request, self.template_name, {"form": form})
 
+    def throttled(self, request, username, wait):
+        messages.error(request, f"Too many failed login attempts. Try again in {wait} seconds.")
+        response = render(
+            request, self.template_name, {"form": AuthenticationForm(initial={"username": username})}, status=429,
+        )
+        response["Retry-After"] = str(wait)
+        return response
+
 
 @login_required
 def logout_view(request):
@@ -131,9 +169,13 @@ def home(request):
 # ---------------------------------------------------
 
 # COURSES
-class CourseListView(ListView):
+class CourseListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Course
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    ordering = "code"
+    columns = ["code", "name", "semester", "section", "capacity",
+               Column("class_teacher.user_profile.user.get_full_name", "Class teacher")]
 
 
 class CourseCreateView(CreateView):
@@ -157,19 +199,36 @@ class CourseDeleteView(DeleteView):
 
 
 # STUDENTS
-class StudentListView(ListView):
+class StudentListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Student
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    paginator_class = EstimatedCountPaginator
+    ordering = "student_id"
+    columns = ["student_id", "roll_number", Column("user_profile.user.get_full_name", "Name"),
+               "course.code", "get_gender_display", Column("parent.name", "Parent"), "get_status_display"]
+
+
+class EnrollmentFormMixin:
+    """Save the student through ``enroll`` so course capacity is enforced."""
 
+    def form_valid(self, form):
+        try:
+            self.object = enroll(form.save(commit=False), form.cleaned_data["course"])
+        except CourseFull as exc:
+            form.add_error("course", str(exc))
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
-class StudentCreateView(CreateView):
+
+class StudentCreateView(EnrollmentFormMixin, CreateView):
     model = Student
     fields = "__all__"
     template_name = "core/form.html"
     success_url = reverse_lazy("student_list")
 
 
-class StudentUpdateView(UpdateView):
+class StudentUpdateView(EnrollmentFormMixin, UpdateView):
     model = Student
     fields = "__all__"
     template_name = "core/form.html"
@@ -183,9 +242,13 @@ class StudentDeleteView(DeleteView):
 
 
 # TEACHERS
-class TeacherListView(ListView):
+class TeacherListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Teacher
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    ordering = "employee_id"
+    columns = ["employee_id", Column("user_profile.user.get_full_name", "Name"),
+               "department", "qualification", "joining_date"]
 
 
 class TeacherCreateView(CreateView):
@@ -203,9 +266,12 @@ class TeacherUpdateView(UpdateView):
 
 
 # SUBJECTS
-class SubjectListView(ListView):
+class SubjectListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Subject
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    ordering = "code"
+    columns = ["code", "name", "credits"]
 
 
 class SubjectCreateView(CreateView):
@@ -216,9 +282,13 @@ class SubjectCreateView(CreateView):
 
 
 # ASSIGNMENTS
-class AssignmentListView(ListView):
+class AssignmentListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Assignment
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    ordering = ["-due_date", "-pk"]
+    columns = ["title", Column("subject.name", "Subject"),
+               Column("teacher.user_profile.user.get_full_name", "Teacher"), "due_date", "total_marks"]
 
 
 class AssignmentCreateView(CreateView):
@@ -229,12 +299,165 @@ class AssignmentCreateView(CreateView):
 
 
 # ATTENDANCE
-class AttendanceListView(ListView):
+class AttendanceListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Attendance
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    paginator_class = EstimatedCountPaginator
+    ordering = ["-attendance_date", "-pk"]
+    columns = ["attendance_date", "student.roll_number", Column("student.user_profile.user.get_full_name", "Student"),
+               Column("subject.code", "Subject"), "get_status_display", "remarks"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        boundary = archived_through()
+        if boundary is not None:
+            context["notice"] = f"Attendance up to {boundary:%d %b %Y} is archived and not listed here."
+        return context
 
 
 # RESULTS
-class ResultListView(ListView):
+class ResultListView(ReplicaReadMixin, TableListMixin, ListView):
     model = Result
     template_name = "core/generic_list.html"
+    paginate_by = 100
+    paginator_class = EstimatedCountPaginator
+    ordering = "-pk"
+    columns = ["student.roll_number", Column("student.user_profile.user.get_full_name", "Student"),
+               Column("subject.code", "Subject"), Column("exam.exam_name", "Exam"),
+               "marks_obtained", "total_marks", "percentage", "grade"]
+
+
+# AT-RISK STUDENTS
+class AtRiskListView(StaffAndAdminMixin, ReplicaReadMixin, TableListMixin, ListView):
+    model = RiskScore
+    template_name = "core/generic_list.html"
+    paginate_by = 100
+    columns = [Column("student.roll_number", "Roll number"), Column("student.user_profile.user.get_full_name", "Student"),
+               Column("student.course.code", "Course"), "score", "get_level_display", "recent_attendance",
+               "missed_submissions", "latest_percentage", "computed_at"]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(level__in=["high", "medium"]).order_by("-score")
+
+
+# HONOR ROLL
+class HonorRollView(StaffAndAdminMixin, ReplicaReadMixin, TableListMixin, ListView):
+    model = AcademicStanding
+    template_name = "core/generic_list.html"
+    paginate_by = 100
+    columns = ["rank", Column("student.roll_number", "Roll number"),
+               Column("student.user_profile.user.get_full_name", "Student"), Column("student.course.code", "Course"),
+               "cgpa", "gpa", "semester", "credits_earned"]
+
+    def get_queryset(self):
+        course = self.request.GET.get("course")
+        return honor_roll(Course.objects.filter(code=course).first() if course else None)
+
+
+# AUDIT HISTORY
+class AuditHistoryView(StaffAndAdminMixin, ReplicaReadMixin, TableListMixin, ListView):
+    """Every recorded change to one result, attendance record or submission, newest first."""
+    model = AuditEntry
+    template_name = "core/generic_list.html"
+    paginate_by = 100
+    columns = ["at", Column("user.username", "User"), "get_action_display", "changes"]
+    audited = {"attendance", "result", "assignmentsubmission"}
+
+    def get_queryset(self):
+        if self.kwargs["model"] not in self.audited:
+            raise Http404("No audit history for this model")
+        return super().get_queryset().filter(
+            model=self.kwargs["model"], object_id=self.kwargs["pk"],
+        ).order_by("-at")
+
+
+# CALENDAR FEEDS
+class CalendarLinksView(LoginRequiredMixin, View):
+    """Subscription URLs of the calendar feeds the user can follow."""
+
+    def get(self, request):
+        return JsonResponse({
+            label: request.build_absolute_uri(url) for label, url in feed_urls(request.user).items()
+        })
+
+
+class CalendarFeedView(View):
+    """
+    ``GET`` an iCalendar feed, authenticated by the session or the signed
+    ``token`` in its URL; unchanged feeds answer ``If-None-Match`` with a 304.
+    """
+    kind = None
+
+    def get(self, request, key=None):
+        user = request.user
+        token = request.GET.get("token")
+        if token:
+            user_id = read_token(token, self.kind, key)
+            user = User.objects.select_related("userprofile").filter(pk=user_id, is_active=True).first()
+        if user is None or not user.is_authenticated:
+            return HttpResponse("Authentication required", status=401, content_type="text/plain")
+        try:
+            feed = resolve(user, self.kind, key)
+        except FeedError as exc:
+            raise Http404(str(exc))
+
+        version, timestamp = feed.version()
+        etag = f'"{version}"'
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = HttpResponse(feed.body(version), content_type="text/calendar; charset=utf-8")
+            response["Content-Disposition"] = f'inline; filename="{self.kind}.ics"'
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+# ---------------------------------------------------
+# METRICS
+# ---------------------------------------------------
+
+class MetricsView(AdminOnlyMixin, View):
+    """Per-view latency/query metrics and slow queries for this process."""
+
+    def get(self, request):
+        if request.GET.get("format") == "prometheus":
+            return HttpResponse(registry.prometheus(), content_type="text/plain; version=0.0.4")
+        return JsonResponse(registry.snapshot())
+
+
+# ---------------------------------------------------
+# BACKGROUND JOBS
+# ---------------------------------------------------
+
+class JobStatusView(LoginRequiredMixin, View):
+    """Progress of a background job, polled by the page that queued it."""
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk)
+        profile = getattr(request.user, "userprofile", None)
+        if job.created_by_id != request.user.pk and not (profile and profile.role == "admin"):
+            return JsonResponse({"error": "Not found"}, status=404)
+        return JsonResponse(job_status(job))
+
+
+class ReportCardJobView(AdminOnlyMixin, View):
+    """Queue report card generation and return the job id straight away."""
+
+    def post(self, request):
+        term = request.POST.get("term")
+        if not term:
+            return JsonResponse({"error": "term is required"}, status=400)
+        if request.POST.get("render") and request.POST["render"] not in RENDER_FORMATS:
+            return JsonResponse({"error": f"render must be one of {', '.join(RENDER_FORMATS)}"}, status=400)
+        payload = {"term": term}
+        for key in ("course", "start", "end", "render"):
+            if request.POST.get(key):
+                payload[key] = request.POST[key]
+        job = enqueue("report_cards", payload, user=request.user)
+        return JsonResponse(
+            {"id": job.pk, "status": job.status, "url": reverse("job_status", args=[job.pk])},
+            status=202,
+        )
@@ -0,0 +1,63 @@
+"""
+Worker start-up warmup.
+
+``warm_templates`` compiles every template that belongs to the project
+(``templates/`` and the app template directories under ``BASE_DIR``) into
+the cached template loader, so the first request served by a fresh worker
+doesn't parse them.
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_names(engine):
+    """Names of all templates in the engine's directories inside BASE_DIR."""
+    base = Path(settings.BASE_DIR).resolve()
+    names = []
+    for loader in engine.engine.template_loaders:
+        # The cached loader wraps the real ones
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                directory = Path(directory).resolve()
+                if not directory.is_dir() or base not in directory.parents:
+                    continue
+                for root, _dirs, files in os.walk(directory):
+                    for filename in files:
+                        if filename.endswith(('.html', '.txt', '.xml')):
+                            names.append(Path(root, filename).relative_to(directory).as_posix())
+    return sorted(set(names))
+
+
+def warm_templates(force=False):
+    """
+    Compile the project's templates if ``settings.TEMPLATE_WARMUP`` is on
+    (or ``force``). Returns ``(compiled, errors, seconds)``.
+    """
+    if not (force or getattr(settings, 'TEMPLATE_WARMUP', False)):
+        return 0, [], 0.0
+    started = time.perf_counter()
+    engine = engines['django']
+    compiled = 0
+    errors = []
+    for name in project_template_names(engine):
+        try:
+            engine.get_template(name)
+            compiled += 1
+        except (TemplateSyntaxError, TemplateDoesNotExist) as exc:
+            errors.append((name, str(exc)))
+            logger.warning("Template %s failed to compile: %s", name, exc)
+    elapsed = time.perf_counter() - started
+    logger.info("Warmed %d templates in %.3fs", compiled, elapsed)
+    return compiled, errors, elapsed
+
+
+def reset_template_cache():
+    for loader in engines['django'].engine.template_loaders:
+        loader.reset()
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sms_project.settings')
 
 application = get_asgi_application()
+
+from core.warmup import warm_templates  # noqa: E402
+
+warm_templates()